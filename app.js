@@ -88,6 +88,7 @@ function setDefaults(which){
   document.getElementById(`lr${which}_pos`).value = lib.pos;
   document.getElementById(`lr${which}_indet`).value = lib.indet;
   document.getElementById(`lr${which}_neg`).value = lib.neg;
+  invalidateParams();
 }
 document.getElementById("defaultsA").addEventListener("click",()=>setDefaults("A"));
 document.getElementById("defaultsB").addEventListener("click",()=>setDefaults("B"));
@@ -106,11 +107,62 @@ document.getElementById("useB").addEventListener("change",(e)=>{
 // Prior helpers
 function priorFromAgeStage(age,stage){ const a=PRIOR_ANCHORS[stage]||PRIOR_ANCHORS["MCI"]; return clamp(lerp(age,50,a.a50,90,a.a90),0.01,0.99); }
 function applyAPOEonOdds(p,apoe){ const or=APOE_OR[apoe]??1.0; const o=toOdds(clamp(p,1e-6,1-1e-6)); return clamp(fromOdds(o*or),1e-6,1-1e-6); }
+
+// Precomputed prior table (prior_table.json, written by ptau217_engine.py; cached by sw.js).
+// Ages on its grid are O(1) lookups; other ages fall back to the formula, so results never change.
+let PRIOR_TABLE = null;
+function makePriorTable(meta, values){
+  const si=Object.create(null), gi=Object.create(null);
+  meta.stages.forEach((s,i)=>si[s]=i); meta.genotypes.forEach((g,i)=>gi[g]=i);
+  return { ...meta, values, si, gi, nS:meta.stages.length, nG:meta.genotypes.length };
+}
+function buildPriorTable(ageMin, ageMax, step){
+  // Same layout as the blob, from this file's constants (used when the blob is missing or stale)
+  const stages=Object.keys(PRIOR_ANCHORS), genotypes=Object.keys(APOE_OR);
+  const n=Math.round((ageMax-ageMin)/step)+1, values=new Float64Array(n*stages.length*genotypes.length);
+  let k=0;
+  for(let i=0;i<n;i++) for(const s of stages) for(const g of genotypes) values[k++]=applyAPOEonOdds(priorFromAgeStage(ageMin+i*step,s),g);
+  return makePriorTable({ version:"local", age_min:ageMin, age_max:ageMin+(n-1)*step, step, stages, genotypes }, values);
+}
+function priorTableIsCurrent(src){
+  // The blob records the anchors/ORs it was built from; any difference from ours means it is stale
+  if(!src || !src.anchors || !src.apoe_or) return false;
+  const stages=Object.keys(PRIOR_ANCHORS), genotypes=Object.keys(APOE_OR);
+  return Object.keys(src.anchors).length===stages.length && Object.keys(src.apoe_or).length===genotypes.length
+    && stages.every(s=>src.anchors[s] && src.anchors[s][0]===PRIOR_ANCHORS[s].a50 && src.anchors[s][1]===PRIOR_ANCHORS[s].a90)
+    && genotypes.every(g=>src.apoe_or[g]===APOE_OR[g]);
+}
+async function loadPriorTable(){
+  try{
+    const d = await (await fetch("prior_table.json")).json();
+    if(d.format!==1 || !priorTableIsCurrent(d.source)) throw new Error("prior_table.json is stale");
+    const bin=atob(d.values), dv=new DataView(new ArrayBuffer(bin.length));
+    for(let i=0;i<bin.length;i++) dv.setUint8(i, bin.charCodeAt(i));
+    const values=new Float64Array(bin.length/8);
+    for(let i=0;i<values.length;i++) values[i]=dv.getFloat64(8*i, true);
+    if(values.length!==(Math.round((d.age_max-d.age_min)/d.step)+1)*d.stages.length*d.genotypes.length) throw new Error("prior_table.json is truncated");
+    PRIOR_TABLE = makePriorTable(d, values);
+  }catch(e){
+    console.warn("Prior table rebuilt locally:", e.message);
+    PRIOR_TABLE = buildPriorTable(18, 100, 1);
+  }
+  return PRIOR_TABLE;
+}
+function priorLookup(age, stage, apoe){
+  const T=PRIOR_TABLE;
+  if(T){
+    const pos=(Math.min(T.age_max, Math.max(T.age_min, age))-T.age_min)/T.step, i=Math.round(pos);
+    const s=T.si[stage] ?? T.si["MCI"], g=T.gi[apoe] ?? T.gi["unknown"];
+    if(pos===i && s!==undefined && g!==undefined) return T.values[(i*T.nS+s)*T.nG+g];
+  }
+  return applyAPOEonOdds(priorFromAgeStage(age,stage),apoe);
+}
+loadPriorTable();
 function updateAutoPrior(){
   const age=Number(document.getElementById("age").value||70);
   const stage=document.getElementById("stage").value;
   const apoe=document.getElementById("apoe").value;
-  let p=priorFromAgeStage(age,stage); p=applyAPOEonOdds(p,apoe);
+  const p=priorLookup(age,stage,apoe);
   const el = document.getElementById("auto_prior"); if(el) el.value=(Math.round(p*1000)/1000).toFixed(3);
   return p;
 }
@@ -145,35 +197,57 @@ function interpretP(p){
 function setChip(elId, bucket, label){ const el=document.getElementById(elId); if(!el) return; el.className="chip " + bucket; el.textContent = label; }
 
 
-function computeDiagnostic(){
+// Compiled parameter set: PET Se/Sp and each slot's modality, LRs and log-LRs, compiled once per set of
+// input values and reused by every calculation. The cache is keyed on the raw input values, so every
+// writer (typing, defaults, the wizard, loaded cases) is picked up without having to invalidate it;
+// invalidateParams() only forces a recompile. Mirrors ParamSet in ptau217_engine.py.
+const PARAM_INPUTS = ["pet_se_dx","pet_sp_dx","lrA_pos","lrA_neg","lrB_pos","lrB_neg","modA","modB"];
+var PARAMS = null, PARAMS_KEY = null;
+function compileParams(v){
+  const num = (id, d) => Number(v[id] || d);
+  const slot = id => {
+    const LRpos = num("lr"+id+"_pos", 1), LRneg = num("lr"+id+"_neg", 1);
+    const mod = v["mod"+id];
+    return { mod, pet: mod==="amyloid_pet", LRpos, LRneg, logLR: { pos: Math.log(LRpos), indet: 0, neg: Math.log(LRneg) } };
+  };
+  return { seP: num("pet_se_dx", 0.92), spP: num("pet_sp_dx", 0.90), A: slot("A"), B: slot("B") };
+}
+function getParams(){
+  const v = {};
+  PARAM_INPUTS.forEach(id => { v[id] = document.getElementById(id)?.value ?? ""; });
+  const key = PARAM_INPUTS.map(id => v[id]).join("|");
+  if (PARAMS === null || key !== PARAMS_KEY) { PARAMS = compileParams(v); PARAMS_KEY = key; }
+  return PARAMS;
+}
+function invalidateParams(){ PARAMS = null; }
+
+// Diagnostic inputs as entered: clinical prior (or override), PET Se/Sp and the ordered workup
+function readWorkup(){
   // Clinical prior (autopsy prevalence proxy used for PET PPV/NPV too)
   const p_auto = updateAutoPrior();
   const prior_override = document.getElementById("prior_override").value;
   const prior0 = prior_override ? clamp(Number(prior_override), 1e-6, 1-1e-6) : p_auto;
 
-  // PET Se/Sp used for PET-layer and autopsy layer
-  const seP = Number(document.getElementById("pet_se_dx")?.value || 0.92);
-  const spP = Number(document.getElementById("pet_sp_dx")?.value || 0.90);
-
-  // Test A
-  const modA   = document.getElementById("modA").value;
-  const catA   = document.getElementById("catA").value;
-  const lrApos = Number(document.getElementById("lrA_pos").value||1);
-  const lrAind = Number(document.getElementById("lrA_indet").value||1);
-  const lrAneg = Number(document.getElementById("lrA_neg").value||1);
-  const LR_A   = (catA==="pos")?lrApos : (catA==="neg")?lrAneg : 1.0;
-
-  // PET prior at this clinical prevalence: P(PET+)
-  const pP0 = seP*prior0 + (1-spP)*(1-prior0);
-
-  // PET layer after Test A
-  let qA;
-  if (modA === "amyloid_pet") {
-    qA = (catA === "pos") ? 1.0 : (catA === "neg") ? 0.0 : pP0; // PET observed → 100%/0%
-  } else {
-    const oP0 = toOdds(pP0);
-    qA = fromOdds(oP0 * LR_A); // blood/CSF vs PET
-  }
+  // PET Se/Sp used for PET-layer and autopsy layer, and the compiled test slots
+  const params = getParams(), seP = params.seP, spP = params.spP;
+
+  // Test A, then optional Test B
+  const test = id => ({ ...params[id], cat: document.getElementById("cat"+id).value });
+  const tests = [test("A")];
+  if (document.getElementById("useB").value==="yes") tests.push(test("B"));
+  return { prior0, override: prior_override ? prior0 : null, seP, spP, tests };
+}
+
+function computeDiagnostic(){
+  const { prior0, seP, spP, tests } = readWorkup();
+  const LR = t => (t.cat==="pos")?t.LRpos : (t.cat==="neg")?t.LRneg : 1.0;
+  const modA = tests[0].mod, LR_A = LR(tests[0]);
+  const useB = tests.length > 1, modB = useB ? tests[1].mod : null, LR_B = useB ? LR(tests[1]) : 1.0;
+
+  // Ordered workup → PET layer and autopsy layer after each step (log-odds engine)
+  const seq = sequentialPosterior(prior0, seP, spP, tests);
+  const pP0 = seq.petPrior;   // PET prior at this clinical prevalence: P(PET+)
+  const qA  = seq.steps[0].q; // PET observed → 100%/0%; blood/CSF vs PET otherwise
 
   // TOP CARD: PET layer
   document.getElementById("post_p1").textContent = `P(PET+) = ${fmtPct(qA)}`;
@@ -183,26 +257,12 @@ function computeDiagnostic(){
       : `Updated PET layer: prior P(PET+)=${fmtPct(pP0)}, LR_A=${LR_A.toFixed(2)} → P(PET+|A)=${fmtPct(qA)}.`;
   const [b1,lab1] = interpretP(qA); setChip("chip1", b1, lab1);
 
-  // Optional Test B
-  const useB = document.getElementById("useB").value==="yes";
   document.getElementById("comboBlock").style.display   = useB ? "block" : "none";
   document.getElementById("comboAutBlock").style.display= useB ? "block" : "none";
 
   let qAB = qA;
   if (useB){
-    const modB   = document.getElementById("modB").value;
-    const catB   = document.getElementById("catB").value;
-    const lrBpos = Number(document.getElementById("lrB_pos").value||1);
-    const lrBind = Number(document.getElementById("lrB_indet").value||1);
-    const lrBneg = Number(document.getElementById("lrB_neg").value||1);
-    const LR_B   = (catB==="pos")?lrBpos : (catB==="neg")?lrBneg : 1.0;
-
-    if (modB === "amyloid_pet") {
-      qAB = (catB === "pos") ? 1.0 : (catB === "neg") ? 0.0 : qA; // PET observed
-    } else {
-      const oQ = toOdds(qA);
-      qAB = fromOdds(oQ * LR_B); // sequential PET-layer update
-    }
+    qAB = seq.steps[1].q; // sequential PET-layer update (PET observed collapses it)
 
     document.getElementById("post_p2").textContent = `P(PET+) = ${fmtPct(qAB)}`;
     document.getElementById("post_details2").innerHTML =
@@ -219,7 +279,7 @@ function computeDiagnostic(){
   window.__POSTERIOR__ = qAB;
 
   // Compute the autopsy layer (PPV/1−NPV when PET observed; mixture otherwise)
-  computeAutopsyPosteriors(prior0, {catA, lrA_pos:lrApos, lrA_ind:lrAind, lrA_neg:lrAneg}, useB);
+  computeAutopsyPosteriors(prior0, seq, tests);
 }
 
 
@@ -270,6 +330,22 @@ function petNPV(se, sp, prev){ return (sp*(1-prev)) / ((1-se)*prev + sp*(1-prev)
 // Clinical PET prior at autopsy prevalence
 function priorPETfromD(pD, seP, spP){ return seP*pD + (1-spP)*(1-pD); }
 
+// PET envelope at a clinical prior, memoised per (Se, Sp, prior) in a small LRU (Map keeps insertion
+// order): { petPrior, L0 = logit(petPrior), ppv, npv, lo = 1−NPV, hi = PPV }
+const ENVELOPE_CACHE = 256;
+const envelopeCache = new Map();
+function petEnvelope(prior, seP, spP){
+  const key = seP + "|" + spP + "|" + prior;
+  let e = envelopeCache.get(key);
+  if (e) { envelopeCache.delete(key); envelopeCache.set(key, e); return e; }
+  const petPrior = priorPETfromD(prior, seP, spP);
+  const ppv = petPPV(seP, spP, prior), npv = petNPV(seP, spP, prior);
+  e = { petPrior, L0: Math.log(petPrior) - Math.log1p(-petPrior), ppv, npv, lo: 1 - npv, hi: ppv };
+  envelopeCache.set(key, e);
+  if (envelopeCache.size > ENVELOPE_CACHE) envelopeCache.delete(envelopeCache.keys().next().value);
+  return e;
+}
+
 // Update PET probability with a blood LR (blood is referenced to PET)
 function posteriorPETprobGivenB(pP, LR){ const o = toOdds(pP); return fromOdds(o * LR); }
 
@@ -279,15 +355,14 @@ function autopsyPosteriorFromB(priorD, seP, spP, LRpos, LRneg, cat){
   const LR = cat==="pos" ? LRpos : (cat==="neg" ? LRneg : 1.0);
 
   // 1) PET prior at the autopsy prevalence
-  const pP = priorPETfromD(priorD, seP, spP);
+  const env = petEnvelope(priorD, seP, spP);
+  const pP = env.petPrior;
 
   // 2) Blood→PET: q = P(PET+ | Blood)
   const q = posteriorPETprobGivenB(pP, LR);
 
   // 3) PET→Autopsy mixture (bounded by [1−NPV, PPV])
-  const ppv = petPPV(seP, spP, priorD);
-  const npv = petNPV(seP, spP, priorD);
-  const lo = 1 - npv, hi = ppv;
+  const { ppv, npv, lo, hi } = env;
   const p  = Math.max(lo, Math.min(hi, q*ppv + (1-q)*lo));
 
   return { p, q, ppv, npv, envelope:[lo,hi], LR_used:LR };
@@ -299,30 +374,46 @@ function autopsyPosteriorFromAthenB(priorD, seP, spP, A, B){
   const LR_A = A.cat==="pos" ? A.LRpos : (A.cat==="neg" ? A.LRneg : 1.0);
   const LR_B = B.cat==="pos" ? B.LRpos : (B.cat==="neg" ? B.LRneg : 1.0);
 
-  const pP0 = priorPETfromD(priorD, seP, spP);
+  const { petPrior: pP0, ppv, npv, lo, hi } = petEnvelope(priorD, seP, spP);
   const q1  = posteriorPETprobGivenB(pP0, LR_A);    // P(P+ | A)
   const q2  = posteriorPETprobGivenB(q1,  LR_B);    // P(P+ | A,B)
 
-  const ppv = petPPV(seP, spP, priorD);
-  const npv = petNPV(seP, spP, priorD);
-  const lo = 1 - npv, hi = ppv;
   const p  = Math.max(lo, Math.min(hi, q2*ppv + (1-q2)*lo));
 
   return { p, q2, ppv, npv, envelope:[lo,hi] };
 }
 
-// Replace the old autopsy computation used on the Diagnostic page
+// Any ordered list of tests, in log-odds space: one running PET log-odds (log-LRs add up), turned
+// back into a probability only where a step is reported. tests: [{cat, LRpos, LRneg, pet}], plus
+// logLR {pos, indet, neg} when compiled (getParams), so no log is taken per call
+//  - PET step: observed → PET layer ±∞ (100%/0%; unchanged if indeterminate); the first one fixes the
+//    autopsy layer at PPV / 1−NPV (pre-PET value if indeterminate) for every later step
+//  - other steps add log(LR); a collapsed PET layer stays collapsed
+// Returns { petPrior, ppv, npv, envelope, steps:[{q, p}] } with q = P(PET+), p = autopsy P(A+).
+function sequentialPosterior(prior0, seP, spP, tests){
+  const { petPrior, L0, ppv, npv, lo, hi } = petEnvelope(prior0, seP, spP);
+  const expit = L => L >= 0 ? 1/(1+Math.exp(-L)) : Math.exp(L)/(1+Math.exp(L));
+  const mix = q => Math.max(lo, Math.min(hi, q*hi + (1-q)*lo));
+  let L = L0, fixed = null;
+  const steps = tests.map(t => {
+    if (t.pet) {
+      if (fixed === null) fixed = t.cat==="pos" ? hi : (t.cat==="neg" ? lo : mix(expit(L)));
+      if (t.cat==="pos") L = Infinity; else if (t.cat==="neg") L = -Infinity;
+    } else if (isFinite(L)) {
+      L += t.logLR ? (t.logLR[t.cat] ?? 0) : Math.log(t.cat==="pos" ? t.LRpos : (t.cat==="neg" ? t.LRneg : 1.0));
+    }
+    const q = expit(L);
+    return { q, p: fixed === null ? mix(q) : fixed };
+  });
+  return { petPrior, ppv, npv, envelope:[lo,hi], steps };
+}
 
-function computeAutopsyPosteriors(prior0, Avals, useB){
-  // PET Se/Sp and derived PPV/NPV at this prior
-  const seP = Number(document.getElementById("pet_se_dx")?.value || 0.92);
-  const spP = Number(document.getElementById("pet_sp_dx")?.value || 0.90);
-  const ppv = (seP*prior0) / (seP*prior0 + (1-spP)*(1-prior0));
-  const npv = (spP*(1-prior0)) / ((1-seP)*prior0 + spP*(1-prior0));
-  const lo  = 1 - npv, hi = ppv;
+// Replace the old autopsy computation used on the Diagnostic page
 
-  const modA = document.getElementById("modA").value;
-  const catA = Avals.catA;
+function computeAutopsyPosteriors(prior0, seq, tests){
+  // PPV/NPV at this prior bound the PET→autopsy mixture; seq comes from sequentialPosterior
+  const npv = seq.npv, [lo, hi] = seq.envelope;
+  const useB = tests.length > 1;
 
   function renderA(p,msg){
     document.getElementById("post_aut_p1").textContent = `Posterior P(A+) = ${fmtPct(p)}`;
@@ -337,42 +428,23 @@ function computeAutopsyPosteriors(prior0, Avals, useB){
     window.__POSTERIOR_AUTOPSY__ = p;
   }
 
-  // If A is PET, collapse directly to PPV / (1−NPV)
-  if (modA === "amyloid_pet") {
-    const pA = (catA==="pos") ? hi : (catA==="neg") ? lo : prior0;
-    renderA(pA, `PET observed. By definition: PET+ → PPV=${fmtPct(hi)}, PET− → 1−NPV=${fmtPct(lo)} at prior ${fmtPct(prior0)}.`);
-    if (useB) {
-      // Once PET known, PET-referenced tests cannot change the autopsy posterior
-      renderAB(pA, `PET already observed; additional PET-referenced tests do not change the autopsy posterior.`);
-    } else {
-      document.getElementById("post_aut_details2").innerHTML = "";
-    }
-    return;
+  // If A is PET, the autopsy posterior collapses directly to PPV / (1−NPV)
+  const [A, B] = tests, [sA, sB] = seq.steps;
+  if (A.pet) {
+    renderA(sA.p, `PET observed. By definition: PET+ → PPV=${fmtPct(hi)}, PET− → 1−NPV=${fmtPct(lo)} at prior ${fmtPct(prior0)}.`);
+  } else {
+    // A is PET-referenced → PET mixture to autopsy, bounded to [1−NPV, PPV]
+    renderA(sA.p, `Mixture: P(PET+|A)×PPV + (1−P(PET+|A))×(1−NPV). Here P(PET+|A)=${fmtPct(sA.q)}, PPV=${fmtPct(hi)}, NPV=${fmtPct(npv)}.`);
   }
 
-  // Otherwise A is PET-referenced → use PET mixture to autopsy
-  // Step 1: PET prior at this prior0
-  const pP0 = seP*prior0 + (1-spP)*(1-prior0);
-  // Step 2: P(PET+ | A)
-  const LR_A = (catA==="pos") ? Avals.lrA_pos : (catA==="neg") ? Avals.lrA_neg : 1.0;
-  const qA = fromOdds(toOdds(pP0) * LR_A);
-  // Step 3: mixture bounded to [1−NPV, PPV]
-  const pA_auto = Math.max(lo, Math.min(hi, qA*hi + (1-qA)*lo));
-  renderA(pA_auto, `Mixture: P(PET+|A)×PPV + (1−P(PET+|A))×(1−NPV). Here P(PET+|A)=${fmtPct(qA)}, PPV=${fmtPct(hi)}, NPV=${fmtPct(npv)}.`);
-
   if (useB){
-    const modB = document.getElementById("modB").value;
-    const catB = document.getElementById("catB").value;
-    if (modB === "amyloid_pet") {
-      const pAB = (catB==="pos") ? hi : (catB==="neg") ? lo : pA_auto;
-      renderAB(pAB, `Second test is PET → autopsy posterior collapses to PET: PET+ → PPV=${fmtPct(hi)}, PET− → 1−NPV=${fmtPct(lo)}.`);
+    if (A.pet) {
+      // Once PET known, PET-referenced tests cannot change the autopsy posterior
+      renderAB(sB.p, `PET already observed; additional PET-referenced tests do not change the autopsy posterior.`);
+    } else if (B.pet) {
+      renderAB(sB.p, `Second test is PET → autopsy posterior collapses to PET: PET+ → PPV=${fmtPct(hi)}, PET− → 1−NPV=${fmtPct(lo)}.`);
     } else {
-      const lrB_pos = Number(document.getElementById("lrB_pos").value||1);
-      const lrB_neg = Number(document.getElementById("lrB_neg").value||1);
-      const LR_B = (catB==="pos")?lrB_pos : (catB==="neg")?lrB_neg : 1.0;
-      const qAB = fromOdds(toOdds(qA) * LR_B);
-      const pAB_auto = Math.max(lo, Math.min(hi, qAB*hi + (1-qAB)*lo));
-      renderAB(pAB_auto, `After A→B: mixture bounded to [${fmtPct(lo)}, ${fmtPct(hi)}] at prior ${fmtPct(prior0)}.`);
+      renderAB(sB.p, `After A→B: mixture bounded to [${fmtPct(lo)}, ${fmtPct(hi)}] at prior ${fmtPct(prior0)}.`);
     }
   } else {
     document.getElementById("post_aut_details2").innerHTML = "";
@@ -404,6 +476,7 @@ function doBridge(which){
     document.getElementById("lrB_neg").value = out.lrneg.toFixed(3);
     document.getElementById("lrB_indet").value = 1.0;
   }
+  invalidateParams();
 }
 
 // Wire up
@@ -945,31 +1018,52 @@ function openWhatIfAnalysis() {
   updateSensitivityAnalysis();
 }
 
+// The sweep itself lives in sweep.js and runs in a Web Worker; while one sweep is in flight only the
+// newest slider position is kept, so dragging never queues up stale grids. Without workers (e.g.
+// file://) the same sensitivitySweep() runs inline.
+const SWEEP_GRID = { nAge: 100, nLR: 100 };
+let sweepWorker = null, sweepBusy = false, sweepPending = null, sweepLast = null;
+function requestSweep(params){
+  sweepLast = params;
+  if (sweepWorker === null) {
+    try {
+      sweepWorker = new Worker("sweep.js");
+      sweepWorker.onmessage = e => {
+        sweepBusy = false;
+        renderSweep(e.data);
+        if (sweepPending) { const p = sweepPending; sweepPending = null; requestSweep(p); }
+      };
+      sweepWorker.onerror = () => { sweepWorker = false; sweepBusy = false; sweepPending = null; requestSweep(sweepLast); };
+    } catch (e) { sweepWorker = false; }
+  }
+  if (!sweepWorker) { renderSweep(sensitivitySweep(params)); return; }
+  if (sweepBusy) { sweepPending = params; return; }
+  sweepBusy = true;
+  sweepWorker.postMessage({ params });
+}
+
+function renderSweep(r){
+  // Autopsy-layer range over the grid; the full grid stays on window for plotting
+  window.__SENSITIVITY__ = r;
+  document.getElementById("sensitivity-text").textContent = `${(r.autMin * 100).toFixed(0)}% - ${(r.autMax * 100).toFixed(0)}%`;
+  const fill = document.getElementById("sensitivity-range");
+  fill.style.marginLeft = `${r.autMin * 100}%`;
+  fill.style.width = `${Math.max(0.5, (r.autMax - r.autMin) * 100)}%`;
+}
+
 function updateSensitivityAnalysis() {
-  const baseAge = Number(document.getElementById("age").value || 70);
   const ageVar = Number(document.getElementById("age-sensitivity").value);
   const lrVar = Number(document.getElementById("lr-sensitivity").value);
-  const baseProbability = window.__POSTERIOR_AUTOPSY__ || window.__POSTERIOR__;
-  
-  if (!isFinite(baseProbability)) return;
-  
-  // Calculate probability range with variations
-  const ageLow = Math.max(18, baseAge - ageVar);
-  const ageHigh = Math.min(100, baseAge + ageVar);
-  const lrMultLow = (100 - lrVar) / 100;
-  const lrMultHigh = (100 + lrVar) / 100;
-  
-  // Simplified sensitivity calculation (would be more complex in reality)
-  const probLow = Math.max(0, baseProbability * 0.8 * lrMultLow);
-  const probHigh = Math.min(1, baseProbability * 1.2 * lrMultHigh);
-  
-  const rangePct = (probHigh - probLow) * 100;
-  const rangeText = `${(probLow * 100).toFixed(0)}% - ${(probHigh * 100).toFixed(0)}%`;
-  
-  document.getElementById("sensitivity-text").textContent = rangeText;
-  document.getElementById("sensitivity-range").style.width = `${rangePct * 2}%`;
   document.getElementById("age-range").textContent = `±${ageVar} years`;
   document.getElementById("lr-range").textContent = `±${lrVar}%`;
+
+  const { override, seP, spP, tests } = readWorkup();
+  const a = PRIOR_ANCHORS[document.getElementById("stage").value] || PRIOR_ANCHORS["MCI"];
+  requestSweep({
+    age: Number(document.getElementById("age").value || 70), ageSpan: ageVar, lrPct: lrVar, ...SWEEP_GRID,
+    a50: a.a50, a90: a.a90, or: APOE_OR[document.getElementById("apoe").value] ?? 1.0, prior: override,
+    seP, spP, tests: tests.map(({ cat, LRpos, LRneg, pet }) => ({ cat, LRpos, LRneg, pet }))
+  });
 }
 
 // Load example case
@@ -1022,6 +1116,7 @@ document.addEventListener("DOMContentLoaded", function() {
       }
     });
     
+    invalidateParams();
     updateAutoPrior();
     computeDiagnostic();
     alert("Case loaded successfully!");
@@ -1071,6 +1166,7 @@ function applyDefaultsFor(prefix){
   if(pos) pos.value = (t.defaults?.pos ?? pos.value);
   if(ind) ind.value = (t.defaults?.indet ?? ind.value);
   if(neg) neg.value = (t.defaults?.neg ?? neg.value);
+  invalidateParams();
   // annotate reference under the selector if there is a spot
   const tag = document.getElementById(p==="A" ? "modA_ref" : "modB_ref");
   if(tag) tag.textContent = t.ref ? `ref: ${t.ref}` : "";
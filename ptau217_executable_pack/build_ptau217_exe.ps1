@@ -22,9 +22,9 @@ $venv = Join-Path $PSScriptRoot ".venv-build"
 if (!(Test-Path $venv)) { & $py -m venv $venv }
 $pyv = Join-Path $venv "Scripts\python.exe"
 
-# Install pyinstaller
+# Install pyinstaller (+ numpy for the /api/posterior batch scorer, brotli for br asset variants)
 & $pyv -m pip install --upgrade pip
-& $pyv -m pip install pyinstaller
+& $pyv -m pip install pyinstaller numpy brotli
 
 # Build single-file exe
 & $pyv -m PyInstaller --onefile --name $Name $Script
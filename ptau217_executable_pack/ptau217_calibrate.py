@@ -0,0 +1,354 @@
+# ptau217_calibrate.py — re-estimate the engine's parameters from a labelled local cohort
+# One streaming pass over CSV / NDJSON files (fixed-size row chunks, so registry dumps of millions of
+# rows need only the count tables in memory) accumulates sufficient statistics:
+#   prior:  cases and amyloid-positives per stage x 1-year age cell (50-90; <50 and 90+ pooled) x APOE
+#   tests:  results per modality x category x reference status (PET for the PET-referenced assays,
+#           autopsy for amyloid PET itself, as in TEST_LIBRARY)
+# and turns them into a parameter set in the engine's own terms, each value with a confidence interval:
+# PRIOR_ANCHORS and APOE_OR by maximum likelihood of the PWA's prior model (Fisher scoring, Wald
+# intervals, ORs on the log scale), Se/Sp with Wilson intervals and LR+/- with log-method intervals.
+# Parameters the cohort has no data for keep their current value with n = 0. Raw assay values (a
+# "<modality>_value" column, or "value" / valueA / valueB in case form) are histogrammed per reference
+# status on a fine log scale and become density-ratio LR curves for engine.load_lr_curves(): adjacent
+# cells pooled until both groups have MIN_CURVE_COUNT results, then made monotone (weighted
+# pool-adjacent-violators on log LR, in the direction of the data).
+#
+# Rows: age, stage, apoe; results either as one column per TEST_LIBRARY modality (pos/indet/neg), as
+# modA/catA/modB/catB or as a "tests" list (NDJSON), like the engine's cases; truth as "pet" and/or
+# "autopsy" (pos/neg, 1/0, true/false, yes/no; blank = not known).
+from statistics import NormalDist
+import argparse, csv, io, itertools, json, sys
+import numpy as np
+import ptau217_engine as engine
+
+CHUNK = 1 << 16
+LEVEL = 0.95
+AGE_EDGES = np.arange(50, 91)   # cell k holds ages in [edge[k-1], edge[k]); cell 0 is <50, the last 90+
+MODS = tuple(engine.TEST_LR)
+PRIOR_REFS = ("either", "autopsy", "pet")  # amyloid truth for the prior: autopsy, else PET for "either"
+FIT_ITER, FIT_TOL = 100, 1e-10
+VALUE_LOG10 = (-6.0, 6.0)       # raw values histogrammed on log10 cells of VALUE_STEP over this span
+VALUE_STEP = 0.005
+MIN_CURVE_COUNT = 50
+TRUTH = {"pos": 1, "positive": 1, "1": 1, "true": 1, "yes": 1, "neg": 0, "negative": 0, "0": 0, "false": 0, "no": 0}
+CATEGORY = {"pos": engine.POS, "positive": engine.POS, "neg": engine.NEG, "negative": engine.NEG,
+            "indet": engine.INDET, "indeterminate": engine.INDET}
+
+def _json_row(line):
+  # One NDJSON line -> dict, or None if it is not a JSON object (Counts.add counts it as a bad row)
+  try:
+    row = json.loads(line)
+  except ValueError:
+    return None
+  return row if isinstance(row, dict) else None
+
+def read_chunks(path, chunk=CHUNK):
+  # Rows of a .csv / .ndjson / .jsonl file (or "-" for NDJSON on stdin) as lists of dicts, chunk rows at
+  # a time; malformed NDJSON lines come through as None
+  if path == "-":
+    f = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+  else:
+    f = open(path, newline="", encoding="utf-8-sig")
+  with f:
+    rows = csv.DictReader(f) if path.lower().endswith(".csv") else (_json_row(l) for l in f if l.strip())
+    while True:
+      block = list(itertools.islice(rows, chunk))
+      if not block:
+        return
+      yield block
+
+def _truth(v):
+  return None if v is None or str(v).strip() == "" else TRUTH[str(v).strip().lower()]
+
+def row_results(row):
+  # A labelled row's test results as ([(modality, category code)], [(modality, raw value)])
+  cats, values = [], []
+  if "tests" in row or row.get("modA"):
+    for m, c, _, _, v in engine.case_steps(row):
+      m = m or engine.DEFAULT_MOD
+      if v not in (None, ""):
+        values.append((m, float(v)))
+      else:
+        cats.append((m, CATEGORY[str(c).lower()]))
+  for m in MODS:
+    c, v = row.get(m), row.get(m + "_value")
+    if c not in (None, ""):
+      cats.append((m, CATEGORY[str(c).strip().lower()]))
+    if v not in (None, ""):
+      values.append((m, float(v)))
+  for m, _ in cats + values:
+    if m not in engine.TEST_LR:
+      raise ValueError(f"unknown modality: {m}")
+  return cats, values
+
+class Counts:
+  # Sufficient statistics; add() one chunk of rows at a time, merge() partial counts
+  def __init__(self):
+    shape = (len(engine.STAGES), len(AGE_EDGES) + 1, len(engine.GENOTYPES))
+    self.prior_n, self.prior_k, self.prior_age = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+    self.tests = np.zeros((len(MODS), len(engine.CATEGORIES), 2))  # [..., 0] ref positive, [..., 1] ref negative
+    cells = int(round((VALUE_LOG10[1] - VALUE_LOG10[0]) / VALUE_STEP))
+    self.values = np.zeros((len(MODS), cells, 2))   # raw-value histogram, same reference columns
+    self.value_sum = np.zeros((len(MODS), cells))  # sum of the values per cell (curve breakpoints)
+    self.rows = self.bad = 0
+
+  def add(self, rows, prior_ref="either"):
+    age, stage, apoe, amyloid, tests, values = [], [], [], [], [], []
+    for row in rows:
+      self.rows += 1
+      if row is None:
+        self.bad += 1
+        continue
+      try:
+        pet, aut = _truth(row.get("pet")), _truth(row.get("autopsy"))
+        results, raw = row_results(row)
+        a = float(row["age"]) if row.get("age") not in (None, "") else np.nan
+        s, g = row.get("stage") or "MCI", row.get("apoe") or "unknown"
+        if s not in engine.STAGES or g not in engine.GENOTYPES:
+          raise ValueError("unknown stage or genotype")
+      except (KeyError, ValueError, TypeError):
+        self.bad += 1
+        continue
+      ref = aut if prior_ref == "autopsy" else pet if prior_ref == "pet" else (aut if aut is not None else pet)
+      if ref is not None and np.isfinite(a):
+        age.append(a), stage.append(s), apoe.append(g), amyloid.append(ref)
+      for m, cat in results:
+        truth = aut if m == engine.PET_MOD else pet
+        if truth is not None:
+          tests.append((MODS.index(m), cat, 1 - truth))
+      for m, v in raw:
+        truth = aut if m == engine.PET_MOD else pet
+        if truth is not None and np.isfinite(v):
+          values.append((MODS.index(m), v, 1 - truth))
+    if age:
+      age = np.array(age)
+      cell = (engine.codes(stage, engine.STAGES), np.searchsorted(AGE_EDGES, age, side="right"), engine.codes(apoe, engine.GENOTYPES))
+      np.add.at(self.prior_n, cell, 1.0)
+      np.add.at(self.prior_k, cell, np.array(amyloid, dtype=float))
+      np.add.at(self.prior_age, cell, age)
+    if tests:
+      np.add.at(self.tests, tuple(np.array(tests).T), 1.0)
+    if values:
+      m, v, ref = np.array(values).T
+      m, ref = m.astype(int), ref.astype(int)
+      with np.errstate(divide="ignore", invalid="ignore"):
+        cell = np.floor((np.log10(v) - VALUE_LOG10[0]) / VALUE_STEP)
+      cell = np.clip(np.nan_to_num(cell, nan=0.0, neginf=0.0), 0, self.values.shape[1] - 1).astype(int)
+      np.add.at(self.values, (m, cell, ref), 1.0)
+      np.add.at(self.value_sum, (m, cell), v)
+    return self
+
+  def merge(self, other):
+    for k in ("prior_n", "prior_k", "prior_age", "tests", "values", "value_sum", "rows", "bad"):
+      setattr(self, k, getattr(self, k) + getattr(other, k))
+    return self
+
+def _z(level):
+  return NormalDist().inv_cdf(0.5 + level / 2)
+
+def wilson(k, n, level=LEVEL):
+  # Wilson score interval for k of n
+  z = _z(level)
+  p = k / n
+  mid = (p + z * z / (2 * n)) / (1 + z * z / n)
+  half = z / (1 + z * z / n) * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n))
+  return mid - half, mid + half
+
+def _entry(value, lo=None, hi=None, n=0):
+  num = lambda v: None if v is None or not np.isfinite(v) else float(v)
+  return {"value": float(value), "lo": num(lo), "hi": num(hi), "n": int(n)}
+
+def test_estimates(counts, level=LEVEL):
+  # {modality: {"ref", "se", "sp", "lr_pos", "lr_neg", "indet_rate"}} from the results table; Se/Sp
+  # over determinate results (indeterminates stay at LR 1, as in computeDiagnostic), LR CIs on log scale
+  z = _z(level)
+  out = {}
+  for i, m in enumerate(MODS):
+    (fn, tn), (ind_pos, ind_neg), (tp, fp) = counts.tests[i]  # rows NEG, INDET, POS; columns ref +/-
+    se0, sp0 = engine.TEST_SE_SP[m]
+    lp0, ln0 = engine.TEST_LR[m]
+    n_pos, n_neg = tp + fn, fp + tn
+    d = {"ref": "autopsy" if m == engine.PET_MOD else "PET",
+         "counts": {"pos": [int(tp), int(fp)], "indet": [int(ind_pos), int(ind_neg)], "neg": [int(fn), int(tn)]}}
+    d["se"] = _entry(tp / n_pos, *wilson(tp, n_pos, level), n_pos) if n_pos else _entry(se0)
+    d["sp"] = _entry(tn / n_neg, *wilson(tn, n_neg, level), n_neg) if n_neg else _entry(sp0)
+    if n_pos and n_neg and tp and fp and fn and tn:
+      lp, ln = (tp / n_pos) / (fp / n_neg), (fn / n_pos) / (tn / n_neg)
+      s_p = np.sqrt(1 / tp - 1 / n_pos + 1 / fp - 1 / n_neg)
+      s_n = np.sqrt(1 / fn - 1 / n_pos + 1 / tn - 1 / n_neg)
+      d["lr_pos"] = _entry(lp, lp * np.exp(-z * s_p), lp * np.exp(z * s_p), n_pos + n_neg)
+      d["lr_neg"] = _entry(ln, ln * np.exp(-z * s_n), ln * np.exp(z * s_n), n_pos + n_neg)
+    else:
+      # an empty cell leaves an LR at 0 / inf; keep the current one until the cohort fills it
+      d["lr_pos"], d["lr_neg"] = _entry(lp0), _entry(ln0)
+    total = n_pos + n_neg + ind_pos + ind_neg
+    d["indet_rate"] = (ind_pos + ind_neg) / total if total else None
+    out[m] = d
+  return out
+
+def _monotone(y, w, increasing=True):
+  # Weighted pool-adjacent-violators: the closest (weighted least squares) monotone sequence to y
+  if not increasing:
+    return -_monotone(-y, w)
+  blocks = []  # [mean, weight, length]
+  for yi, wi in zip(y, w):
+    blocks.append([yi, wi, 1])
+    while len(blocks) > 1 and blocks[-2][0] > blocks[-1][0]:
+      (y1, w1, n1), (y2, w2, n2) = blocks.pop(-2), blocks.pop()
+      blocks.append([(y1 * w1 + y2 * w2) / (w1 + w2), w1 + w2, n1 + n2])
+  return np.concatenate([np.full(n, b) for b, _, n in blocks])
+
+def lr_curves(counts, min_count=MIN_CURVE_COUNT):
+  # {modality: {"values", "lr", "n"}} density-ratio LR curves from the raw-value histograms; only
+  # assays with at least two pooled cells get one
+  out = {}
+  for i, m in enumerate(MODS):
+    h, vsum = counts.values[i], counts.value_sum[i]
+    n_pos, n_neg = h[:, 0].sum(), h[:, 1].sum()
+    if m == engine.PET_MOD or n_pos < 2 * min_count or n_neg < 2 * min_count:
+      continue
+    groups, acc = [], np.zeros(3)
+    for j in np.flatnonzero(h.sum(axis=1)):
+      acc += (h[j, 0], h[j, 1], vsum[j])
+      if acc[0] >= min_count and acc[1] >= min_count:
+        groups.append(acc)
+        acc = np.zeros(3)
+    if acc.any():
+      groups[-1] = groups[-1] + acc  # short tail joins the last full cell
+    if len(groups) < 2:
+      continue
+    k_pos, k_neg, vs = np.array(groups).T
+    x = vs / (k_pos + k_neg)
+    log_lr = np.log(k_pos / n_pos) - np.log(k_neg / n_neg)
+    w = 1 / (1 / k_pos + 1 / k_neg)  # inverse variance of each log LR
+    up = np.cov(x, log_lr, aweights=w)[0, 1] >= 0
+    out[m] = {"values": x.tolist(), "lr": np.exp(_monotone(log_lr, w, up)).tolist(),
+              "n": (k_pos + k_neg).astype(int).tolist()}
+  return out
+
+def fit_prior(counts, level=LEVEL):
+  # PRIOR_ANCHORS and APOE_OR by maximum likelihood of updateAutoPrior's model on the binned counts:
+  #   P(A+) = expit(logit(lerp(age; y0[stage], y1[stage])) + log OR[genotype])
+  # with e3e3 and "unknown" fixed at OR 1. Fisher scoring from the current constants; a parameter
+  # with no data behind it (e.g. y1 when nobody is over 50) stays put.
+  n, k = counts.prior_n.reshape(-1), counts.prior_k.reshape(-1)
+  S, A, G = counts.prior_n.shape
+  s_idx, _, g_idx = (a.reshape(-1) for a in np.meshgrid(np.arange(S), np.arange(A), np.arange(G), indexing="ij"))
+  keep = n > 0
+  n, k, s_idx, g_idx = n[keep], k[keep], s_idx[keep], g_idx[keep]
+  age = counts.prior_age.reshape(-1)[keep] / n
+  w = np.clip((age - 50) / 40, 0.0, 1.0)
+  # parameters: y0, y1 per stage, then log OR per free genotype
+  free_g = [j for j, g in enumerate(engine.GENOTYPES) if g not in ("e3e3", "unknown")]
+  names = [(s, end) for s in engine.STAGES for end in ("age50", "age90")] + [(engine.GENOTYPES[j], "or") for j in free_g]
+  theta = np.array([v for s in engine.STAGES for v in engine.PRIOR_ANCHORS[s]] + [np.log(engine.APOE_OR[engine.GENOTYPES[j]]) for j in free_g])
+  J = np.zeros((len(n), len(theta)))
+  J[np.arange(len(n)), 2 * s_idx], J[np.arange(len(n)), 2 * s_idx + 1] = 1 - w, w
+  g_col = np.array([2 * S + free_g.index(j) if j in free_g else -1 for j in g_idx], dtype=int)
+  has_g = g_col >= 0
+  rows_g = np.flatnonzero(has_g)
+  # a parameter is identified only if some cell loads on it
+  active = (n[:, None] * (J != 0)).sum(axis=0) > 0
+  active[2 * S:] = [bool(n[g_idx == j].sum()) for j in free_g]
+  lo_y, hi_y = 0.01, 0.99
+
+  def model(t):
+    b = np.clip(t[2 * s_idx] * (1 - w) + t[2 * s_idx + 1] * w, lo_y, hi_y)
+    z = engine.logit(b) + np.where(has_g, t[g_col], 0.0)
+    # dz/dy0, dz/dy1 = (1-w, w) / (b(1-b)); dz/dlogOR = 1
+    D = J / (b * (1 - b))[:, None]
+    D[rows_g, g_col[rows_g]] = 1.0
+    ll = float((k * z - n * np.logaddexp(0, z)).sum())
+    return engine.expit(z), D, ll
+
+  t = theta.copy()
+  p, D, ll = model(t)
+  for _ in range(FIT_ITER):
+    grad = D.T @ (k - n * p)
+    info = (D * (n * p * (1 - p))[:, None]).T @ D
+    a = np.flatnonzero(active)
+    step = np.zeros_like(t)
+    # least squares: a stage seen at a single age pins only a mix of its two anchors (min-norm step)
+    step[a] = np.linalg.lstsq(info[np.ix_(a, a)], grad[a], rcond=None)[0]
+    # step-halving keeps the likelihood rising and the anchors inside the PWA's clamp
+    for _ in range(30):
+      cand = t + step
+      cand[:2 * S] = np.clip(cand[:2 * S], lo_y, hi_y)
+      p_c, D_c, ll_c = model(cand)
+      if ll_c >= ll - 1e-12:
+        break
+      step /= 2
+    done = abs(ll_c - ll) < FIT_TOL * (1 + abs(ll))
+    t, p, D, ll = cand, p_c, D_c, ll_c
+    if done:
+      break
+  info = (D * (n * p * (1 - p))[:, None]).T @ D
+  a = np.flatnonzero(active)
+  cov = np.full((len(t), len(t)), np.nan)
+  cov[np.ix_(a, a)] = np.linalg.pinv(info[np.ix_(a, a)])
+  # no interval for parameters the data cannot separate (loading on the information's null space)
+  vals, vecs = np.linalg.eigh(info[np.ix_(a, a)])
+  null = vecs[:, vals <= 1e-9 * max(vals.max(initial=0.0), 1e-300)]
+  cov[a[np.abs(null).max(axis=1, initial=0.0) > 1e-6], :] = np.nan
+  se = np.sqrt(np.diag(cov))
+  z = _z(level)
+  # cases behind each parameter: the stage's (or genotype's) cases
+  n_stage = counts.prior_n.sum(axis=(1, 2))
+  n_geno = counts.prior_n.sum(axis=(0, 1))
+  anchors, odds = {}, {}
+  for i, (key, what) in enumerate(names):
+    if what == "or":
+      j = engine.GENOTYPES.index(key)
+      odds[key] = _entry(np.exp(t[i]), np.exp(t[i] - z * se[i]), np.exp(t[i] + z * se[i]), n_geno[j]) if active[i] \
+        else _entry(engine.APOE_OR[key])
+    else:
+      s = engine.STAGES.index(key)
+      e = _entry(t[i], max(lo_y, t[i] - z * se[i]), min(hi_y, t[i] + z * se[i]), n_stage[s]) if active[i] \
+        else _entry(engine.PRIOR_ANCHORS[key][what == "age90"])
+      anchors.setdefault(key, {})[what] = e
+  for g in ("e3e3", "unknown"):
+    odds[g] = _entry(engine.APOE_OR[g], n=n_geno[engine.GENOTYPES.index(g)])
+  return anchors, {g: odds[g] for g in engine.GENOTYPES}, ll
+
+def calibrate(paths, prior_ref="either", level=LEVEL, chunk=CHUNK):
+  # Files -> new parameter set (JSON-friendly): every value as {"value", "lo", "hi", "n"}, plus a
+  # "params" block with the bare values in the engine's layout (PRIOR_ANCHORS / APOE_OR / TEST_LR /
+  # TEST_SE_SP / PET_SE, PET_SP)
+  if prior_ref not in PRIOR_REFS:
+    raise ValueError(f"prior_ref must be one of {PRIOR_REFS}")
+  counts = Counts()
+  for path in paths:
+    for block in read_chunks(path, chunk):
+      counts.add(block, prior_ref)
+  return estimates(counts, level, prior_ref)
+
+def estimates(counts, level=LEVEL, prior_ref="either"):
+  anchors, odds, ll = fit_prior(counts, level)
+  tests = test_estimates(counts, level)
+  pet = tests[engine.PET_MOD]
+  params = {
+    "PRIOR_ANCHORS": {s: [anchors[s]["age50"]["value"], anchors[s]["age90"]["value"]] for s in engine.STAGES},
+    "APOE_OR": {g: odds[g]["value"] for g in engine.GENOTYPES},
+    "TEST_LR": {m: [tests[m]["lr_pos"]["value"], tests[m]["lr_neg"]["value"]] for m in MODS},
+    "TEST_SE_SP": {m: [tests[m]["se"]["value"], tests[m]["sp"]["value"]] for m in MODS},
+    "PET_SE": pet["se"]["value"], "PET_SP": pet["sp"]["value"],
+    "LR_CURVES": lr_curves(counts),
+  }
+  return {"rows": counts.rows, "bad_rows": counts.bad, "prior_cases": int(counts.prior_n.sum()), "prior_ref": prior_ref,
+          "level": level, "log_likelihood": ll, "PRIOR_ANCHORS": anchors, "APOE_OR": odds, "TEST_LIBRARY": tests,
+          "params": params}
+
+if __name__ == "__main__":
+  # python ptau217_calibrate.py cohort.csv [more.ndjson ...] [-o params.json] [--prior-ref either|autopsy|pet]
+  ap = argparse.ArgumentParser(description="Estimate prior anchors, APOE ORs and test Se/Sp/LRs from labelled cases")
+  ap.add_argument("paths", nargs="+", help=".csv, .ndjson / .jsonl, or - for NDJSON on stdin")
+  ap.add_argument("-o", "--out", default="-")
+  ap.add_argument("--prior-ref", choices=PRIOR_REFS, default="either")
+  ap.add_argument("--level", type=float, default=LEVEL)
+  args = ap.parse_args()
+  text = json.dumps(calibrate(args.paths, args.prior_ref, args.level), indent=1)
+  if args.out == "-":
+    print(text)
+  else:
+    with open(args.out, "w", encoding="utf-8", newline="\n") as f:
+      f.write(text + "\n")
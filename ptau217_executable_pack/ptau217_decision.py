@@ -0,0 +1,70 @@
+# ptau217_decision.py — decision curves and triage yield over a whole grid of cutoffs
+# A cohort's posteriors are sorted once (descending) and the outcomes cumulated in that order, so the
+# patients at or above any cutoff are a prefix and every cutoff's counts are one searchsorted away:
+# net benefit, number needed to scan, PET scans avoided and the false-eligible rate for 0.01..0.99
+# cost a sort plus O(cutoffs), not a re-scoring per threshold. Patients at or above the cutoff are
+# triage-eligible (sent on to PET / therapy work-up); those below are spared the scan. Outcomes are the
+# simulator's latent statuses, or, for a real scored cohort without them, the posteriors themselves
+# (the model's expected counts).
+import numpy as np
+import ptau217_engine as engine
+
+CUTOFFS = np.round(np.arange(1, 100) / 100, 2)
+
+def decision_curves(p, outcome=None, cutoffs=CUTOFFS):
+  # p: posteriors (one layer), outcome: True/1 for truly positive (None = expected counts under p).
+  # -> dict of arrays over `cutoffs`:
+  #   eligible, tp, fp:        patients at or above the cutoff, and the true / false positives among them
+  #   net_benefit:             (tp - fp * c/(1-c)) / n, against net_benefit_all (everyone eligible) and 0
+  #   nns:                     number needed to scan per true positive found (eligible / tp)
+  #   scans_avoided:           share of the cohort below the cutoff (PET scans spared vs scanning all)
+  #   false_eligible_rate:     fp / truly negative
+  #   sensitivity, ppv
+  p = np.asarray(p, dtype=float).ravel()
+  y = p if outcome is None else np.asarray(outcome, dtype=float).ravel()
+  c = np.asarray(cutoffs, dtype=float)
+  n = len(p)
+  order = np.argsort(-p)  # ties need no order: searchsorted takes or leaves them together
+  desc = p[order]
+  cum_y = np.concatenate(([0.0], np.cumsum(y[order])))
+  # patients with p >= c: desc is descending, so count those not below c from the ascending view
+  eligible = n - np.searchsorted(desc[::-1], c, side="left")
+  tp = cum_y[eligible]
+  fp = eligible - tp
+  pos = cum_y[-1]
+  w = c / (1 - c)
+  with np.errstate(divide="ignore", invalid="ignore"):
+    return {
+      "cutoff": c, "n": n, "prevalence": pos / n if n else np.nan,
+      "eligible": eligible, "tp": tp, "fp": fp,
+      "net_benefit": (tp - fp * w) / n,
+      "net_benefit_all": (pos - (n - pos) * w) / n,
+      "nns": np.where(tp > 0, eligible / tp, np.inf),
+      "scans_avoided": (n - eligible) / n,
+      "false_eligible_rate": fp / (n - pos),
+      "sensitivity": tp / pos,
+      "ppv": np.where(eligible > 0, tp / eligible, np.nan),
+    }
+
+def rescore(arrays, workup, score_lr=None, pet_se=engine.PET_SE, pet_sp=engine.PET_SP):
+  # Simulator output (simulate(..., keep=True)[1]) re-scored with edited LRs ({mod: (lr_pos, lr_neg)})
+  # or PET Se/Sp, reusing its priors and results -> engine.posterior's final {"pet", "autopsy"} layers
+  lrs = dict(engine.TEST_LR, **(score_lr or {}))
+  tests = [engine.Test(arrays["cats"][:, k], *lrs[mod], pet=mod == engine.PET_MOD) for k, mod in enumerate(workup)]
+  out = engine.posterior(arrays["prior"], tests, pet_se, pet_sp, steps=False)
+  return {"pet": out["pet"][0], "autopsy": out["autopsy"][0]}
+
+def simulation_curves(arrays, layer="autopsy", posterior=None, cutoffs=CUTOFFS):
+  # Decision curves of the simulator's layer against its latent truth: autopsy status for "autopsy",
+  # PET status for "pet"; `posterior` replaces the stored one (e.g. from rescore())
+  p = arrays[layer] if posterior is None else posterior
+  return decision_curves(p, arrays["amyloid" if layer == "autopsy" else "pet_pos"], cutoffs)
+
+def case_curves(cases, layer="autopsy", cutoffs=CUTOFFS):
+  # [case dict] -> model-based curves (no truth labels) for the cases' final `layer` posteriors, one
+  # row per cutoff (JSON friendly: None where undefined, e.g. nns with no one eligible)
+  out = engine.score(*engine.case_columns(cases), steps=False)
+  d = decision_curves(out[layer][0], None, cutoffs)
+  num = lambda v: float(v) if np.isfinite(v) else None
+  per_cutoff = [k for k, v in d.items() if np.ndim(v) == 1]
+  return [{k: num(d[k][i]) for k in per_cutoff} for i in range(len(d["cutoff"]))]
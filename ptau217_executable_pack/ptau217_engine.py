@@ -0,0 +1,573 @@
+# ptau217_engine.py — vectorised NumPy port of the app.js diagnostic math
+# Same pipeline as the PWA (priorFromAgeStage -> applyAPOEonOdds -> PET-layer updates in
+# computeDiagnostic -> bounded PET->autopsy mixture in computeAutopsyPosteriors), but every
+# function takes whole arrays of cases, so millions of rows are scored in one call.
+# Keep the constants below in step with app.js.
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+import base64, hashlib, json, math, sys
+import numpy as np
+
+APOE_OR = {"unknown":1.0,"e3e3":1.0,"e2e2":0.6,"e2e3":0.6,"e2e4":2.6,"e3e4":3.5,"e4e4":12.0}
+PRIOR_ANCHORS = {"CN":(0.10,0.44),"SCD":(0.12,0.43),"MCI":(0.27,0.71),"DEM":(0.60,0.85)}
+# TEST_LIBRARY default LRs (pos, neg); indeterminate results always use LR 1.0, as in computeDiagnostic
+TEST_LR = {
+  "amyloid_pet": (9.20, 0.089),
+  "csf_abeta42_40_lumipulse": (13.14, 0.086),
+  "csf_ptau181_abeta42_elecsys": (8.27, 0.101),
+  "plasma_abeta42_40_generic": (5.67, 0.176),
+  "plasma_ptau217_generic": (15.33, 0.085),
+  "plasma_ptau217_abeta42_lumipulse": (12.00, 0.043),
+}
+# TEST_LIBRARY Se/Sp behind those LRs (LR+ = Se/(1-Sp), LR- = (1-Se)/Sp); PET's are vs autopsy
+TEST_SE_SP = {
+  "amyloid_pet": (0.92, 0.90),
+  "csf_abeta42_40_lumipulse": (0.92, 0.93),
+  "csf_ptau181_abeta42_elecsys": (0.91, 0.89),
+  "plasma_abeta42_40_generic": (0.85, 0.85),
+  "plasma_ptau217_generic": (0.92, 0.94),
+  "plasma_ptau217_abeta42_lumipulse": (0.96, 0.92),
+}
+PET_MOD = "amyloid_pet"
+DEFAULT_MOD = "plasma_ptau217_generic"
+DEFAULT_AGE, DEFAULT_STAGE, DEFAULT_APOE = 70.0, "MCI", "unknown"  # the age/stage/apoe inputs' defaults
+PET_SE, PET_SP = 0.92, 0.90  # PET vs autopsy defaults (pet_se_dx / pet_sp_dx)
+TRIAGE_CUTOFF = 0.80         # getTriageCutoff() default (triage_thresh)
+# computePrognostic: annual conversion hazards (A+, A-) per baseline stage (h_cn_* / h_mci_* defaults)
+PROG_HAZARDS = {"CN": (0.03, 0.01), "MCI": (0.21, 0.063)}
+PROG_RISK_MAX = 0.999
+
+# Integer codes used by the array API (index into these tuples)
+STAGES = tuple(PRIOR_ANCHORS)
+GENOTYPES = tuple(APOE_OR)
+CATEGORIES = ("neg", "indet", "pos")
+NEG, INDET, POS = range(3)
+
+def anchor_array():
+  # (len(STAGES), 2) age-50/age-90 anchors, read from PRIOR_ANCHORS at call time
+  return np.array([PRIOR_ANCHORS[s] for s in STAGES])
+
+def odds_ratio_array():
+  return np.array([APOE_OR[g] for g in GENOTYPES])
+
+# One test in an ordered workup, as parallel arrays (scalars broadcast):
+#   cat     CATEGORIES codes; lr_pos/lr_neg the LRs for this test (vs PET)
+#   pet     True where the modality is amyloid PET itself (observed, not updated)
+#   used    False where the case has no such test (the step is skipped)
+#   log_lr  optional precomputed log(LR) per case (case_tests gathers it from the ParamSet tables);
+#           None = taken from cat/lr_pos/lr_neg. Clear it (_replace(log_lr=None)) when editing the LRs.
+Test = namedtuple("Test", "cat lr_pos lr_neg pet used log_lr", defaults=(False, True, None))
+
+def codes(values, vocab, default=None):
+  # Labels -> integer codes into vocab; unknown labels map to default or raise ValueError.
+  # Only the distinct labels are looked up, so this stays cheap for millions of rows.
+  values = np.asarray(values)
+  if values.dtype.kind in "iu":
+    return values
+  uniq, inv = np.unique(values.astype(str), return_inverse=True)
+  index = {v: i for i, v in enumerate(vocab)}
+  lut = []
+  for u in uniq.tolist():
+    if u in index:
+      lut.append(index[u])
+    elif default is not None:
+      lut.append(index[default])
+    else:
+      raise ValueError(f"unknown value {u!r} (expected one of {', '.join(vocab)})")
+  return np.array(lut, dtype=np.int64)[inv].reshape(values.shape)
+
+def lerp_anchors(age, y0, y1):
+  # priorFromAgeStage for given anchors: lerp between age 50 (y0) and 90 (y1), clamped to [0.01, 0.99]
+  age = np.asarray(age, dtype=float)
+  p = np.where(age <= 50, y0, np.where(age >= 90, y1, y0 + (age - 50) / 40 * (y1 - y0)))
+  return np.clip(p, 0.01, 0.99)
+
+def prior_from_age_stage(age, stage):
+  a = anchor_array()[stage]
+  return lerp_anchors(age, a[..., 0], a[..., 1])
+
+def apply_apoe_on_odds(p, odds_ratio):
+  # applyAPOEonOdds: p -> odds x OR -> p, clamped away from 0/1 on both sides
+  p = np.clip(p, 1e-6, 1 - 1e-6)
+  o = p / (1 - p) * odds_ratio
+  return np.clip(o / (1 + o), 1e-6, 1 - 1e-6)
+
+def prior_formula(age, stage, apoe):
+  # updateAutoPrior without the table: stage/apoe as STAGES/GENOTYPES codes
+  return apply_apoe_on_odds(prior_from_age_stage(age, stage), odds_ratio_array()[apoe])
+
+# --- Precomputed prior table: age grid x stage x genotype ---
+# Shipped to the PWA as prior_table.json (cached by the service worker). Both sides use it for
+# ages on the grid and fall back to the formula elsewhere, so lookups never change a result.
+PRIOR_TABLE_FORMAT = 1
+PRIOR_TABLE_AGES = (18, 100)  # the age input's range; the prior is flat outside 50-90 anyway
+PRIOR_TABLE_STEP = 1.0        # years between grid points (the PWA's age input steps by 1)
+
+def prior_source():
+  # The constants the table is derived from; a table whose source differs from these is stale
+  return {"anchors": {s: list(PRIOR_ANCHORS[s]) for s in STAGES}, "apoe_or": {g: APOE_OR[g] for g in GENOTYPES}}
+
+class PriorTable:
+  def __init__(self, values, step, age_min=PRIOR_TABLE_AGES[0], source=None, version=None):
+    self.values = values  # (ages, len(STAGES), len(GENOTYPES)) float64
+    self.step, self.age_min = float(step), float(age_min)
+    self.age_max = self.age_min + (values.shape[0] - 1) * self.step
+    self.source = source or prior_source()
+    self.version = version or hashlib.sha256(json.dumps(
+      [PRIOR_TABLE_FORMAT, self.source, self.age_min, self.step, values.shape[0]], sort_keys=True).encode()).hexdigest()[:12]
+
+  @classmethod
+  def build(cls, step=PRIOR_TABLE_STEP, ages=PRIOR_TABLE_AGES):
+    n = int(round((ages[1] - ages[0]) / step)) + 1
+    age = ages[0] + np.arange(n) * float(step)
+    stage, apoe = np.meshgrid(np.arange(len(STAGES)), np.arange(len(GENOTYPES)), indexing="ij")
+    values = prior_formula(age[:, None, None], stage, apoe)
+    return cls(values, step, ages[0])
+
+  def is_current(self):
+    return self.source == prior_source()
+
+  def cells(self, age, stage, apoe):
+    # Flat index into values for ages on the grid (after clamping to the table's range), -1 elsewhere
+    age = np.clip(np.asarray(age, dtype=float), self.age_min, self.age_max)
+    pos = (age - self.age_min) / self.step
+    i = np.rint(pos)
+    off = pos != i  # also true for NaN ages
+    n_s, n_g = self.values.shape[1:]
+    return np.where(off, -1, (np.where(off, 0, i).astype(np.int64) * n_s + stage) * n_g + apoe)
+
+  def lookup(self, age, stage, apoe, cells=None):
+    # O(1) per case for ages on the grid; others use the formula. `cells` reuses a cells() result.
+    cell = self.cells(age, stage, apoe) if cells is None else cells
+    off = cell < 0
+    age = np.clip(np.asarray(age, dtype=float), self.age_min, self.age_max)
+    if off.all():
+      return prior_formula(age, stage, apoe)
+    p = self.values.reshape(-1)[np.where(off, 0, cell)]
+    if off.any():
+      st, ap = np.broadcast_to(stage, off.shape)[off], np.broadcast_to(apoe, off.shape)[off]
+      p[off] = prior_formula(age[off], st, ap)
+    return p
+
+  def to_json(self):
+    # Values as base64 little-endian float64: exact, and about a third of the size of decimal JSON
+    return json.dumps({"format": PRIOR_TABLE_FORMAT, "version": self.version, "source": self.source,
+                       "age_min": self.age_min, "age_max": self.age_max, "step": self.step,
+                       "stages": list(STAGES), "genotypes": list(GENOTYPES),
+                       "values": base64.b64encode(self.values.astype("<f8").tobytes()).decode("ascii")}, indent=1)
+
+  @classmethod
+  def from_json(cls, text):
+    d = json.loads(text)
+    if d.get("format") != PRIOR_TABLE_FORMAT or d["stages"] != list(STAGES) or d["genotypes"] != list(GENOTYPES):
+      raise ValueError("prior table layout does not match this engine")
+    values = np.frombuffer(base64.b64decode(d["values"]), dtype="<f8").reshape(-1, len(STAGES), len(GENOTYPES))
+    return cls(values.astype(float), d["step"], d["age_min"], d["source"], d["version"])
+
+_prior_tables = {}
+
+def prior_table(step=PRIOR_TABLE_STEP):
+  # Cached per (constants, step): editing PRIOR_ANCHORS or APOE_OR makes the next call rebuild
+  key = (json.dumps(prior_source(), sort_keys=True), float(step))
+  t = _prior_tables.get(key)
+  if t is None:
+    _prior_tables.clear()
+    t = _prior_tables[key] = PriorTable.build(step)
+  return t
+
+def clinical_prior(age, stage, apoe, prior_override=None, cells=False):
+  # updateAutoPrior plus the manual override of computeDiagnostic (NaN = no override). cells=True also
+  # returns each case's prior-table cell (-1 off the grid or overridden), for ParamSet.envelope_at().
+  table = prior_table()
+  cell = table.cells(age, stage, apoe)
+  p = table.lookup(age, stage, apoe, cell)
+  if prior_override is not None:
+    override = np.asarray(prior_override, dtype=float)
+    p = np.where(np.isnan(override), p, np.clip(override, 1e-6, 1 - 1e-6))
+    cell = np.where(np.isnan(override), cell, -1)
+  return (p, cell) if cells else p
+
+def pet_prior(prior, se, sp):
+  # priorPETfromD: P(PET+) at the clinical prior
+  return se * prior + (1 - sp) * (1 - prior)
+
+def pet_ppv(se, sp, prev):
+  return se * prev / (se * prev + (1 - sp) * (1 - prev))
+
+def pet_npv(se, sp, prev):
+  return sp * (1 - prev) / ((1 - se) * prev + sp * (1 - prev))
+
+def lr_for_category(cat, lr_pos, lr_neg):
+  return np.where(cat == POS, lr_pos, np.where(cat == NEG, lr_neg, 1.0))
+
+def bounded_mixture(q, lo, hi):
+  # PET -> autopsy: q*PPV + (1-q)*(1-NPV), kept inside the [1-NPV, PPV] envelope
+  return np.maximum(lo, np.minimum(hi, q * hi + (1 - q) * lo))
+
+def logit(p):
+  return np.log(p) - np.log1p(-p)
+
+def expit(x):
+  # Logistic without overflow; +/-inf map to exactly 1 / 0
+  e = np.exp(-np.abs(x))
+  return np.where(x >= 0, 1 / (1 + e), e / (1 + e))
+
+# --- Compiled parameter set: log-LRs per test/category and memoised PPV/NPV envelopes ---
+ENVELOPE_CACHE = 4096  # scalar priors kept per ParamSet (LRU)
+
+@lru_cache(maxsize=256)
+def log_lr_table(lr_pos, lr_neg):
+  # log(LR) by CATEGORIES code (indeterminate = log 1), so a step's log-LRs are one gather
+  with np.errstate(divide="ignore"):
+    t = np.log(np.array([lr_neg, 1.0, lr_pos], dtype=float))
+  t.flags.writeable = False
+  return t
+
+def step_log_lr(t):
+  # A Test row's log(LR) per case: its precompiled log_lr, else gathered from log_lr_table when its LRs
+  # are scalars (no log per case)
+  if t.log_lr is not None:
+    return t.log_lr
+  cat = np.asarray(t.cat)
+  if np.ndim(t.lr_pos) == 0 and np.ndim(t.lr_neg) == 0 and cat.dtype.kind in "iu":
+    return log_lr_table(float(t.lr_pos), float(t.lr_neg))[cat]
+  with np.errstate(divide="ignore"):
+    return np.log(lr_for_category(cat, t.lr_pos, t.lr_neg))
+
+class ParamSet:
+  # TEST_LR and PET Se/Sp compiled once: read-only log-LR tables per modality, and the envelope
+  # (P(PET+) at the prior, its log-odds, PPV, NPV) memoised per prior value: for every prior-table
+  # cell (filled on first use, gathered by index in batch scoring) and in a bounded LRU for scalar
+  # priors. Cohorts whose ages sit on the table grid skip the envelope arithmetic entirely.
+  def __init__(self, test_lr=None, pet_se=PET_SE, pet_sp=PET_SP, cache=ENVELOPE_CACHE):
+    self.test_lr = {m: (float(p), float(n)) for m, (p, n) in (TEST_LR if test_lr is None else test_lr).items()}
+    self.pet_se, self.pet_sp = float(pet_se), float(pet_sp)
+    # log-LR tables stacked as (self.mods[modality], CATEGORIES code), gathered by case_tests
+    self.mods = {m: j for j, m in enumerate(self.test_lr)}
+    self.log_lr_matrix = np.array([log_lr_table(*self.test_lr[m]) for m in self.mods]).reshape(-1, len(CATEGORIES))
+    self.log_lr_matrix.flags.writeable = False
+    self.cache = cache
+    self._lru = OrderedDict()
+    self._cells = (None, None)  # (prior table version, envelope arrays per cell)
+    self.hits = self.misses = 0
+
+  def envelope(self, prior):
+    # (q0, logit q0, ppv, npv) at one scalar prior
+    p = float(prior)
+    e = self._lru.get(p)
+    if e is not None:
+      self._lru.move_to_end(p)
+      self.hits += 1
+      return e
+    self.misses += 1
+    e = self._lru[p] = _envelope(p, self.pet_se, self.pet_sp)
+    if len(self._lru) > self.cache:
+      self._lru.popitem(last=False)
+    return e
+
+  def cell_envelopes(self, table):
+    # The envelope over every cell of a PriorTable as four flat arrays, computed once per table version
+    if self._cells[0] != table.version:
+      self._cells = (table.version, _envelope(table.values.reshape(-1), self.pet_se, self.pet_sp))
+    return self._cells[1]
+
+  def envelope_at(self, prior, cell, pet_se=None, pet_sp=None):
+    # Envelope arrays for a batch: gathered for on-grid cells (cell >= 0) when the cases use this set's
+    # PET Se/Sp, computed only for the rest (off-grid ages, overrides) or for other Se/Sp
+    se = self.pet_se if pet_se is None else np.asarray(pet_se, dtype=float)
+    sp = self.pet_sp if pet_sp is None else np.asarray(pet_sp, dtype=float)
+    if not (np.all(se == self.pet_se) and np.all(sp == self.pet_sp)):
+      return _envelope(np.asarray(prior, dtype=float), se, sp)
+    if np.ndim(prior) == 0:
+      return self.envelope(prior)
+    off = np.asarray(cell) < 0
+    env = [v[np.where(off, 0, cell)] for v in self.cell_envelopes(prior_table())]
+    if off.any():
+      for v, w in zip(env, _envelope(np.asarray(prior)[off], self.pet_se, self.pet_sp)):
+        v[off] = w
+    return tuple(env)
+
+def _envelope(prior, se, sp):
+  q0 = pet_prior(prior, se, sp)
+  if np.ndim(q0) == 0:
+    return q0, math.log(q0) - math.log1p(-q0), pet_ppv(se, sp, prior), pet_npv(se, sp, prior)
+  return q0, logit(q0), pet_ppv(se, sp, prior), pet_npv(se, sp, prior)
+
+_param_sets = {}
+
+def param_set():
+  # ParamSet for the current module constants; editing TEST_LR / PET_SE / PET_SP makes the next call rebuild
+  key = (json.dumps(TEST_LR, sort_keys=True), PET_SE, PET_SP)
+  ps = _param_sets.get(key)
+  if ps is None:
+    _param_sets.clear()
+    ps = _param_sets[key] = ParamSet(TEST_LR, PET_SE, PET_SP)
+  return ps
+
+def envelope(prior, pet_se=PET_SE, pet_sp=PET_SP):
+  # (q0, logit q0, ppv, npv) at the clinical prior; scalars under the default PET Se/Sp are memoised
+  if np.ndim(prior) == 0 and np.ndim(pet_se) == 0 and np.ndim(pet_sp) == 0:
+    ps = param_set()
+    if float(pet_se) == ps.pet_se and float(pet_sp) == ps.pet_sp:
+      return ps.envelope(prior)
+  return _envelope(np.asarray(prior, dtype=float), np.asarray(pet_se, dtype=float), np.asarray(pet_sp, dtype=float))
+
+def posterior(prior, tests, pet_se=PET_SE, pet_sp=PET_SP, steps=True, env=None):
+  # Ordered tests -> PET layer P(PET+) and autopsy-layer P(A+), in log-odds space: the PET log-odds
+  # accumulate log(LR) per step and are converted back once per reported step (once in total with
+  # steps=False), instead of a toOdds/fromOdds round trip per test.
+  # PET layer: a PET step is observed (+inf / -inf log-odds, unchanged if indeterminate) and a
+  #   collapsed layer stays put under later LRs; a later PET observation replaces it.
+  # Autopsy layer: the bounded mixture of the current PET layer, except that the first PET step
+  #   fixes it (PPV / 1-NPV, or the pre-PET value if indeterminate) for every later step, as in
+  #   computeAutopsyPosteriors ("PET already observed").
+  # env: a precomputed (q0, logit q0, ppv, npv), e.g. from ParamSet.envelope_at(); else envelope()
+  q0, L0, ppv, npv = envelope(prior, pet_se, pet_sp) if env is None else env
+  q0 = np.asarray(q0)
+  lo, hi = 1 - npv, ppv
+  shape = np.broadcast(q0, *(np.asarray(t.cat) for t in tests)).shape
+  L = np.broadcast_to(L0, shape)
+  fixed, fixed_at = np.zeros(shape, dtype=bool), np.zeros(shape)
+  pet_steps, aut_steps = [], []
+  for t in tests:
+    cat, pet, used = np.asarray(t.cat), np.asarray(t.pet, dtype=bool), np.asarray(t.used, dtype=bool)
+    observed = used & pet
+    dl = np.where(used & ~pet, step_log_lr(t), 0.0)
+    first = observed & ~fixed
+    if first.any():
+      fixed_at = np.where(first, np.where(cat == POS, hi, np.where(cat == NEG, lo, bounded_mixture(expit(L), lo, hi))), fixed_at)
+      fixed = fixed | observed
+    L = np.where(observed & (cat == POS), np.inf, np.where(observed & (cat == NEG), -np.inf,
+                 np.where(np.isinf(L), L, L + dl)))
+    if steps:
+      q = expit(L)
+      pet_steps.append(q)
+      aut_steps.append(np.where(fixed, fixed_at, bounded_mixture(q, lo, hi)))
+  if not steps:
+    q = expit(L)
+    pet_steps, aut_steps = [q], [np.where(fixed, fixed_at, bounded_mixture(q, lo, hi))]
+  return {"pet_prior": q0, "ppv": ppv, "npv": npv, "pet": pet_steps, "autopsy": aut_steps, "log_odds": L}
+
+def score(age, stage, apoe, tests, prior_override=None, pet_se=PET_SE, pet_sp=PET_SP, steps=True, params=None):
+  # Full pipeline on arrays: stage/apoe as STAGES/GENOTYPES codes (see codes()), tests as Test rows.
+  # The PPV/NPV envelope comes from `params` (default: param_set()) wherever the prior is a table cell.
+  prior, cell = clinical_prior(age, stage, apoe, prior_override, cells=True)
+  env = (params or param_set()).envelope_at(prior, cell, pet_se, pet_sp)
+  out = posterior(prior, tests, pet_se, pet_sp, steps, env)
+  out["prior"] = prior
+  return out
+
+# --- Prognosis: computePrognostic's constant-hazard mixture as whole risk curves ---
+PROG_STAGES = tuple(PROG_HAZARDS)
+_risk_terms = {}
+
+def prognosis_stage(stage):
+  # Stage names (diagnostic STAGES included) -> PROG_STAGES codes; like computePrognostic, anything
+  # but CN uses the MCI hazards
+  return codes(["CN" if s == "CN" else "MCI" for s in np.atleast_1d(stage)], PROG_STAGES)
+
+def risk_terms(horizon=10, steps_per_year=12, hazards=None):
+  # (times, risk) with times = 0, 1/steps_per_year, ..., horizon years and risk[stage, 0|1, k] =
+  # 1 - (1 - h)^t for the A+ / A- hazards. Cached per (hazards, grid) and read-only, so thousands of
+  # curves share one set of power terms.
+  hz = tuple(tuple(map(float, (hazards or PROG_HAZARDS)[s])) for s in PROG_STAGES)
+  key = (hz, float(horizon), int(steps_per_year))
+  terms = _risk_terms.get(key)
+  if terms is None:
+    if len(_risk_terms) >= 32:
+      _risk_terms.clear()
+    times = np.arange(int(round(horizon * steps_per_year)) + 1) / steps_per_year
+    risk = -np.expm1(times * np.log1p(-np.array(hz))[..., None])
+    times.setflags(write=False)
+    risk.setflags(write=False)
+    terms = _risk_terms[key] = (times, risk)
+  return terms
+
+def risk_curves(p_amyloid, stage=None, horizon=10, steps_per_year=12, hazards=None):
+  # P(A+) x [1-(1-h_A+)^t] + (1-P(A+)) x [1-(1-h_A-)^t], clamped to [0, PROG_RISK_MAX], at every
+  # time of risk_terms(). p_amyloid: array of n posteriors; stage: PROG_STAGES codes (one per value,
+  # or one for all) -> (times, curves of shape (n, K)); stage=None -> curves for every stage, (S, n, K).
+  times, risk = risk_terms(horizon, steps_per_year, hazards)
+  pa = np.asarray(p_amyloid, dtype=float)[..., None]
+  neg, gap = risk[:, 1], risk[:, 0] - risk[:, 1]  # A- risk and the A+ excess, per stage
+  if stage is None:
+    curves = pa * gap[:, None] + neg[:, None]
+  else:
+    stage = np.asarray(stage)
+    curves = pa * gap[stage]
+    curves += neg[stage]
+  return times, np.clip(curves, 0, PROG_RISK_MAX, out=curves)
+
+def risk_at(p_amyloid, stage, years, hazards=None):
+  # computePrognostic's single t-year risk (no grid), for any t
+  h = np.array([(hazards or PROG_HAZARDS)[s] for s in PROG_STAGES], dtype=float)[np.asarray(stage)]
+  years = np.asarray(years, dtype=float)
+  pa = np.asarray(p_amyloid, dtype=float)
+  r_pos, r_neg = -np.expm1(years * np.log1p(-h[..., 0])), -np.expm1(years * np.log1p(-h[..., 1]))
+  return np.clip(pa * r_pos + (1 - pa) * r_neg, 0, PROG_RISK_MAX)
+
+# --- Continuous results: LR as a function of the measured value ---
+# Per assay, a density-ratio table f(value | PET+) / f(value | PET-) at ascending breakpoints, compiled
+# once into flat float arrays; a lookup is a binary search plus a linear interpolation of log(LR) (flat
+# beyond the end points), all in np.interp, so a column of raw lab values costs about what the
+# category lookup does. A value result enters the workup as a POS step carrying its own LR, which
+# every consumer of Test rows already supports. No tables ship with the pack: load a site's (or
+# ptau217_calibrate's) with load_lr_curves().
+class LrCurve:
+  def __init__(self, values, lrs, unit=""):
+    x, lr = np.asarray(values, dtype=float), np.asarray(lrs, dtype=float)
+    if x.ndim != 1 or x.shape != lr.shape or len(x) < 2:
+      raise ValueError("an LR curve needs matching value and LR lists of at least two points")
+    if not (np.all(np.diff(x) > 0) and np.all(lr > 0) and np.all(np.isfinite(lr))):
+      raise ValueError("LR curve values must be strictly ascending and LRs finite and positive")
+    self.x, self.log_lr, self.unit = x, np.log(lr), unit
+
+  def log_lr_at(self, value):
+    # NaN (missing) values give NaN
+    return np.interp(np.asarray(value, dtype=float), self.x, self.log_lr)
+
+  def __call__(self, value):
+    return np.exp(self.log_lr_at(value))
+
+  def to_dict(self):
+    return {"unit": self.unit, "values": self.x.tolist(), "lr": np.exp(self.log_lr).tolist()}
+
+LR_CURVES = {}  # modality -> LrCurve
+
+def load_lr_curves(tables):
+  # {modality: {"values": [...], "lr": [...], "unit": ...}} (a dict, or a path to such JSON; also the
+  # whole output of ptau217_calibrate, whose curves sit in "params" -> "LR_CURVES") -> compiled into
+  # LR_CURVES. Every curve is built and checked first, so a bad table leaves LR_CURVES as it was.
+  if isinstance(tables, str):
+    with open(tables, encoding="utf-8") as f:
+      tables = json.load(f)
+  if not isinstance(tables, dict):
+    raise ValueError("LR curves must be a JSON object of modality tables")
+  params = tables.get("params", tables)
+  tables = params.get("LR_CURVES", tables) if isinstance(params, dict) else tables
+  curves = {}
+  for mod, t in tables.items():
+    if mod not in TEST_LR or mod == PET_MOD:
+      raise ValueError(f"no continuous LR for modality: {mod}")
+    if not isinstance(t, dict) or "values" not in t or "lr" not in t:
+      raise ValueError(f"LR curve for {mod} needs \"values\" and \"lr\" lists")
+    curves[mod] = LrCurve(t["values"], t["lr"], t.get("unit", ""))
+  LR_CURVES.update(curves)
+  return LR_CURVES
+
+def value_test(mod, value, curves=None):
+  # A column of raw results for one assay -> Test row; missing (NaN) values count as indeterminate
+  curve = (LR_CURVES if curves is None else curves).get(mod)
+  if curve is None:
+    raise ValueError(f"no LR curve loaded for {mod}")
+  lr = curve(value)
+  return Test(np.where(np.isnan(lr), INDET, POS), np.where(np.isnan(lr), 1.0, lr), 1.0)
+
+# --- JSON case objects (the runner's /api/posterior schema) ---
+def float_column(cases, key, default=np.nan):
+  # One numeric field of every case; missing or blank ("" / None) gives `default`
+  return np.array([default if c.get(key) in (None, "") else float(c[key]) for c in cases], dtype=float)
+
+def case_steps(c):
+  # A case's ordered workup as [(mod, cat, lr_pos, lr_neg, value)]: its "tests" list if present, else
+  # Test A plus Test B when modB is given and useB isn't "no"; value is the raw result ("value",
+  # "valueA"/"valueB") when the case gives one instead of a category, else None. Every step needs
+  # its result: a missing category is an error, never a default.
+  if "tests" in c:
+    if not isinstance(c["tests"], list) or not all(isinstance(t, dict) for t in c["tests"]):
+      raise ValueError("tests must be a list of test objects")
+    steps = [(t.get("mod"), t.get("cat"), t.get("lr_pos"), t.get("lr_neg"), t.get("value")) for t in c["tests"]]
+    names = [f"tests[{k}].cat (or .value)" for k in range(len(steps))]
+  else:
+    steps = [(c.get("modA"), c.get("catA"), c.get("lrA_pos"), c.get("lrA_neg"), c.get("valueA"))]
+    names = ["catA (or valueA)"]
+    if c.get("modB") is not None and c.get("useB", True) not in (False, "no"):
+      steps.append((c["modB"], c.get("catB"), c.get("lrB_pos"), c.get("lrB_neg"), c.get("valueB")))
+      names.append("catB (or valueB)")
+  for (_, cat, _, _, value), name in zip(steps, names):
+    if cat in (None, "") and value in (None, ""):
+      raise ValueError(f"{name} is required")
+  return steps
+
+def case_tests(cases):
+  # Ragged per-case workups -> one Test of column arrays per step; short workups are padded with used=False.
+  # Raw values are gathered per step and modality and looked up in one vectorised call per curve. Each
+  # step's log-LRs are gathered from param_set()'s tables; only cases with their own LRs or a raw value
+  # take a log.
+  ps = param_set()
+  steps = [case_steps(c) for c in cases]
+  tests = []
+  for k in range(max(2, max(map(len, steps), default=0))):
+    cat, lr_pos, lr_neg, pet, used, values, mods, own = [], [], [], [], [], {}, [], []
+    for i, s in enumerate(steps):
+      mod, k_cat, lp, ln, value = s[k] if k < len(s) else (None, "indet", None, None, None)
+      mod = mod or DEFAULT_MOD
+      if mod not in ps.test_lr:
+        raise ValueError(f"unknown modality: {mod}")
+      if value not in (None, ""):
+        if mod not in LR_CURVES:
+          raise ValueError(f"no LR curve loaded for {mod}")
+        rows, vals = values.setdefault(mod, ([], []))
+        rows.append(i)
+        vals.append(float(value))
+        k_cat = "pos"
+      elif k_cat not in CATEGORIES:
+        raise ValueError(f"unknown category: {k_cat}")
+      cat.append(CATEGORIES.index(k_cat))
+      lr_pos.append(float(ps.test_lr[mod][0] if lp is None else lp))
+      lr_neg.append(float(ps.test_lr[mod][1] if ln is None else ln))
+      pet.append(mod == PET_MOD)
+      used.append(k < len(s))
+      mods.append(ps.mods[mod])
+      own.append(lp is not None or ln is not None)
+    cat, lr_pos, lr_neg, own = np.array(cat), np.array(lr_pos), np.array(lr_neg), np.array(own, dtype=bool)
+    for mod, (rows, v) in values.items():
+      t = value_test(mod, v)
+      cat[rows], lr_pos[rows], own[rows] = t.cat, t.lr_pos, True
+    log_lr = ps.log_lr_matrix[np.array(mods, dtype=np.intp), cat]
+    if own.any():
+      with np.errstate(divide="ignore"):
+        log_lr[own] = np.log(lr_for_category(cat[own], lr_pos[own], lr_neg[own]))
+    tests.append(Test(cat, lr_pos, lr_neg, np.array(pet), np.array(used), log_lr))
+  return tests
+
+def case_columns(cases, tests=case_tests):
+  # [case dict] -> (age, stage, apoe, tests, prior_override, pet_se, pet_sp) in score()'s argument order,
+  # with the app's defaults for missing fields (NaN override = none); `tests` builds the workup column
+  # (e.g. the uncertainty module's count tests)
+  return (float_column(cases, "age", DEFAULT_AGE),
+          codes([c.get("stage", DEFAULT_STAGE) for c in cases], STAGES, default=DEFAULT_STAGE),
+          codes([c.get("apoe", DEFAULT_APOE) for c in cases], GENOTYPES, default=DEFAULT_APOE),
+          tests(cases), float_column(cases, "prior_override"),
+          float_column(cases, "pet_se", PET_SE), float_column(cases, "pet_sp", PET_SP))
+
+def score_cases(cases):
+  # [case dict] -> [result dict] with prior, pet_prior, ppv, npv and either pet_A/AB + autopsy_A/AB
+  # (Test A/B cases) or pet_steps + autopsy_steps (cases with an ordered "tests" list)
+  cols = case_columns(cases)
+  tests = cols[3]
+  out = score(*cols)
+  base = {k: out[k].tolist() for k in ("prior", "pet_prior", "ppv", "npv")}
+  pet = np.stack(out["pet"], axis=1).tolist()
+  aut = np.stack(out["autopsy"], axis=1).tolist()
+  b_used = tests[1].used.tolist()
+  rows = []
+  for i, c in enumerate(cases):
+    r = {k: v[i] for k, v in base.items()}
+    if "tests" in c:
+      n = len(c["tests"])
+      r["pet_steps"], r["autopsy_steps"] = pet[i][:n], aut[i][:n]
+    else:
+      r["pet_A"], r["autopsy_A"] = pet[i][0], aut[i][0]
+      r["pet_AB"], r["autopsy_AB"] = (pet[i][1], aut[i][1]) if b_used[i] else (None, None)
+    rows.append(r)
+  return rows
+
+if __name__ == "__main__":
+  # python ptau217_engine.py prior_table.json [STEP] -> (re)write the PWA's prior table blob
+  if len(sys.argv) < 2:
+    sys.exit("usage: ptau217_engine.py OUT.json [STEP_YEARS]")
+  table = PriorTable.build(float(sys.argv[2]) if len(sys.argv) > 2 else PRIOR_TABLE_STEP)
+  with open(sys.argv[1], "w", encoding="utf-8", newline="\n") as f:
+    f.write(table.to_json() + "\n")
+  print(f"wrote {sys.argv[1]}: {table.values.shape[0]} ages x {len(STAGES)} stages x {len(GENOTYPES)} genotypes, version {table.version}")
@@ -0,0 +1,164 @@
+# ptau217_planner.py — which test next? Expected-value planning over the test library
+# Dynamic programming over (PET-layer log-odds bucket, tests already used, tests left to run):
+# log-LRs add up, so every ordering of the same tests with the same results lands in the same state
+# and is solved once (memoised) instead of enumerating n!/(n-k)! sequences x 2^k outcomes. Results
+# are predicted from the current PET layer and each test's Se/Sp vs PET (for PET itself,
+# P(PET+) is the PET layer), with the same conditional independence the posterior assumes; the plan
+# is adaptive, so the test after a positive may differ from the one after a negative. The last
+# test of a plan only depends on what was already used as an exclusion, so that layer is solved for
+# every reachable bucket at once in NumPy and each bucket keeps its tests ranked.
+from collections import namedtuple
+from functools import lru_cache
+import math
+import numpy as np
+import ptau217_engine as engine
+
+# Relative cost per test (illustrative, like the TEST_LIBRARY defaults; use the site's own tariff)
+TEST_COST = {
+  "amyloid_pet": 20.0,
+  "csf_abeta42_40_lumipulse": 6.0,
+  "csf_ptau181_abeta42_elecsys": 6.0,
+  "plasma_abeta42_40_generic": 1.0,
+  "plasma_ptau217_generic": 1.0,
+  "plasma_ptau217_abeta42_lumipulse": 1.2,
+}
+DEPTH = 3            # tests planned ahead
+LOGIT_STEP = 0.001   # PET-layer log-odds bucket width of the memo
+OBJECTIVES = ("information", "triage")
+
+LibraryTest = namedtuple("LibraryTest", "mod se sp lr_pos lr_neg cost pet")
+
+def default_library(costs=None):
+  # TEST_SE_SP / TEST_LR / TEST_COST as LibraryTest rows; site libraries pass their own rows
+  costs = dict(TEST_COST, **(costs or {}))
+  return [LibraryTest(m, se, sp, *engine.TEST_LR[m], costs.get(m, 0.0), m == engine.PET_MOD)
+          for m, (se, sp) in engine.TEST_SE_SP.items()]
+
+def binary_entropy(p):
+  # bits; scalar or array
+  p = np.clip(np.asarray(p, dtype=float), 0.0, 1.0)
+  with np.errstate(divide="ignore", invalid="ignore"):
+    h = -(p * np.log2(p) + (1 - p) * np.log2(1 - p))
+  h = np.where((p <= 0) | (p >= 1), 0.0, h)
+  return float(h) if h.ndim == 0 else h
+
+def plan(prior, library=None, depth=DEPTH, exclude=(), pet_layer=None, pet_se=engine.PET_SE, pet_sp=engine.PET_SP,
+         cutoff=engine.TRIAGE_CUTOFF, layer="autopsy", objective="information", cost_weight=0.0):
+  # Best next test for one patient at clinical prior `prior` (PET layer `pet_layer` if tests have
+  # already been applied; their mods go in `exclude`). Each option's figures are for the best
+  # adaptive continuation up to `depth` tests:
+  #   info_gain: expected entropy reduction (bits) of the `layer` posterior ("autopsy" or "pet")
+  #   p_cross:   probability the final posterior ends on the other side of `cutoff` than now
+  #   cost:      expected total cost (later tests are only paid for on branches that run them)
+  # `objective` picks what is maximised, less cost_weight x cost; stopping is always an option,
+  # so with cost_weight > 0 a test is only proposed when it is worth its cost.
+  if objective not in OBJECTIVES:
+    raise ValueError(f"objective must be one of {OBJECTIVES}")
+  if layer not in ("pet", "autopsy"):
+    raise ValueError("layer must be 'pet' or 'autopsy'")
+  lib = list(default_library() if library is None else library)
+  q0, _, ppv, npv = engine.envelope(prior, pet_se, pet_sp)
+  hi, lo = float(ppv), 1 - float(npv)
+  q_now = float(q0) if pet_layer is None else float(pet_layer)
+  if not 0 < q_now < 1:
+    raise ValueError("PET layer already collapsed (PET observed); nothing left to plan")
+  to_bucket = lambda L: round(L / LOGIT_STEP)
+  b_now = to_bucket(math.log(q_now) - math.log1p(-q_now))
+
+  def layer_p(q):
+    return q if layer == "pet" else engine.bounded_mixture(q, lo, hi)
+  p_now = float(layer_p(q_now))
+  above_now = p_now >= cutoff
+
+  def stop(p):
+    # (utility, entropy, crossed, cost) of ending at posterior p
+    h, crossed = binary_entropy(p), float((p >= cutoff) != above_now)
+    return (-h if objective == "information" else crossed), h, crossed, 0.0
+
+  def stop_arrays(p):
+    h = binary_entropy(p)
+    crossed = ((p >= cutoff) != above_now).astype(float)
+    return (-h if objective == "information" else crossed), h, crossed
+
+  def branches(t, L):
+    # [(probability, log-odds after, or None once PET is observed, terminal posterior)]
+    q = 1 / (1 + math.exp(-L))
+    if t.pet:
+      return [(q, None, 1.0 if layer == "pet" else hi), (1 - q, None, 0.0 if layer == "pet" else lo)]
+    p_pos = t.se * q + (1 - t.sp) * (1 - q)
+    return [(p_pos, L + math.log(t.lr_pos), None), (1 - p_pos, L + math.log(t.lr_neg), None)]
+
+  def take(i, b, used, left):
+    # Run library test i now, then continue optimally: (utility, entropy, crossed, cost, next per outcome)
+    t = lib[i]
+    acc, after = [-cost_weight * t.cost, 0.0, 0.0, t.cost], []
+    for prob, L, p_end in branches(t, b * LOGIT_STEP):
+      if L is None:
+        r, nxt = stop(p_end), None
+      else:
+        v = value(to_bucket(L), used | 1 << i, left - 1)
+        r, nxt = v[:4], v[4]
+      for j in range(4):
+        acc[j] += prob * r[j]
+      after.append(nxt)
+    return (*acc, after)
+
+  better = lambda r, best: r[0] > best[0] + 1e-12 or (r[0] > best[0] - 1e-12 and r[3] < best[3])
+
+  # Last layer: every test's outcome-averaged (utility, entropy, crossed, cost) for each bucket within
+  # reach of depth-1 earlier tests, and per bucket the tests ranked by utility then cost
+  step_max = max([abs(math.log(t.lr_pos)) for t in lib if not t.pet] + [abs(math.log(t.lr_neg)) for t in lib if not t.pet] + [0.0])
+  reach = math.ceil(max(depth - 1, 0) * step_max / LOGIT_STEP) + 1
+  b_lo = b_now - reach
+  L = (b_lo + np.arange(2 * reach + 1)) * LOGIT_STEP
+  q = engine.expit(L)
+  last = np.zeros((4, len(L), len(lib)))
+  for i, t in enumerate(lib):
+    if t.pet:
+      pos, neg = stop_arrays(np.full_like(q, 1.0 if layer == "pet" else hi)), stop_arrays(np.full_like(q, 0.0 if layer == "pet" else lo))
+      p_pos = q
+    else:
+      bucketed = lambda x: engine.expit(np.round(x / LOGIT_STEP) * LOGIT_STEP)
+      pos, neg = stop_arrays(layer_p(bucketed(L + math.log(t.lr_pos)))), stop_arrays(layer_p(bucketed(L + math.log(t.lr_neg))))
+      p_pos = t.se * q + (1 - t.sp) * (1 - q)
+    for j in range(3):
+      last[j, :, i] = p_pos * pos[j] + (1 - p_pos) * neg[j]
+    last[0, :, i] -= cost_weight * t.cost
+    last[3, :, i] = t.cost
+  ranked = np.lexsort((last[3], -last[0]), axis=-1)
+
+  @lru_cache(maxsize=None)
+  def value(b, used, left):
+    # Best of stopping here or running one more unused test: (utility, entropy, crossed, cost, test index)
+    q = 1 / (1 + math.exp(-b * LOGIT_STEP))
+    best = (*stop(layer_p(q)), None)
+    if left == 0:
+      return best
+    if left == 1:
+      k = b - b_lo
+      i = next((int(i) for i in ranked[k] if not used >> int(i) & 1), None)
+      r = None if i is None else (*(float(x) for x in last[:, k, i]), i)
+      return r if r is not None and better(r, best) else best
+    for i in range(len(lib)):
+      if used >> i & 1:
+        continue
+      r = take(i, b, used, left)
+      # strictly better utility wins; near-ties go to the cheaper plan
+      if better(r, best):
+        best = (*r[:4], i)
+    return best
+
+  used0 = sum(1 << i for i, t in enumerate(lib) if t.mod in set(exclude))
+  h_now = binary_entropy(p_now)
+  options = []
+  for i, t in enumerate(lib):
+    if used0 >> i & 1:
+      continue
+    u, h, crossed, cost, after = take(i, b_now, used0, depth)
+    options.append({"test": t.mod, "utility": u, "info_gain": h_now - h, "p_cross": crossed, "cost": cost,
+                    "then": {"pos": None if after[0] is None else lib[after[0]].mod,
+                             "neg": None if after[1] is None else lib[after[1]].mod}})
+  options.sort(key=lambda o: (-o["utility"], o["cost"]))
+  best = value(b_now, used0, depth)
+  return {"best": None if best[4] is None else lib[best[4]].mod, "posterior": p_now, "entropy": h_now,
+          "options": options, "states": value.cache_info().currsize + len(L)}
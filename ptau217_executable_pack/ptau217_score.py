@@ -0,0 +1,324 @@
+# ptau217_score.py — score a whole cohort file from the command line
+# Reads CSV or NDJSON (or NDJSON on stdin) CHUNK rows at a time and turns each chunk into columns once:
+# EHR export headers are renamed per chunk (--map "Patient Age=age"), labels (stage, APOE, categories,
+# modalities) are normalised once per distinct value and numbers parsed column-wise, and the chunk is
+# scored in one vectorised engine.score() call and written straight out as CSV or NDJSON, so memory
+# stays at one chunk whatever the file size. A cell that cannot be read marks only its row as bad
+# (ok=false plus the error); the rest of the chunk is scored as usual. Progress goes to stderr.
+#
+# Rows: age, stage, apoe, optional prior_override / pet_se / pet_sp, and the workup as modA/catA/
+# modB/catB (lrA_pos... and valueA/valueB for raw assay values, as in /api/posterior), a "tests" list
+# (NDJSON), and/or one column per TEST_LIBRARY modality (its category, or "<modality>_value"), applied
+# in column order; a blank modality cell means that test was not done. Blank modA/catA/valueA likewise
+# means no step A, but a step given without its category or value fails its row.
+#   python ptau217_score.py cohort.csv -o out.csv --map "Age at draw=age" --keep MRN
+#   python run_ptau217_app.py score cohort.csv -o out.ndjson     (same, from the app / EXE)
+import argparse, csv, io, itertools, json, sys, time
+import numpy as np
+import ptau217_engine as engine
+from ptau217_calibrate import CATEGORY, MODS
+
+CHUNK = 1 << 16
+PROGRESS_EVERY = 2.0  # seconds between progress lines
+RESULTS = ("prior", "pet_prior", "ppv", "npv", "pet", "autopsy")
+FORMATS = ("csv", "ndjson")
+CSV_NUMBER = "{:.12g}".format  # results in CSV: 12 significant digits (NDJSON keeps full precision)
+CASE_KEYS = ("modA", "catA", "lrA_pos", "lrA_neg", "valueA", "modB", "catB", "lrB_pos", "lrB_neg", "valueB", "useB", "tests")
+BLANK = ("", None)
+
+def parse_mapping(specs):
+  # ["EHR header=field", ...] and/or JSON files ({"EHR header": "field"}) -> {header: field}
+  mapping = {}
+  for spec in specs or ():
+    if "=" in spec:
+      src, dst = spec.rsplit("=", 1)
+      mapping[src.strip()] = dst.strip()
+    else:
+      with open(spec, encoding="utf-8") as f:
+        mapping.update(json.load(f))
+  return mapping
+
+def read_blocks(path, chunk=CHUNK):
+  # A .csv / .ndjson / .jsonl file (or "-" for NDJSON on stdin) as ({column: [cell, ...]}, n, {row: error})
+  # per chunk of n rows; NDJSON lines that are not JSON objects are errors (read as empty rows)
+  f = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8") if path == "-" else open(path, newline="", encoding="utf-8-sig")
+  with f:
+    if path.lower().endswith(".csv"):
+      rows = csv.reader(f)
+      header = next(rows, [])
+      width = len(header)
+      while True:
+        block = list(itertools.islice(rows, chunk))
+        if not block:
+          return
+        cols = list(itertools.zip_longest(*block, fillvalue=""))[:width]
+        cols += [("",) * len(block)] * (width - len(cols))
+        yield dict(zip(header, cols)), len(block), {}
+    lines = (l for l in f if l.strip())
+    while True:
+      block = list(itertools.islice(lines, chunk))
+      if not block:
+        return
+      rows, errors = [], {}
+      for i, line in enumerate(block):
+        try:
+          r = json.loads(line)
+          if not isinstance(r, dict):
+            raise ValueError("each line must be a JSON object")
+        except ValueError as e:
+          r, errors[i] = {}, str(e)
+        rows.append(r)
+      keys = dict.fromkeys(k for r in rows for k in r)
+      yield {k: [r.get(k) for r in rows] for k in keys}, len(block), errors
+
+class Chunk:
+  # One block's columns under the engine's field names, read into arrays; bad cells are collected in
+  # `errors` ({row: message}, first one per row) instead of raising
+  def __init__(self, cols, n, errors=None, mapping=None):
+    self.n = n
+    self.errors = dict(errors or {})
+    self.cols = {}
+    for k, v in cols.items():
+      self.cols.setdefault((mapping or {}).get(k, k), v)
+
+  def fail(self, rows, message):
+    for i in np.flatnonzero(rows):
+      self.errors.setdefault(int(i), message)
+
+  def floats(self, key, default=np.nan, rows=None):
+    # Column -> float array, default where blank; unreadable or non-finite values are errors (only in
+    # `rows`, a mask, when given)
+    col = self.cols.get(key)
+    if col is None:
+      return np.full(self.n, default, dtype=float)
+    blank = np.array([v in BLANK for v in col])
+    vals = np.where(blank, default, np.array(col, dtype=object))
+    try:
+      out = vals.astype(float)
+    except (ValueError, TypeError):
+      out = np.full(self.n, default, dtype=float)
+      for i, v in enumerate(vals):
+        try:
+          out[i] = float(v)
+        except (ValueError, TypeError):
+          out[i] = np.nan
+          if rows is None or rows[i]:
+            self.errors.setdefault(i, f"{key} must be a number, got {v!r}")
+    bad = ~blank & ~np.isfinite(out)
+    self.fail(bad if rows is None else bad & rows, f"{key} must be a finite number")
+    return out
+
+  def labels(self, key, vocab, default, normalise=str, rows=None):
+    # Column -> codes into vocab, default where blank; each distinct label is normalised once
+    col = self.cols.get(key)
+    if col is None:
+      return np.full(self.n, vocab.index(default))
+    try:
+      distinct = set(col)
+    except TypeError:  # NDJSON lists / objects where a label belongs
+      col = [v if isinstance(v, (str, int, float, type(None))) else json.dumps(v) for v in col]
+      distinct = set(col)
+    index = {v: i for i, v in enumerate(vocab)}
+    lut = {}
+    for v in distinct:
+      try:
+        lut[v] = vocab.index(default) if v in BLANK else index.get(normalise(v), -1)
+      except (KeyError, ValueError, TypeError, AttributeError):
+        lut[v] = -1
+    out = np.fromiter(map(lut.__getitem__, col), dtype=np.int64, count=self.n)
+    for i in np.flatnonzero(out < 0 if rows is None else (out < 0) & rows):
+      self.errors.setdefault(int(i), f"unknown {key}: {col[i]!r}")
+    return np.maximum(out, 0)
+
+  def blank(self, key):
+    col = self.cols.get(key)
+    return np.ones(self.n, dtype=bool) if col is None else np.array([v in BLANK for v in col])
+
+def _stage(v):
+  return str(v).strip().upper()
+
+def _apoe(v):
+  return str(v).strip().lower().replace("ε", "e").replace("/", "").replace(" ", "")
+
+def _category(v):
+  return engine.CATEGORIES[CATEGORY[str(v).strip().lower()]]
+
+def _step(ch, mod, cat, lr_pos, lr_neg, value, used):
+  # Columns of one workup step (mod as codes into MODS) -> Test; raw values go through the mod's LR curve
+  lrs = np.array([engine.TEST_LR[m] for m in MODS])
+  lr_pos = np.where(np.isnan(lr_pos), lrs[mod, 0], lr_pos)
+  lr_neg = np.where(np.isnan(lr_neg), lrs[mod, 1], lr_neg)
+  has_value = used & ~np.isnan(value)
+  if has_value.any():
+    cat = cat.copy()
+  for m in np.unique(mod[has_value]):
+    rows = has_value & (mod == m)
+    if MODS[m] not in engine.LR_CURVES:
+      ch.fail(rows, f"no LR curve loaded for {MODS[m]}")
+      continue
+    t = engine.value_test(MODS[m], value[rows])
+    cat[rows], lr_pos[rows], lr_neg[rows] = t.cat, t.lr_pos, t.lr_neg
+  return engine.Test(np.where(used, cat, engine.INDET), lr_pos, lr_neg, mod == MODS.index(engine.PET_MOD), used)
+
+def chunk_tests(ch):
+  # The chunk's workups as Test rows: steps A and B (case form), then one step per modality column
+  tests = []
+  n = ch.n
+  if any(k in ch.cols for k in ("modA", "catA", "valueA")):
+    for s in ("A", "B"):
+      # step A is there unless modA, catA and valueA are all blank; B when modB is given (and useB not "no")
+      used = ~(ch.blank("modA") & ch.blank("catA") & ch.blank("valueA")) if s == "A" else ~ch.blank("modB")
+      if s == "B" and "useB" in ch.cols:
+        used = used & ~np.array([v in ("no", False) for v in ch.cols["useB"]])
+      if not used.any():
+        continue
+      # a step needs its result: a blank category is never read as positive
+      ch.fail(used & ch.blank("cat" + s) & ch.blank("value" + s), f"cat{s} (or value{s}) is required")
+      mod = ch.labels("mod" + s, MODS, engine.DEFAULT_MOD, rows=used)
+      cat = ch.labels("cat" + s, engine.CATEGORIES, "indet", _category, used)
+      lr_pos, lr_neg = ch.floats(f"lr{s}_pos", rows=used), ch.floats(f"lr{s}_neg", rows=used)
+      tests.append(_step(ch, mod, cat, lr_pos, lr_neg, ch.floats("value" + s, rows=used), used))
+  for key in ch.cols:
+    mod_name = key[:-6] if key.endswith("_value") else key
+    if mod_name not in MODS:
+      continue
+    mod = np.full(n, MODS.index(mod_name))
+    if key == mod_name:
+      cat, value = ch.labels(key, engine.CATEGORIES, "indet", _category), np.full(n, np.nan)
+    else:
+      cat, value = np.full(n, engine.INDET), ch.floats(key)
+    tests.append(_step(ch, mod, cat, np.full(n, np.nan), np.full(n, np.nan), value, ~ch.blank(key)))
+  return tests
+
+def _listed_tests(ch):
+  # Chunks with NDJSON "tests" lists: the engine's own case parser, row by row only where it fails
+  cases = [{k: ch.cols[k][i] for k in CASE_KEYS if k in ch.cols and ch.cols[k][i] not in BLANK} for i in range(ch.n)]
+  try:
+    return engine.case_tests(cases)
+  except (ValueError, TypeError, AttributeError):
+    for i, c in enumerate(cases):
+      try:
+        engine.case_tests([c])
+      except (ValueError, TypeError, AttributeError) as e:
+        ch.errors.setdefault(i, str(e))
+        cases[i] = {"tests": []}
+    return engine.case_tests(cases)
+
+def score_chunk(ch):
+  # -> {RESULTS name: float array} for every row of the chunk (bad rows included; see ch.errors)
+  age = ch.floats("age", engine.DEFAULT_AGE)
+  stage = ch.labels("stage", engine.STAGES, engine.DEFAULT_STAGE, _stage)
+  apoe = ch.labels("apoe", engine.GENOTYPES, engine.DEFAULT_APOE, _apoe)
+  override = ch.floats("prior_override")
+  pet_se, pet_sp = ch.floats("pet_se", engine.PET_SE), ch.floats("pet_sp", engine.PET_SP)
+  tests = _listed_tests(ch) if "tests" in ch.cols else chunk_tests(ch)
+  if not tests:
+    tests = [engine.Test(np.full(ch.n, engine.INDET), *engine.TEST_LR[engine.DEFAULT_MOD], used=np.zeros(ch.n, dtype=bool))]
+  out = engine.score(age, stage, apoe, tests, override, pet_se, pet_sp, steps=False)
+  return {"prior": out["prior"], "pet_prior": out["pet_prior"], "ppv": out["ppv"], "npv": out["npv"],
+          "pet": out["pet"][0], "autopsy": out["autopsy"][0]}
+
+def _csv_cell(v):
+  v = "" if v is None else str(v)
+  return '"' + v.replace('"', '""') + '"' if any(c in v for c in ',"\r\n') else v
+
+class Writer:
+  # CSV (one header) or NDJSON, a chunk at a time; `keep` input columns are copied in front. CSV lines
+  # are joined from per-column strings (only the free-text columns need quoting), several times faster
+  # than csv.writer on float cells.
+  def __init__(self, f, fmt, keep=()):
+    self.f, self.fmt, self.keep = f, fmt, tuple(keep)
+    self.fields = self.keep + ("line", "ok", "error") + RESULTS
+    if fmt == "csv":
+      f.write(",".join(map(_csv_cell, self.fields)) + "\n")
+
+  def write(self, cols, first_line, n, errors, results):
+    bad = np.zeros(n, dtype=bool)
+    bad[list(errors)] = True
+    text = [cols.get(k, (None,) * n) for k in self.keep] + [[errors.get(i) for i in range(n)]]
+    lines, ok = range(first_line, first_line + n), (~bad).tolist()
+    csv_out = self.fmt == "csv"
+    numbers = []
+    for k in RESULTS:
+      v = list(map(CSV_NUMBER, results[k].tolist())) if csv_out else results[k].tolist()
+      for i in np.flatnonzero(bad | ~np.isfinite(results[k])):
+        v[i] = "" if csv_out else None
+      numbers.append(v)
+    if csv_out:
+      text = [list(map(_csv_cell, c)) for c in text]
+      columns = text[:-1] + [map(str, lines), ["true" if v else "false" for v in ok], text[-1]] + numbers
+      self.f.write("".join(map("{}\n".format, map(",".join, zip(*columns)))))
+    else:
+      columns = text[:-1] + [lines, ok, text[-1]] + numbers
+      self.f.writelines(json.dumps(dict(zip(self.fields, r))) + "\n" for r in zip(*columns))
+    self.f.flush()
+
+def score_file(path, out, fmt="csv", mapping=None, keep=(), chunk=CHUNK, progress=None):
+  # Stream `path` into `out` chunk by chunk; progress(rows, bad, seconds) after every chunk.
+  # -> {"rows", "bad", "seconds", "rows_per_s"}
+  writer = Writer(out, fmt, keep)
+  rows = bad = 0
+  t0 = time.perf_counter()
+  for cols, n, errors in read_blocks(path, chunk):
+    ch = Chunk(cols, n, errors, mapping)
+    results = score_chunk(ch)
+    writer.write(cols, rows + 1, n, ch.errors, results)
+    rows += n
+    bad += len(ch.errors)
+    if progress:
+      progress(rows, bad, time.perf_counter() - t0)
+  dt = time.perf_counter() - t0
+  return {"rows": rows, "bad": bad, "seconds": dt, "rows_per_s": rows / dt if dt > 0 else None}
+
+def _progress(stream, every=PROGRESS_EVERY):
+  last = [0.0]
+  def report(rows, bad, dt):
+    if dt - last[0] >= every:
+      last[0] = dt
+      stream.write(f"{rows:,} rows ({bad:,} bad) in {dt:.1f} s, {rows / dt:,.0f} rows/s\n")
+      stream.flush()
+  return report
+
+def main(argv=None):
+  ap = argparse.ArgumentParser(prog="score", description="Score a cohort file (CSV / NDJSON) with the pTau217 engine")
+  ap.add_argument("input", help="cohort .csv, .ndjson / .jsonl, or - for NDJSON on stdin")
+  ap.add_argument("-o", "--output", default="-", help="output file (default stdout); .ndjson / .jsonl writes NDJSON")
+  ap.add_argument("--format", choices=FORMATS, default=None, help="output format (default: from -o, else csv)")
+  ap.add_argument("--map", action="append", default=[], metavar="HEADER=FIELD",
+                  help='rename an input column to a case field, e.g. "Patient Age=age" (repeatable), or a JSON '
+                       'file {"header": "field"}')
+  ap.add_argument("--keep", default="", metavar="COLS", help="comma-separated input columns copied to the output (e.g. an MRN)")
+  ap.add_argument("--chunk", type=int, default=CHUNK, help=f"rows per engine call (default {CHUNK})")
+  ap.add_argument("--lr-curves", default=None, metavar="FILE", help="LR curves for raw assay values (see engine.load_lr_curves)")
+  ap.add_argument("-q", "--quiet", action="store_true", help="no progress on stderr")
+  args = ap.parse_args(argv)
+  fmt = args.format or ("ndjson" if args.output.lower().endswith((".ndjson", ".jsonl")) else "csv")
+  if args.chunk < 1:
+    sys.exit("--chunk must be at least 1")
+  mapping = {}
+  for spec in args.map or ():
+    try:
+      mapping.update(parse_mapping([spec]))
+    except (OSError, ValueError, TypeError) as e:
+      sys.exit(f"cannot load column mapping from {spec}: {e}")
+  if args.lr_curves:
+    try:
+      engine.load_lr_curves(args.lr_curves)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+      sys.exit(f"cannot load LR curves from {args.lr_curves}: {e}")
+  keep = [k for k in args.keep.split(",") if k]
+  out = None
+  try:
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    summary = score_file(args.input, out, fmt, mapping, keep, args.chunk, None if args.quiet else _progress(sys.stderr))
+  except OSError as e:
+    sys.exit(f"{e.filename or args.input}: {e.strerror or e}")
+  finally:
+    if out not in (None, sys.stdout):
+      out.close()
+  if not args.quiet:
+    print(f"scored {summary['rows']:,} rows ({summary['bad']:,} bad) in {summary['seconds']:.2f} s, "
+          f"{summary['rows_per_s'] or 0:,.0f} rows/s", file=sys.stderr)
+
+if __name__ == "__main__":
+  main()
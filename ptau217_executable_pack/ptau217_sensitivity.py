@@ -0,0 +1,129 @@
+# ptau217_sensitivity.py — analytic sensitivity of ptau217_engine posteriors
+# Partial derivatives of the final PET-layer and autopsy-layer posteriors with respect to the
+# clinical prior, the LR applied at each step, PET Se/Sp vs autopsy and the APOE odds ratio, in one
+# vectorised pass: tangents are carried through the same log-odds step loop as engine.posterior
+# (forward mode), and PPV / 1-NPV have closed-form derivatives. A tornado ranking then comes from
+# that single evaluation instead of 2 x k finite-difference re-runs per case.
+import numpy as np
+import ptau217_engine as engine
+
+TORNADO_REL = 0.10  # default tornado swing: each input moved by +/-10% of its value
+
+def envelope_gradients(prior, se, sp):
+  # PPV (hi) and 1-NPV (lo) at the clinical prior, and their derivatives wrt prior, Se and Sp:
+  # with q0 = P(PET+) = se*prior + (1-sp)*(1-prior), hi = se*prior/q0 and lo = (1-se)*prior/(1-q0)
+  q0 = engine.pet_prior(prior, se, sp)
+  r0 = 1 - q0
+  hi, lo = se * prior / q0, (1 - se) * prior / r0
+  d_hi = {"prior": se * (1 - sp) / q0 ** 2,
+          "pet_se": prior * (1 - prior) * (1 - sp) / q0 ** 2,
+          "pet_sp": se * prior * (1 - prior) / q0 ** 2}
+  d_lo = {"prior": (1 - se) * sp / r0 ** 2,
+          "pet_se": -prior * (1 - prior) * sp / r0 ** 2,
+          "pet_sp": -(1 - se) * prior * (1 - prior) / r0 ** 2}
+  return q0, hi, lo, d_hi, d_lo
+
+def posterior_gradients(prior, tests, pet_se=engine.PET_SE, pet_sp=engine.PET_SP):
+  # engine.posterior(..., steps=False) plus d/d(prior, pet_se, pet_sp, lr1..lrK) of the final
+  # PET layer ("d_pet") and autopsy layer ("d_autopsy"); lrK is the LR applied at step K (LR+ if
+  # positive, LR- if negative), so its derivative is 0 for indeterminate, PET and unused steps.
+  prior = np.asarray(prior, dtype=float)
+  se, sp = np.asarray(pet_se, dtype=float), np.asarray(pet_sp, dtype=float)
+  q0, hi, lo, d_hi, d_lo = envelope_gradients(prior, se, sp)
+  shape = np.broadcast(q0, *(np.asarray(t.cat) for t in tests)).shape
+  names = ["prior", "pet_se", "pet_sp"] + [f"lr{k + 1}" for k in range(len(tests))]
+  zero = np.zeros(shape)
+  # dL0/dq0 = 1/(q0(1-q0)) and dq0/d(prior, se, sp) = (se+sp-1, prior, prior-1)
+  w = 1 / (q0 * (1 - q0))
+  dL = dict.fromkeys(names, zero)
+  dL.update(prior=zero + w * (se + sp - 1), pet_se=zero + w * prior, pet_sp=zero + w * (prior - 1))
+  L = np.broadcast_to(engine.logit(q0), shape)
+  fixed, fixed_at = np.zeros(shape, dtype=bool), np.zeros(shape)
+  d_fixed = dict.fromkeys(names, zero)
+  for k, t in enumerate(tests):
+    cat, pet, used = np.asarray(t.cat), np.asarray(t.pet, dtype=bool), np.asarray(t.used, dtype=bool)
+    observed = used & pet
+    first = observed & ~fixed
+    if first.any():
+      q = engine.expit(L)
+      mix, d_mix = _mixture_gradients(q, L, dL, hi, lo, d_hi, d_lo, names)
+      at = np.where(cat == engine.POS, hi, np.where(cat == engine.NEG, lo, mix))
+      fixed_at = np.where(first, at, fixed_at)
+      for n in names:
+        d_at = np.where(cat == engine.POS, d_hi.get(n, 0.0), np.where(cat == engine.NEG, d_lo.get(n, 0.0), d_mix[n]))
+        d_fixed[n] = np.where(first, d_at, d_fixed[n])
+      fixed = fixed | observed
+    lr = engine.lr_for_category(cat, t.lr_pos, t.lr_neg)
+    step = used & ~pet & (cat != engine.INDET) & np.isfinite(L)
+    with np.errstate(divide="ignore"):
+      L = np.where(observed & (cat == engine.POS), np.inf, np.where(observed & (cat == engine.NEG), -np.inf,
+                   np.where(step, L + np.log(lr), L)))
+    dL[f"lr{k + 1}"] = np.where(step, 1 / lr, 0.0)
+  q = engine.expit(L)
+  p, d_mix = _mixture_gradients(q, L, dL, hi, lo, d_hi, d_lo, names)
+  slope = q * (1 - q)
+  return {"pet": q, "autopsy": np.where(fixed, fixed_at, p),
+          "d_pet": {n: slope * dL[n] for n in names},
+          "d_autopsy": {n: np.where(fixed, d_fixed[n], d_mix[n]) for n in names}}
+
+def _mixture_gradients(q, L, dL, hi, lo, d_hi, d_lo, names):
+  # bounded_mixture(q, lo, hi) and its derivatives; when hi < lo (Se+Sp < 1) the clamp pins it to lo
+  slope = np.where(np.isfinite(L), q * (1 - q), 0.0)
+  inside = hi >= lo
+  d = {}
+  for n in names:
+    dm = slope * dL[n] * (hi - lo) + q * d_hi.get(n, 0.0) + (1 - q) * d_lo.get(n, 0.0)
+    d[n] = np.where(inside, dm, d_lo.get(n, 0.0))
+  return engine.bounded_mixture(q, lo, hi), d
+
+def score_gradients(age, stage, apoe, tests, prior_override=None, pet_se=engine.PET_SE, pet_sp=engine.PET_SP):
+  # engine.score's final step with gradients, adding the APOE odds ratio: the clinical prior is
+  # expit(logit(age/stage prior) + log OR), so d(prior)/d(OR) = prior(1-prior)/OR (0 when overridden)
+  prior = engine.clinical_prior(age, stage, apoe, prior_override)
+  out = posterior_gradients(prior, tests, pet_se, pet_sp)
+  odds_ratio = engine.odds_ratio_array()[np.asarray(apoe)]
+  d_prior = prior * (1 - prior) / odds_ratio
+  if prior_override is not None:
+    d_prior = np.where(np.isnan(np.asarray(prior_override, dtype=float)), d_prior, 0.0)
+  for layer in ("d_pet", "d_autopsy"):
+    out[layer]["apoe_or"] = out[layer]["prior"] * d_prior
+  out["inputs"] = {"prior": prior, "pet_se": np.asarray(pet_se, dtype=float), "pet_sp": np.asarray(pet_sp, dtype=float),
+                   "apoe_or": odds_ratio}
+  for k, t in enumerate(tests):
+    out["inputs"][f"lr{k + 1}"] = engine.lr_for_category(np.asarray(t.cat), t.lr_pos, t.lr_neg)
+  return out
+
+def tornado(out, layer="autopsy", rel=TORNADO_REL, ranges=None):
+  # Linearised tornado from score_gradients output: each input moved over `ranges[name]` = (low,
+  # high) if given, else its value -/+ rel*value. Returns (names, low, high, order) where low/high
+  # are the layer's posterior at each end, shape (inputs, cases), and order[:, i] ranks case i's
+  # inputs by swing |high - low|, largest first.
+  base = np.atleast_1d(out[layer])
+  grads = out["d_" + layer]
+  names = list(grads)
+  low, high = [], []
+  for n in names:
+    x = np.atleast_1d(out["inputs"][n]) if n in out["inputs"] else np.ones_like(base)
+    x0, x1 = (np.broadcast_to(np.asarray(v, dtype=float), base.shape) for v in ranges[n]) if ranges and n in ranges \
+      else (x * (1 - rel), x * (1 + rel))
+    g = np.broadcast_to(np.atleast_1d(grads[n]), base.shape)
+    low.append(base + g * (x0 - x))
+    high.append(base + g * (x1 - x))
+  low, high = np.array(low), np.array(high)
+  return names, low, high, np.argsort(-np.abs(high - low), axis=0, kind="stable")
+
+def case_tornado(cases, layer="autopsy", rel=TORNADO_REL):
+  # [case dict] -> per case, [{"input", "low", "high", "gradient"}] ranked by swing (JSON friendly)
+  cols = engine.case_columns(cases)
+  tests = cols[3]
+  out = score_gradients(*cols)
+  names, low, high, order = tornado(out, layer, rel)
+  grads = out["d_" + layer]
+  rows = []
+  for i, c in enumerate(cases):
+    n_steps = len(engine.case_steps(c))
+    skip = {f"lr{k + 1}" for k in range(n_steps, len(tests))}  # padding steps of shorter workups
+    rows.append([{"input": names[j], "low": float(low[j, i]), "high": float(high[j, i]),
+                  "gradient": float(np.broadcast_to(grads[names[j]], low.shape[1:])[i])}
+                 for j in order[:, i] if names[j] not in skip])
+  return rows
@@ -0,0 +1,157 @@
+# ptau217_simulate.py — synthetic cohorts for throughput and calibration studies
+# Draws patients (age, stage, APOE) from configurable distributions, a latent autopsy status from
+# the clinical prior, a PET status from PET Se/Sp vs autopsy and each workup test's result from its
+# Se/Sp vs PET (the model's own conditional independence), then scores them with ptau217_engine and
+# reports calibration, misclassification at the triage cutoff and triage yield for both layers.
+# Patients are generated in fixed-size chunks, each with its own SeedSequence child, and the chunks
+# are spread over a process pool; the summary only holds per-chunk sums, so 10^7 patients need no
+# more memory than one chunk (unless keep=True asks for the per-patient arrays).
+from concurrent.futures import ProcessPoolExecutor
+import argparse, json, os, sys
+import numpy as np
+import ptau217_engine as engine
+
+CHUNK = 1 << 18
+CALIBRATION_BINS = 20
+# Illustrative population; pass your clinic's mix as population={...}
+POPULATION = {
+  "age": ("uniform", 55.0, 85.0),   # or ("normal", mean, sd), clipped to PRIOR_TABLE_AGES
+  "stage": {"CN": 0.30, "SCD": 0.10, "MCI": 0.45, "DEM": 0.15},
+  "apoe": {"e3e3": 0.60, "e3e4": 0.23, "e2e3": 0.11, "e4e4": 0.02, "e2e4": 0.03, "e2e2": 0.01},
+}
+WORKUP = ("plasma_ptau217_generic",)
+LAYERS = ("pet", "autopsy")
+
+def _categorical(rng, weights, vocab, n):
+  # n codes into vocab drawn with the given {name: weight}
+  names = list(weights)
+  p = np.array([weights[k] for k in names], dtype=float)
+  return np.array([vocab.index(k) for k in names])[rng.choice(len(names), size=n, p=p / p.sum())]
+
+def draw_patients(rng, n, population=None):
+  # -> age, stage codes, APOE codes
+  pop = dict(POPULATION, **(population or {}))
+  kind, a, b = pop["age"]
+  age = rng.uniform(a, b, n) if kind == "uniform" else rng.normal(a, b, n)
+  age = np.clip(age, *engine.PRIOR_TABLE_AGES)
+  return age, _categorical(rng, pop["stage"], engine.STAGES, n), _categorical(rng, pop["apoe"], engine.GENOTYPES, n)
+
+def simulate_chunk(seed, n, population=None, workup=WORKUP, truth=None, score_lr=None,
+                   pet_se=engine.PET_SE, pet_sp=engine.PET_SP, cutoff=engine.TRIAGE_CUTOFF, keep=False):
+  # One chunk: patients -> latent statuses -> results -> engine posteriors. `truth` overrides the
+  # generating Se/Sp ({mod: (se, sp)}, PET's vs autopsy under "amyloid_pet"); `score_lr` overrides the
+  # LRs the engine scores with ({mod: (lr_pos, lr_neg)}), to test a parameter change against data
+  # generated from the current one. Returns (summary, arrays or None).
+  rng = np.random.default_rng(seed)
+  se_sp = dict(engine.TEST_SE_SP, **(truth or {}))
+  lrs = dict(engine.TEST_LR, **(score_lr or {}))
+  age, stage, apoe = draw_patients(rng, n, population)
+  prior = engine.clinical_prior(age, stage, apoe)
+  amyloid = rng.random(n) < prior
+  t_se, t_sp = se_sp[engine.PET_MOD]
+  pet_pos = rng.random(n) < np.where(amyloid, t_se, 1 - t_sp)
+  tests, cats = [], np.zeros((n, len(workup)), dtype=np.int8)
+  for k, mod in enumerate(workup):
+    if mod == engine.PET_MOD:
+      cat = np.where(pet_pos, engine.POS, engine.NEG)
+    else:
+      se, sp = se_sp[mod]
+      cat = np.where(rng.random(n) < np.where(pet_pos, se, 1 - sp), engine.POS, engine.NEG)
+    cats[:, k] = cat
+    tests.append(engine.Test(cat, *lrs[mod], pet=mod == engine.PET_MOD))
+  out = engine.posterior(prior, tests, pet_se, pet_sp, steps=False)
+  scored = {"pet": (out["pet"][0], pet_pos), "autopsy": (out["autopsy"][0], amyloid)}
+  summary = {"n": n, "amyloid": int(amyloid.sum()), "pet_pos": int(pet_pos.sum())}
+  for layer, (p, truth_pos) in scored.items():
+    summary[layer] = _layer_sums(p, truth_pos, cutoff)
+  arrays = None
+  if keep:
+    arrays = {"age": age, "stage": stage, "apoe": apoe, "prior": prior, "amyloid": amyloid, "pet_pos": pet_pos,
+              "cats": cats, "pet": out["pet"][0], "autopsy": out["autopsy"][0]}
+  return summary, arrays
+
+def _layer_sums(p, y, cutoff, bins=CALIBRATION_BINS):
+  # Additive statistics of predicted p vs outcome y: per-bin counts / sums for calibration, Brier and
+  # log-loss sums, and the patients flagged (p >= cutoff) and truly positive among them
+  k = np.minimum((p * bins).astype(int), bins - 1)
+  yf = y.astype(float)
+  pc = np.clip(p, 1e-15, 1 - 1e-15)
+  flagged = p >= cutoff
+  return {"bin_n": np.bincount(k, minlength=bins), "bin_p": np.bincount(k, weights=p, minlength=bins),
+          "bin_y": np.bincount(k, weights=yf, minlength=bins),
+          "brier": float(((p - yf) ** 2).sum()), "log_loss": float(-(yf * np.log(pc) + (1 - yf) * np.log1p(-pc)).sum()),
+          "flagged": int(flagged.sum()), "tp": int((flagged & y).sum())}
+
+def _merge(a, b):
+  if isinstance(a, dict):
+    return {k: _merge(a[k], b[k]) for k in a}
+  return a + b
+
+def report(summary, cutoff=engine.TRIAGE_CUTOFF):
+  # Summed chunk statistics -> per layer: calibration table, ECE, Brier / log loss and, at the
+  # cutoff the chunks were scored with, misclassification and triage yield
+  n = summary["n"]
+  res = {"n": n, "amyloid_rate": summary["amyloid"] / n, "pet_pos_rate": summary["pet_pos"] / n}
+  for layer in LAYERS:
+    s = summary[layer]
+    truth = summary["amyloid" if layer == "autopsy" else "pet_pos"]
+    bn = s["bin_n"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+      mean_p, rate = s["bin_p"] / bn, s["bin_y"] / bn
+    tp, flagged = s["tp"], s["flagged"]
+    fp, fn = flagged - tp, truth - tp
+    res[layer] = {
+      "calibration": [{"bin": [b / len(bn), (b + 1) / len(bn)], "n": int(bn[b]), "mean_predicted": float(mean_p[b]),
+                       "observed": float(rate[b])} for b in range(len(bn)) if bn[b]],
+      "ece": float(np.nansum(np.abs(mean_p - rate) * bn) / n),
+      "brier": s["brier"] / n, "log_loss": s["log_loss"] / n,
+      "cutoff": float(cutoff),
+      "flagged_rate": flagged / n,                                 # triage yield: share of patients eligible
+      "ppv": tp / flagged if flagged else None,                   # eligible who are truly positive
+      "sensitivity": tp / truth if truth else None,
+      "false_eligible_rate": fp / (n - truth) if n > truth else None,
+      "missed_rate": fn / truth if truth else None,
+      "misclassified": (fp + fn) / n,
+    }
+  return res
+
+def simulate(n, seed=0, workers=None, chunk=CHUNK, keep=False, cutoff=engine.TRIAGE_CUTOFF, **kw):
+  # n patients in ceil(n / chunk) chunks; chunk i always uses SeedSequence(seed).spawn(...)[i], so the
+  # result does not depend on the number of workers. workers=None uses every CPU; 1 stays in-process.
+  # Returns the report, plus the concatenated per-patient arrays when keep=True ("cats" holds each
+  # patient's workup results as NEG/POS codes, one column per test, for re-scoring).
+  sizes = [min(chunk, n - i) for i in range(0, n, chunk)]
+  seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+  workers = (os.cpu_count() or 1) if workers is None else workers
+  jobs = [(s, m, cutoff, keep, kw) for s, m in zip(seeds, sizes)]
+  if workers <= 1 or len(jobs) == 1:
+    results = [_chunk_job(j) for j in jobs]
+  else:
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+      results = list(pool.map(_chunk_job, jobs))
+  summary = results[0][0]
+  for s, _ in results[1:]:
+    summary = _merge(summary, s)
+  rep = report(summary, cutoff)
+  if not keep:
+    return rep
+  return rep, {k: np.concatenate([a[k] for _, a in results]) for k in results[0][1]}
+
+def _chunk_job(args):
+  seed, n, cutoff, keep, kw = args
+  return simulate_chunk(seed, n, cutoff=cutoff, keep=keep, **kw)
+
+if __name__ == "__main__":
+  # python ptau217_simulate.py N [--workers W] [--seed S] [--workup mod1,mod2] [--cutoff C] -> JSON report
+  ap = argparse.ArgumentParser(description="Simulate and score a synthetic cohort")
+  ap.add_argument("n", type=int)
+  ap.add_argument("--seed", type=int, default=0)
+  ap.add_argument("--workers", type=int, default=None)
+  ap.add_argument("--workup", default=",".join(WORKUP), help="comma-separated TEST_LIBRARY modalities, in order")
+  ap.add_argument("--cutoff", type=float, default=engine.TRIAGE_CUTOFF)
+  args = ap.parse_args()
+  workup = tuple(m for m in args.workup.split(",") if m)
+  unknown = [m for m in workup if m not in engine.TEST_SE_SP]
+  if unknown:
+    sys.exit(f"unknown modality: {', '.join(unknown)}")
+  print(json.dumps(simulate(args.n, args.seed, args.workers, workup=workup, cutoff=args.cutoff), indent=1))
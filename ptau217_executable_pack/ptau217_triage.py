@@ -0,0 +1,123 @@
+# ptau217_triage.py — what it takes to reach the therapy-triage cutoff
+# For whole batches of cases: the lowest clinical prior, the lowest LR of one more (non-PET) test and
+# the age at which the final PET-layer or autopsy-layer posterior meets the cutoff. Odds inversion
+# gives these in closed form wherever the posterior is a plain odds update or a PPV / 1-NPV; only the
+# prior under the bounded PET->autopsy mixture needs a (vectorised) bisection.
+import numpy as np
+import ptau217_engine as engine
+
+BISECT_STEPS = 60   # halvings of the logit(prior) bracket [-BISECT_SPAN, BISECT_SPAN]
+BISECT_SPAN = 30.0
+
+def log_lr_sums(tests):
+  # The case's workup reduced to what the inversions need, per case:
+  #   pet_sum:  log-odds the PET layer moves by over the workup (+/-inf once PET is observed)
+  #   aut_sum:  log-odds the autopsy mixture is evaluated at, relative to the PET prior (the sum up to
+  #             the first PET step, which fixes the autopsy layer, or the whole workup)
+  #   aut_kind: POS / NEG if the first PET step fixed the autopsy layer at PPV / 1-NPV, else INDET
+  #             (the mixture)
+  shape = np.broadcast(*(np.asarray(t.cat) for t in tests)).shape
+  pet_sum, aut_sum = np.zeros(shape), np.zeros(shape)
+  fixed, aut_kind = np.zeros(shape, dtype=bool), np.full(shape, engine.INDET)
+  for t in tests:
+    cat, pet, used = np.asarray(t.cat), np.asarray(t.pet, dtype=bool), np.asarray(t.used, dtype=bool)
+    observed = used & pet
+    first = observed & ~fixed
+    aut_kind = np.where(first, cat, aut_kind)
+    fixed = fixed | observed
+    dl = np.where(used & ~pet, engine.step_log_lr(t), 0.0)
+    pet_sum = np.where(observed & (cat == engine.POS), np.inf, np.where(observed & (cat == engine.NEG), -np.inf,
+                       np.where(np.isinf(pet_sum), pet_sum, pet_sum + dl)))
+    aut_sum = np.where(fixed, aut_sum, aut_sum + dl)
+  return pet_sum, aut_sum, aut_kind
+
+def _odds_prior(target, factor):
+  # Prior whose odds are odds(target) x factor
+  with np.errstate(divide="ignore", over="ignore"):
+    return engine.expit(engine.logit(target) + np.log(factor))
+
+def min_prior(tests, pet_se=engine.PET_SE, pet_sp=engine.PET_SP, cutoff=engine.TRIAGE_CUTOFF):
+  # Lowest clinical prior at which each layer's final posterior meets the cutoff -> {"pet", "autopsy"};
+  # 0 = met at any prior, inf = never (e.g. PET negative for the PET layer). Assumes Se + Sp > 1.
+  se, sp = np.asarray(pet_se, dtype=float), np.asarray(pet_sp, dtype=float)
+  pet_sum, aut_sum, aut_kind = log_lr_sums(tests)
+  c = float(cutoff)
+  # PET layer: expit(logit(q0) + sum) >= c  <=>  q0 >= expit(logit(c) - sum), q0 = se*prior + (1-sp)(1-prior)
+  with np.errstate(invalid="ignore"):
+    q0 = engine.expit(engine.logit(c) - pet_sum)
+    pet = (q0 - (1 - sp)) / (se + sp - 1)
+  pet = np.where(q0 > se, np.inf, np.clip(pet, 0.0, 1.0))
+  # Autopsy layer fixed by PET: PPV >= c  <=>  odds(prior) >= odds(c)(1-sp)/se; 1-NPV likewise with sp/(1-se)
+  closed = np.where(aut_kind == engine.POS, _odds_prior(c, (1 - sp) / se), _odds_prior(c, sp / (1 - se)))
+  # Mixture: increasing in the prior, so bisect logit(prior) for all those cases at once
+  shape = np.broadcast(aut_sum, se, sp).shape
+  mix = np.broadcast_to(aut_kind == engine.INDET, shape)
+  m_sum, m_se, m_sp = (np.broadcast_to(v, shape)[mix] for v in (aut_sum, se, sp))
+  def autopsy_at(x):
+    prior = engine.expit(x)
+    q = engine.expit(engine.logit(engine.pet_prior(prior, m_se, m_sp)) + m_sum)
+    return engine.bounded_mixture(q, 1 - engine.pet_npv(m_se, m_sp, prior), engine.pet_ppv(m_se, m_sp, prior))
+  lo = np.full(m_sum.shape, -BISECT_SPAN)
+  hi = lo + 2 * BISECT_SPAN
+  for _ in range(BISECT_STEPS):
+    mid = (lo + hi) / 2
+    meets = autopsy_at(mid) >= c
+    lo, hi = np.where(meets, lo, mid), np.where(meets, mid, hi)
+  autopsy = np.array(np.broadcast_to(closed, shape))
+  autopsy[mix] = np.where(autopsy_at(lo) >= c, 0.0, engine.expit(hi))
+  return {"pet": pet, "autopsy": autopsy}
+
+def min_next_lr(prior, tests, pet_se=engine.PET_SE, pet_sp=engine.PET_SP, cutoff=engine.TRIAGE_CUTOFF):
+  # LR one more PET-referenced test needs for each layer to meet the cutoff -> {"pet", "autopsy"}.
+  # Below 1 means the posterior already meets it and stays there unless the next LR is lower still;
+  # 0 = met whatever comes next, inf = out of reach (PET layer collapsed, or cutoff above PPV).
+  out = engine.posterior(prior, tests, pet_se, pet_sp, steps=False)
+  q, p = out["pet"][0], out["autopsy"][0]
+  c = float(cutoff)
+  collapsed = np.isinf(out["log_odds"])
+  with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+    pet = np.exp(engine.logit(c) - out["log_odds"])
+    # mixture is linear in q: q*hi + (1-q)*lo >= c  <=>  q >= (c - lo)/(hi - lo)
+    lo, hi = 1 - out["npv"], out["ppv"]
+    q_star = (c - lo) / (hi - lo)
+    aut = np.exp(engine.logit(q_star) - engine.logit(q))
+  pet = np.where(collapsed, np.where(q >= c, 0.0, np.inf), pet)
+  aut = np.where(q_star <= 0, 0.0, np.where(q_star >= 1, np.inf, aut))
+  fixed = collapsed | np.any([np.asarray(t.used, dtype=bool) & np.asarray(t.pet, dtype=bool) for t in tests], axis=0)
+  aut = np.where(fixed, np.where(p >= c, 0.0, np.inf), aut)
+  return {"pet": pet, "autopsy": aut}
+
+def age_for_prior(prior, stage, apoe):
+  # Youngest age whose clinical prior (updateAutoPrior) reaches `prior`: the lerp between the stage's
+  # anchors inverted after taking the APOE odds ratio back out. The prior never falls with age, so
+  # below this age the posterior misses the cutoff and from it up it meets it; the youngest age in
+  # PRIOR_TABLE_AGES = met at any age, inf = not even at 90+.
+  a = engine.anchor_array()[np.asarray(stage)]
+  y0, y1 = np.clip(a[..., 0], 0.01, 0.99), np.clip(a[..., 1], 0.01, 0.99)
+  with np.errstate(divide="ignore", invalid="ignore"):
+    target = _odds_prior(prior, 1 / engine.odds_ratio_array()[np.asarray(apoe)])
+    age = 50 + 40 * (target - y0) / (y1 - y0)
+  youngest = float(engine.PRIOR_TABLE_AGES[0])
+  return np.where(prior <= 0, youngest, np.where(np.isinf(prior) | (target > y1), np.inf, np.where(target <= y0, youngest, age)))
+
+def thresholds(age, stage, apoe, tests, prior_override=None, pet_se=engine.PET_SE, pet_sp=engine.PET_SP,
+               cutoff=engine.TRIAGE_CUTOFF):
+  # Everything at once for a batch (columns as for engine.score) -> {"pet"|"autopsy": {"posterior",
+  # "meets", "min_prior", "min_next_lr", "age"}}; "age" is nan where the prior is overridden.
+  prior = engine.clinical_prior(age, stage, apoe, prior_override)
+  out = engine.posterior(prior, tests, pet_se, pet_sp, steps=False)
+  need = min_prior(tests, pet_se, pet_sp, cutoff)
+  lr = min_next_lr(prior, tests, pet_se, pet_sp, cutoff)
+  overridden = np.zeros(np.shape(prior), dtype=bool) if prior_override is None else ~np.isnan(np.asarray(prior_override, dtype=float))
+  res = {}
+  for layer, post in (("pet", out["pet"][0]), ("autopsy", out["autopsy"][0])):
+    res[layer] = {"posterior": post, "meets": post >= cutoff, "min_prior": need[layer], "min_next_lr": lr[layer],
+                  "age": np.where(overridden, np.nan, age_for_prior(need[layer], stage, apoe))}
+  return res
+
+def case_thresholds(cases, cutoff=engine.TRIAGE_CUTOFF):
+  # [case dict] -> [{"pet"|"autopsy": {...}}] as thresholds(), JSON friendly: None for out of reach
+  # (inf), and for "age" when the case overrides the prior
+  res = thresholds(*engine.case_columns(cases), cutoff=cutoff)
+  num = lambda v: bool(v) if isinstance(v, np.bool_) else (float(v) if np.isfinite(v) else None)
+  return [{layer: {k: num(v[i]) for k, v in d.items()} for layer, d in res.items()} for i in range(len(cases))]
@@ -0,0 +1,146 @@
+# ptau217_uncertainty.py — Monte Carlo credible intervals for ptau217_engine posteriors
+# Every draw resamples the Se/Sp of each test in the workup and of PET vs autopsy (Beta posteriors
+# over validation-study counts) plus the stage's prior anchors, and pushes it through the engine's
+# full PET + autopsy pipeline. Cases x draws are evaluated in fixed-size vectorised chunks, so a
+# whole cohort's intervals cost bounded memory however many draws are asked for.
+from collections import namedtuple
+import numpy as np
+import ptau217_engine as engine
+
+STUDY_N = (100, 100)  # (amyloid+, amyloid-) participants assumed behind a published Se/Sp without counts
+ANCHOR_N = 200        # participants assumed behind each prior anchor
+DRAWS = 100_000
+LEVEL = 0.95
+CHUNK = 1 << 18       # cases x draws per vectorised batch (peak memory is a few dozen arrays this size)
+
+# One workup step with its evidence as 2x2 counts vs the reference (amyloid PET; autopsy for PET itself)
+CountTest = namedtuple("CountTest", "cat tp fn tn fp pet used", defaults=(False, True))
+
+def counts_from_se_sp(se, sp, n=STUDY_N):
+  # (tp, fn, tn, fp) of a study with n = (amyloid+, amyloid-) participants at that Se/Sp
+  se, sp = np.asarray(se, dtype=float), np.asarray(sp, dtype=float)
+  return (se * n[0], (1 - se) * n[0], sp * n[1], (1 - sp) * n[1])
+
+def se_sp_from_lr(lr_pos, lr_neg):
+  # Inverse of LR+ = Se/(1-Sp), LR- = (1-Se)/Sp; only defined for lr_pos > 1 > lr_neg
+  lr_pos, lr_neg = np.asarray(lr_pos, dtype=float), np.asarray(lr_neg, dtype=float)
+  if not ((lr_pos > 1) & (lr_neg >= 0) & (lr_neg < 1)).all():
+    raise ValueError("intervals need lr_pos > 1 > lr_neg >= 0")
+  sp = (lr_pos - 1) / (lr_pos - lr_neg)
+  return lr_pos * (1 - sp), sp
+
+# Per-modality counts; defaults are TEST_SE_SP at STUDY_N — put the source studies' own counts here
+STUDY_COUNTS = {m: counts_from_se_sp(se, sp) for m, (se, sp) in engine.TEST_SE_SP.items()}
+
+def beta_draws(rng, hits, misses, size):
+  # Posterior of a proportion after `hits` of `hits + misses` under a uniform prior
+  return rng.beta(np.asarray(hits) + 1.0, np.asarray(misses) + 1.0, size=size)
+
+def lr_draws(rng, t, size):
+  se = beta_draws(rng, t.tp, t.fn, size)
+  sp = beta_draws(rng, t.tn, t.fp, size)
+  return se / (1 - sp), (1 - se) / sp
+
+def simulate(rng, draws, age, stage, apoe, tests, pet_counts, prior_override=None,
+             anchor_n=ANCHOR_N, apoe_log_sd=0.0):
+  # One batch: case columns of length g -> {"prior", "pet", "autopsy"} of shape (g, draws), the
+  # final-step posteriors. apoe_log_sd > 0 also draws each odds ratio log-normally around its value.
+  col = lambda a: np.asarray(a)[:, None]
+  size = (len(np.asarray(age)), draws)
+  a = engine.anchor_array()[np.asarray(stage)]
+  y0 = beta_draws(rng, col(a[:, 0] * anchor_n), col((1 - a[:, 0]) * anchor_n), size)
+  y1 = beta_draws(rng, col(a[:, 1] * anchor_n), col((1 - a[:, 1]) * anchor_n), size)
+  odds_ratio = col(engine.odds_ratio_array()[np.asarray(apoe)])
+  if apoe_log_sd:
+    odds_ratio = odds_ratio * np.exp(rng.normal(0.0, apoe_log_sd, size))
+  prior = engine.apply_apoe_on_odds(engine.lerp_anchors(col(age), y0, y1), odds_ratio)
+  if prior_override is not None:
+    override = col(np.asarray(prior_override, dtype=float))
+    prior = np.where(np.isnan(override), prior, np.clip(override, 1e-6, 1 - 1e-6))
+  pet_se = beta_draws(rng, col(pet_counts[0]), col(pet_counts[1]), size)
+  pet_sp = beta_draws(rng, col(pet_counts[2]), col(pet_counts[3]), size)
+  steps = []
+  for t in tests:
+    t = CountTest(*(col(np.broadcast_to(v, size[:1])) for v in t))
+    lr_pos, lr_neg = lr_draws(rng, t, size)
+    steps.append(engine.Test(t.cat, lr_pos, lr_neg, t.pet, t.used))
+  out = engine.posterior(prior, steps, pet_se, pet_sp, steps=False)
+  return {"prior": np.broadcast_to(prior, size), "pet": out["pet"][0], "autopsy": out["autopsy"][0]}
+
+def _summaries(samples, level):
+  # samples (g, d) -> (lo, median, hi, mean), each of length g
+  tail = (1 - level) / 2
+  lo, med, hi = np.quantile(samples, [tail, 0.5, 1 - tail], axis=1)
+  return lo, med, hi, samples.mean(axis=1)
+
+def intervals(age, stage, apoe, tests, pet_counts, prior_override=None, draws=DRAWS, level=LEVEL,
+              seed=None, chunk=CHUNK, anchor_n=ANCHOR_N, apoe_log_sd=0.0):
+  # Equal-tailed credible intervals per case for the prior and the final PET / autopsy posteriors.
+  # Case inputs are columns as for engine.score (tests as CountTest rows, pet_counts a (tp, fn, tn, fp)
+  # tuple of columns or scalars). Whole cases are batched while cases x draws fits in `chunk`; past
+  # that each case's draws are generated chunk by chunk into one buffer per output.
+  age = np.atleast_1d(np.asarray(age, dtype=float))
+  n = len(age)
+  col = lambda v: np.broadcast_to(np.asarray(v, dtype=float), (n,))
+  stage, apoe = np.broadcast_to(stage, (n,)), np.broadcast_to(apoe, (n,))
+  tests = [CountTest(*(np.broadcast_to(v, (n,)) for v in t)) for t in tests]
+  pet_counts = [col(c) for c in pet_counts]
+  override = None if prior_override is None else col(prior_override)
+  rng = np.random.default_rng(seed)
+  keys = ("prior", "pet", "autopsy")
+  out = {k: {s: np.empty(n) for s in ("lo", "median", "hi", "mean")} for k in keys}
+  group = max(1, chunk // draws)
+  for i in range(0, n, group):
+    rows = slice(i, min(i + group, n))
+    batch = lambda d: simulate(rng, d, age[rows], stage[rows], apoe[rows], [CountTest(*(v[rows] for v in t)) for t in tests],
+                               [c[rows] for c in pet_counts], None if override is None else override[rows],
+                               anchor_n, apoe_log_sd)
+    if draws <= chunk:
+      sims = batch(draws)
+    else:
+      sims = {k: np.empty((1, draws)) for k in keys}
+      for j in range(0, draws, chunk):
+        part = batch(min(chunk, draws - j))
+        for k in keys:
+          sims[k][:, j:j + chunk] = part[k]
+    for k in keys:
+      for s, v in zip(("lo", "median", "hi", "mean"), _summaries(sims[k], level)):
+        out[k][s][rows] = v
+  return out
+
+# --- JSON case objects (the runner's /api/posterior schema) ---
+def _case_count_tests(cases, study_counts):
+  # As engine.case_tests, with each step's evidence as counts: the modality's study counts, or
+  # counts at STUDY_N implied by the case's own lr_pos/lr_neg when it overrides them
+  steps = [engine.case_steps(c) for c in cases]
+  tests = []
+  for k in range(max(1, max(map(len, steps), default=0))):
+    cols = [[] for _ in CountTest._fields]
+    for s in steps:
+      mod, cat, lp, ln, value = s[k] if k < len(s) else (None, "indet", None, None, None)
+      mod = mod or engine.DEFAULT_MOD
+      if mod not in engine.TEST_LR:
+        raise ValueError(f"unknown modality: {mod}")
+      if value not in (None, ""):
+        raise ValueError("credible intervals need categorical results (no study counts behind an LR curve)")
+      if cat not in engine.CATEGORIES:
+        raise ValueError(f"unknown category: {cat}")
+      if lp is None and ln is None:
+        counts = study_counts[mod]
+      else:
+        counts = counts_from_se_sp(*se_sp_from_lr(engine.TEST_LR[mod][0] if lp is None else lp,
+                                                  engine.TEST_LR[mod][1] if ln is None else ln))
+      for c, v in zip(cols, (engine.CATEGORIES.index(cat), *counts, mod == engine.PET_MOD, k < len(s))):
+        c.append(v)
+    tests.append(CountTest(*(np.array(c, dtype=float if 1 <= j <= 4 else None) for j, c in enumerate(cols))))
+  return tests
+
+def case_intervals(cases, draws=DRAWS, level=LEVEL, seed=None, chunk=CHUNK, study_counts=None,
+                   pet_n=STUDY_N, anchor_n=ANCHOR_N, apoe_log_sd=0.0):
+  # [case dict] -> [{"prior"|"pet"|"autopsy": {"lo", "median", "hi", "mean"}}] for the final step of
+  # each case's workup. PET vs autopsy counts come from the case's pet_se/pet_sp at pet_n participants.
+  counts = dict(STUDY_COUNTS, **(study_counts or {}))
+  age, stage, apoe, tests, override, pet_se, pet_sp = engine.case_columns(cases, lambda cs: _case_count_tests(cs, counts))
+  out = intervals(age, stage, apoe, tests, counts_from_se_sp(pet_se, pet_sp, pet_n), override,
+                  draws, level, seed, chunk, anchor_n, apoe_log_sd)
+  return [{k: {s: float(v[s][i]) for s in v} for k, v in out.items()} for i in range(len(cases))]
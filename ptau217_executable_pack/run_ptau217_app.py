@@ -1,9 +1,20 @@
 # run_ptau217_app.py — single-file runner for the pTau217 PWA
-# It writes embedded assets to a temp dir, starts a local HTTP server (with a tiny backend),
-# opens your browser, and keeps serving until you stop it.
-import os, sys, tempfile, threading, webbrowser, time, base64, json
+# It serves the embedded assets from memory via a local HTTP server (with a tiny backend),
+# opens your browser, and keeps serving until you stop it. Use --extract to write them to disk instead.
+import os, sys, tempfile, threading, webbrowser, time, base64, json, io, asyncio, http.client, signal, socket, hashlib, re, gzip, zlib, bisect, cProfile, itertools, ipaddress, select
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
 from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
-from urllib.parse import urlparse
+from urllib.parse import urlparse, parse_qs
+try:
+  import numpy as np  # optional: only needed for the /api/posterior batch scorer
+  import ptau217_engine as engine
+except ImportError:
+  np = engine = None
+try:
+  import brotli  # optional: adds br variants next to gzip
+except ImportError:
+  brotli = None
 
 PORT_START = 5173
 
@@ -20,6 +31,118 @@ ASSETS_BIN = {
   "assets/icon-512.png": "iVBORw0KGgoAAAANSUhEUgAAAgAAAAIACAYAAAD0eNT6AAAiYklEQVR4nO3debgeZXk/8Hm3syUhCdkXCAlrILKFnWKAUlQKVBFQEFpBRERF6pJfay21qNCKdkEWd6QWN1apwo9FECgICYtsskMDGEASQkhycrb3vP2DRhEhOcl533lm5vl8rmv+4LrCeecsM/d37pl7ntLJP2w0EgAgKtVE+QeA6JRD7wAAkD4BAAAiJAAAQIQEAACIkAAAABGqlkLvAQCQOh0AAIiQAAAAERIAACBCAgAAREgAAIAICQAAECFjgAAQIasBAkCE3AIAgAgJAAAQIQEAACIkAABAhAQAAIiQMUAAiJAOAABESAAAgAgJAAAQIQEAACIkAABAhAQAAIiQMUAAiJDVAAEgQtXQO8Dw3X/xBaF3AYjQW444LvQuMAylUy5q6AHkgCIP5IlwkH0CQAYp9kARCQXZIgBkgIIPxEggCEsACETRB/g9YSB9pY8LAKm5T9EHWKfthYFUCAApUPgB1p8g0FoCQIso+gDNIww0nwDQZAo/QOsIAs0jADSJwg+QHkFg+ASAYVL4AcIRBDacALCBFH6A7BAE1l/pVAFgvdyr8ANk1g6CwJCVk0aS2Ia2Kf4A2XbvxRcErxV52Uqn/qcOwLrce4nCD5A3OxyuG7A2AsBa5KnwL7jxtOWh9wGIx277nT469D4MlSDwxgSAN5HF4q/IA3mQxXAgBPwxAeANZKX4K/hAEWQlEAgBf0gAeI3QhV/BB2IQOhAIAq8q/bUAkCRJkvwqUPFX9IGYhQoDOwoBAkCShCn+Cj/A74UIArGHgKgDQNqFX9EHWLe0w0CsQSDaAJBm8Vf4AdZfmkEgxhAQZQBIq/gr/ADDl1YQiC0ERBcA0ij+Cj9A86URBGIKAVEFgFYXf4UfoPVaHQRiCQHlUpIkMWyKP0AxtPp8+6tLLghes1LZPvG94ncA7rm0dcVf4QcIp5XdgJ3eXexOQDn0DrSa4g9QXK08D7eyfmRBoTsArfrlKfwA2dOqbkBROwGF7QAo/gBxadX5uaidgEIGAMUfIE5CwNAV7hZAK35JCj9A/rTilkCRbgcUagxQ8QdgjVacv++5tDgjgoW8BdAsij9AvjmPv7nCBIC7m3z1748GoBiafT5vdr0JpRABQPEHYG2EgD+W+wCg+AMwFELAH8p9AGgmxR+g2Jznfy/XAaCZ6csfBUAcmnm+z3MXILdjgIo/ABuq2SEgdE2MZgzwLsUfgGFq5vm/mXUpLeWkkSS525pE8QeIW1PrQOjauJ5b7joAd13WnJSl+AOQJM2rB82qT2nJXQAAAIYvVwHA1T8ArRBjFyA3AUDxB6CVYgsBuRkDbAbFH4C1aVadCF0zCzMGeGdO0hQAJEk+6lYuAkAzuPoHYChiqReZDwDNSFGx/DIBaI5m1I2sdwEyHwAAgObLdABw9Q9AKEXvAmQ6AAyX4g/AcBS5jmR2DDDLqQkAhurOy7K5WmBhOwBFTm0ApKeo9SSTqwEudPUPQIEsvOyC4LU196sBDkVR0xoAYRSxrhQyAAAAa5e5ALDw8uG1/4uY0gAIb7j1Zbj1rdmqpdB7AACRyFLNzVQHYIGrfwAybLh1Zrh1rpkyFQAAgHQIAAAQocwEAO1/APKgKLcBMhMAAID0FCIAuPoHIE1FqDuZWAwoK+0QAEjDgsvDLxBUiA4AALB+ch8AitCGASB/8l5/qkkj9C4AQIQC19/gHYA7rnD/H4D4hK5/wQMAAJC+XAeAvN9/ASDf8lyHrAYIAIGErMG57gAAABsmaAC43QOAAEQsZB3MbQcgz/ddACiOvNaj3AYAAGDDCQAAECEBAAAiZAwQAAIKVYd1AAAgQsECwC+NAAJAsHpYThpJEmQbhryOXABQTMOuSwHqsFsAABAhAQAAIiQAAECEjAECQGAharEOAABESAAAgAgJAAAQIQEAACIkAABAhAQAAIiQMUAACMwYIACQCgEAACIkAABAhKrDXZoXABimALVYBwAAIiQAAECEjAECQGDGAAGAVAgAABAhAQAAIiQAAECEBAAAiJAAAAARMgYIAIEZAwQAUiEAAECEBAAAiJDVAAEgNKsBAgBpEAAAIELGAAEgMGOAAEAqBAAAiJAAAAAREgAAIEICAABESAAAgAgZAwSAwIwBAgCpEAAAIEICAABEyGqAABCa1QABgDQIAAAQIWOAABCYMUAAIBUCAABESAAAgAgJAAAQIQEAACIkAABAhIwBAkBgxgABgFQIAAAQIQEAACJkNUAooFKplEycOqs8bda2lQmTNyuPnzKjPGHKZuVRY8aXO7pGlTo6RyRt7Z2lxuBgUq/Xk3q9v1Ef6E8G+vsafb2rk9WrVjRefO6pwWeffLD+7FMP1p998sH6ipeXOFtAqwQ4uqrpfyTQbLW2jtIW2+1W2WK7PaozttqxMmPLHSqdIzZa53NFpUo5KVeqSS1pX/Nvf/f/bLrFWypz9zm0tua/l734m8FH7r114JH7bh149L5b68tfemGwBd8KkBJTAJBT0zabXZm987zq7J3eWp01e7dqra29pZ83dsK08h4HHNm2xwFHtiVJkvzmqV/X77rlyv67bv5J/9LfPisMwDCEqMU6AJAjYydMK+95wHva5r710NqkaZsHfYZn2sxtK9Nmbls59C//puOpR+6u33bN9/sW3nR530B/X8jdAoZIAIAc2HSL7SsHHHZS+457HVQrlyuhd+ePzNx658rMrXfuPPSv/qbjv6/+z76br7qw1zMDkG0CAGTYpGmblw85dn7HjnsdVFv3vw5v1OjxpXe899T2P33Xh9puuOKbfddfdn5vz+qVggBkkAAAGVRr61hTSNsrlfwdpm3tnaW3v+eU9r3ffnTbz77/Lz23/v+L+hoNjwlAlngPAGTMlm/Zs/rZc28YeeDhH8ll8X+tUaPHl9774TM6Tz3zkhHjJ89wvoEMcUBCRpQr1eSQY+d3nPKFH44YN2mTQh2bm2+7a/UzZ1878q0H/WVb6H0BXmUMEDJg9NiJpRP+9hsjZm4zN3tP+DVJW0dX6ciTvtg5c5u51e+fM7+7v6839C5BZlgMCCI0c+udK/P/7epRRS7+r7XrvofVPn7GxSNHj53o+gMCEgAgoJ32PjjKYrjZVjtVPvXlK0cW7VYH5ImDDwKZd/BxbcfPP7erWovztvjYCdPKp55xceGed4C8cOBBAAcd9YmOI048vbNUivsQXBMCNp44Pe4fBARQThpJEmSDSB1yzPyOg47669a+uD9Hxk6YVv7Q3327q62jK6rbIPAHAtRhqRtSdMix8zveduTHFP/XmTZz28oxp3y5M/R+QEzKpeTV8YO0N4jNPu84tu1tRyj+b2bnPzmklpdXHkOzhajDOgCQgu122b96xIc+7wp3HY448fSOjq6RrhEgBQIAtNi0mdtWjp9/XlcWV/HLmtEbTyrPO/i4OMciIGUCALRQra09Of7T53a1d4xwVTtE+x16QrsHAqH1BABooYPf9+mOSdO3cJyth5EbbVzabb93exYAWsyJCVpk5jZzK/u/84Me+tsAu+13mNsA0GL5XmsUMqpcriTHnPLlrtAv+mk0BpNFj91bf/DOG/qfffLBweeffby+asWyRm/3ykZSKiXtHV2lMeMml8dP2aw8a5u5ldk771udttns4A8rzNpml8r4yZuWlzz/9GDofYGishogtMDu+x/eFrL1P1gfSG699gd9P7/8671Lnl/0pkW0e+XyRvfK5fXFix6p33f7Nf1XfPeMZPqs7Spvf8/H23fc8x1B2/Dbzd2/etPPvtsXch8gLVYDhAKoVKrJ2997arDW//PPPDb4pU8esvJH539m9dqK/5t59skH698688Tur3/h+O7ulcuDvbdzy+330qGEFhIAoMn2ftvRbeMCvdv+yYfvrH9l/jtXPvvkA/Xhfq37F1zX/29/++5VK5cvDRICtpqzZ7VU0qOEVhEAoIlKpXLyZ4d/JMjV/5LnFw2e/49/tWr1qleaVrAXL3qk/s1/OrF7cHDYeWK9dY0aU7JIELSOgwuaaPbO86pjx09N/bhqNAaTb//zh7ubWfzXeOLBBQO3XP29IPfip2y6tXMUtIiDC5pozwPeE2R87fafX9z3zBP3t+wy/WcXfbln1Yplqd8KmLLpVsEnEqCoLAcMTTJyo41L2+9+YOpPzjcag8k1Pz67t5Wf0b1yeeO6S89v6We8kXGTNnGRQhxCLAdsNUBojrlv/YtapZr+5NyDd904kMa8/IIbL+lL+1mAjcZOdLogClYDhBybs+sBQebmF9x4aSr3519Z9mLjobtvGkjjs9bYaOwE5yhoEQcXNEGtrT3ZYrvdU59b7+/rTR5ceENqRfm+O67tT+uzkuTV2yppfh7ERACAJthizh7VWlv6039P/HrBQG/PqtSeqnnmiftSvQdQrVlKAVpFAIAmmL3TvCBvrXv0vltTbcn/5qmH6gP96U0E1tradQCgRQQAaIIt5+wRJAA88dDCVK/I6/WBJM0Femo6ANAyAgAMU7lSTaZsunXq8+qNRiP5zVO/Tv0VfatXpbc+wGDDYoDQKlYDhGGaNG1WpVpL//0/S194ZrCne2Xqb9VoxdsG30x/b09aHwVBWQ0QcmjazG2DHEe/XfxkkMvjNEPHKy+/qAUALSIAwDBNn7ltkNfVLnlu/Zf6bYa2js7ULlZe+u2zAgC0iAAAwzRx2uZBjqOXXgxTHMdP3iy173fxoocFAGgRAQCGacy4KUGOo1eWpd8e7+gaWZo4bWZq3+/Tj6f73gGIiQAAwzR63KQgx9GKl19M/QHA2TvNq5bL6dzxGBysJ4/d/8tU33MAMalamQ82XLlcSUaNHhdkmGbVipdTP3p32+/dqa138NTDdw90r0xv5BCCCvCXbgwQhmGjsRPKaV0Rv17v6vReAZwkSbLxxOnl7ebul1oAWPiLy1JddwBCMgYIOTNqzIRgGbqne0WqAeCAwz7cXq6k88LD3p5VjbtuuVIAgBYSAGAY2ju6ggWA/oH03sk/fvKM8t4HHpXa245+ed2P+tN84RDESACAYQixAuAag/X0no877AOndVSq6XT/+/t6k+sv/1pvKh8GERMAYBiqtXCr1Q3W05mQ22HPt9e23/3A1O793/TT7/S+vOQ58//QYgIADEOtrSPYZzcagy1vkY/caOPSkSd9sbPVn7PGsiWLB6/+4b+7+ocUCAAwDEVfr/7oj53VOXrsxNS+xx+d/3ere3vSnW6AWBkDhGFI66n4tJUr1eSw4z/bkW7r/4K+BxZe78U/RClELS7m2QtSUioVK0KXSqVku7n7Vw8+5lMd02fNSe0FB4seu7d++QVfWJ3W5wECAJAkydQZ21R23Oug2q77vqs2YUp6i/0kSZIsfeGZwa99/v2rBvrTG2sEBACITqlUSiZO27w8a/Yu1c233a2yzY77VMeMmxxmRcPfPjt4zmlHr1rx8hL3/SFlAgAU2IhRY0uTN9miMnmTrcpTNt2qssmsOeVps7atdHSODH7vYvGiR+rnfe6Y7peXPm/kDwIQAKDAvvjdOzeq1lJ7gd+Q/fL6H/Vd/PW/7+nrXe3KHwKxGiCQmsWLHqlf/p3Tex6652ZP+8NrWQ0QKJp6fSB55N7/Hvjvq7/X98DCn/cPDqbzBkPIE2OAQCE89/Sj9btvubL/mScfrD/+wO31ntUr9RohYwQAoOmmbLpVZd7Bx5UfuuemgVpbe/8DC38+0N/XIwRAhggAQEuMHD2utOu+h9V23fewWm/Pqsb9d1w3cMeNl/Q9fM/NA42GLAChCQBAy7V3jCjtMu+dtV3mvbO29IVnBm+95vt9t15zUd+qFcskAQjEYkBAqsZN2qR86F/+v47Pf/v2UYd/8HMdY8dPdR6CABx4QBBtHV2lfQ/5QPs/fP2WUYcdf1pH16gxhpIgReVS8ur4QdobQJIkSbXWluz/zg+2/+M3bxs178/f31YquS4hPiHqsCMNyITOrlGlIz70+c5PnfWTkVNnbJPaSoQQKwEAyJQZW+1Ymf8vPxs57+DjsvcOYygQAQDInGqtLTnixNM7T/y7b3e1d4xw1xBaQAAAMmv73Q+sffKsK0aMmzjduQqazEEFZNrUGdtUPnHWT0ZO3mQL5ytoonLSSJIgG8AQjR47sXTqGZeMnLbZbA8HUkwB6rAxQCAXRo4eV/r4F388YpPN3yIEUDjGAAHWomvUmNKHT7twxJjxU5y7YJgcRECubDR2Qumkz17Q1dbRpZkIw2AxICiwTxy59fK29o5SW3tnUmvrKHWNHPN/2+jS6I0nlsaMm1IeM35KecKUzcqTpm9e7ugcmYuiOn3WdpX3f+Lszm+ccUJ36H2BvBIAoMAG6wNJT/fKRk/3yiRJksbSF55Z678fO35qecZWO1ZmbjO3svX2e1Wnz5qT2fvt2+/xttpeBx7Vdtu1P+gLvS+QRwIA8DvLliweXLZk8eCvbruqP0mSZMy4yeWd9zmktvfb3tc2adrmmbtleNjxp3U8dPdNA8uWLB4MvS+QN5k7oIHseHnp84M3XPHN3i+cvN+K75x1cvfSF57JVKHt6BpZOvpjZ3WG3g/II2OAwDo1Go3k7lv+q//Mjx+48le/vLo/9P681uyd3lqds8uf6maSa8YAgUzr6V7Z+NaZJ3Zf8d0v9jQa2Xmj18HHfKqjVHJpAetDAADW2/WXfa33P//9k6sHB+uhdyVJkiSZPmtOZce9DqqF3g/IEwEA2CB33HBx34VfOaU7K52AP3v3R9pD7wPkiQAAbLC7brmy/6cXndUTej+SJEk23eItlakztsns2CJkjQAADMs1P/5q7z23/jQTDwbuccCRbgPAEJkCgJwqlSuZOZR+eN5nVq985aXg9wJ23fddbeWyJgD5E2YKwHLAkEvVanYudletWNa47Nunrw69H6NGjy9tusX2EgD5E2I54HS+M6DZqrW20LvwBxbceGn/4kUPBx8L2Gr7vb0TAIZAAICcamvP3mp4N1zxjeDv5d96h70EABgCAQByatTocZkLAAtvuqIv9LMAM7fZpVIqObXBujhKIKdGjh6XueO3PtCfPHjnz4NOBLS1d5Y2njA1cz8byBoHCeTUmHGTM9cBSJIkue+OawdC78PEabOc22AdjAFCTk2YOjOTRe6JXy8MHgCy+rOBN2MxIGDIJk6dmclxt5XLlzZWLF8S9DmAcRM3cW6DdXCQQE5NnzUns8fvc08/GnQcsKNrpEYjrENmTyDA2o0ZN7k8ZvyUTB7DK5cvDdoByOKIJGRNJk8ewNDMmr1LJm8D9HSvDBoA2jtHhPx4yAUBAHJszi5/mp33Ab9GX2930ABQq7XrAMA6CACQY9vtsn81i4vfjNwo7DsK+vt6rDgC62AMEHJsxKixpW133jdzr76duc3coKmkt2dVyI+H9WY1QGC97f3292VqVaAZW+5QGTcp7Bhe7+pVzjLki9UAgfW13S771yZN2zwzx/K+hxzfHnofXnk57HsIIA8yc9IANky5XEn+/H2f7Ai9H0mSJJOmb1Ge+9a/CP5g4ovP/U/wZYkh6wQAKICd9j64tvm2uwZ/FuDwEz7XmYWHEpc89z+DofcBsk4AgAIolUrJMad8pbPW1hHsGdtd9z2sNnvnecFDSJIkyQuLnxQAYB0EACiICVNnlo/+6Jc6Q3z22PFTy0eceHqQz3695595fLB7xcueAYB1MAYIBbLrvu+qHXTUX6f6EF6lWkve/6lzOrtGjs7Eof34g7cHX40Q1pfVAIFhO+ioT3Qccuz8VB4KLJcrybGn/mtXFp4/WOPxBwQAGAoBAArobUd8rP34+ed1dY7YqGVX5Z1do0onnfbdEbtk4Kn/NeoD/cmv7/6FAABDIABAQe38J4fUPvPV60bO3efQWqnUvBxQKpWSufscWvvs+b8YlbW3ED5414393SuXu/8PQ5CpgxdorrHjp5aP+/S5XX/27pPrN191Yd9dN1/Z39uzYW/JG73xpPKOex1Unffn72+fOG1WJi8eFv7i8v7Q+wB5IQBABKbP2q5y9Ee/1HnEiad3PPnQwvqj9/1yYPGihwdffO6p+oqXlzb6ersbA/39Sa2tvVRta09GbTSuNGb8lPL4yZuWN5k1pzJjqx0r02fNqTSzk9BsK5YvaTyw8DoBAIZIAICI1No6SlvvsE916x32Kdyxf+NPvtXb39cbejcgN6rZzfMAQ7O6e0Xj5qsu7Au9H7ChQtTiqpX5gLy78Sff7O3pXulsRn4F+OvN5IM8AEO19IVnBq+79Dy9f1hPAgCQa5d88x963PuH9ScAQE7V695386vbruq/f4En/2FDCACQUz86/zOrQ+9DSC/99tnB758zP+qfAQyHAAA5tfAXl/Vde8m5Ufa+6/WB5DtfOrnbW/9gw1kNEHLsv773zz0xtsAv/dbnVv/Po/fUQ+8HNIvVAIH10mg0ku9++WOrn3ni/miK4XWXntd788/M/MNwCQCQc709qxpf/fujVi167N7Ch4AFN17af+V//FNP6P2AIhAAoAC6Vy5vfPXv37vqyYfvLGwIuPOmK/ovOvtT3Y2G2/7QDAIAFERP98rGuacds+qxB24v3HzgTT+9oO/Cfzml2+gjNI8AAAXS27Oqcc5pR6+65ervFeIeeaMxmPzX977Uc/E3Tlvtyh+aq3ArgkHs6gP9yY/O/8zqpx6+a+C9J5/Z2dbemcvBm+UvvTB44VdOWf3o/be57IcWsBogFNSCGy/tf/bJBwePn39e1+RNtsxVt+/+Bdf1X3T2p1avfOUll/1EwWqAQFMtXvRw/cxTDlyx31+c0P6O957a3t4xItOZ/7e/eXLw8gu+EOW7DYhcgFrsFgAUXL0+kFx/2dd6F/7i8v7DPnBax9x9Dq2F3qfXW/HyksY1F5/Te8tVF/Z60A/SIQBAJJa/9MLgBWd9pPuaH59d2e/QE9p2mfeutlpbe9B9WvTYvfWbfnpB7123XNlfH3DRD2kSACAyixc9Ur/oq59efeV//HPPPgcd27bbfoe3jZ+8aWrPCLy4+KnB++64tv/uW3/av+jRXxX2vQWQdQIARGrF8iWNq37wr71X/eBfe6dsulVlzq4HVN+y2wG1zbbeuVIuV5r2OS8veW5w0WP31p965O76Awuv73/+mccGm/bFgQ0mAADJc08/Wn/u6Ufr1116Xm9be2dp8iZblqfO2LoyZcY25SmbbFkZOXpcqaNzZKmja1Spo3NEUmvvKA309zX6elcn/b09jf6+nmTlKy81li1ZPLjsxcWDL734m8Glzz89+PQT99VfWfaiR40hg4wBAn+gr3d14+nH76s//fh92vOQkhC1OFezwQBAcwgAABAhAQAAIiQAAECEBAAAiJAAAAARMgYIAIFZDRAAYhSgFrsFAAAREgAAIEICAABESAAAgAgJAAAQIWOAABCY1QABgFQIAAAQIQEAACIkAABAhAQAAIiQAAAAETIGCACBGQMEAFJhOWAACM1ywABAGgQAAIiQAAAAERIAACBCxgABIDBjgABAKgQAAIiQAAAAERIAACBCAgAAREgAAIAIGQOEYbjt2h/03XbtD/pC7weQb8YAAYBUWA0QAEKzGiAAkAYBAAAiJAAAQIRMAQBAYKYAAIBUCAAAECEBAAAiJAAAQIQEAACIkAAAABEyBggAgRkDBABSIQAAQISsBggAoVkNEABIgwAAABESAAAgQsYAASAwY4AAQCoEAACIkAAAABESAAAgQgIAAERIAACACBkDBIDAjAECAKkQAAAgQlYDBIDQrAYIAKRBAACACAkAABAhY4AAEJgxQAAgFQIAAERIAACACAkAABAhAQAAIiQAAECEjAECQGDGAAGAVAgAABAhAQAAImQ5YAAIzXLAAEAaBAAAiJAxQAAIzBggAJAKAQAAIiQAAECEBAAAiJAAAAAREgAAIELGAAEgMGOAAEAqBAAAiJAAAAARKieNJAmyDcNu+50+enhfAQCaZ9h1KUAdDtYBOH7v40J9NABkRqh66BYAAETIGCAABBSqDusAAECEBAAAiJAAAAARym0AMAoIQBbktR4FDQAfMAoIQMRC1sHcdgAAgA1nDBAAAglZg3PdAcjrfRcAiiHPdSjXAQAA2DDBA8AJHgQEIEKh6191uCvzAQAbIHD9Dd4BGK48338BIL/yXn9yHwAAgPVXLiWvjiGE3D64l+cAAIjHB/c6LnjtLUQHIO9tGADypQh1pxABAABYP5kJAMO9DVCENAZA9g233mTltndmAgAAkB4BAAAilKkA4DYAAFlWlPZ/klgNEABSk6Wam6kOQJIkyYm6AABk0HDry3DrW7NlLgAAAK1XyACgCwBAMxWxrpSTRpJkbTtxz2y1SQBgOE7c87jgtfX1WyE7AElSzLQGQPqKWk8ysRjQG20f0gUAoAA+tGf4hX8KuxjQmylqagMgHUWuI5kOAM3oAhT5lwdA6zSjfmS5m53pAAAAtEbmA4AuAABpK/rVf5LkIAA0ixAAwFDEUi9yEQCynqIA4LXyULcyOwb4+q0ZYkl1AGyYZtWJ0DWzUGOAJzUpTQkBALyRZtWHZtWrVstNAEgSIQCA1oit+CdJzgIAANAcuQsAugAANFOMV/9JktHVANe5NYkQABC3ptaB0LUxhtUAT9qjeSlLCACIUzPP/82sS2nJzRjg67cPCwEAbKBmnvc/vEc2V/srzBjgGxECAFhfzS7+eZXrANBsQgBAsTnP/17uA0Cz05c/DoBiavb5Pc9X/0lSgACQJEIAAGun+P+xQgSAJBECAHhjiv8bK0wAaAUhACDfnMffXG7HAN9oO7kFqcwfD0A+teL8fXJOR/7ecLv4nxpNfLdeNpx3+wUt+boLbjxteUu+MABN06oLt1ZcZIZUyFsArfol6QYAZJviP3SFDABJIgQAxEbxXz+FvAXwWq26HZAkbgkAZEErL8yKWvyTpMAdgDVa+cvTDQAIS/HfcKWLzyx2B2CN8+5oXScgSXQDANLU6guwk3cvdvFPkoKNAa5t+0iLf5m6AQDpaPX59iO7F2jUb23bJZF0ANY4t8WdgCTRDQBohTQutFp9sZgl0QWAJEknBCSJIADQDGl1WGMq/kkSaQBIkvRCQJIIAgAbIs1bq7EV/ySJOAAkSbohIEkEAYChSPuZqhiLf5JEHgDWSDsIJIkwAPBaIR6kjrXwryEA/J8QISBJBAEgbqEmqGIv/kmSJKVLBYDfOSdQCFhDGABiEHps+qOKf5IkAsAbCh0E1hAIgCIIXfDXUPj/kADwJrISAl5LIADyICsF/7UU/z8mAKxFFkPAmxEOgDRlsci/GcX/jQkAQ5CnIADAqxT+tRMA1oMgAJB9Cv/QlJNGktiGtn10N39UAFn20d2OC14r8rKVLjtDB2BDfHXBBaF3AYD/8zEXaOtNABgmQQAgHIV/wwkATSIIAKRH4R8+AaDJBAGA1lH4m0cAaBFBAKB5FP7mEwBSIAwArD9Fv7UEgBQJAgDrpvCno3S5ABDE2cIAwO+couinTgDIAGEAiJGiH5YAkEECAVBECn62CAA5IRQAeaLYZ58AUADCARCCIp9vAgAARKiaKP8AEJ1qKfQeAACpK4feAQAgfQIAAERIAACACAkAABAhAQAAIiQAAECEjAECQIR0AAAgQgIAAERIAACACAkAABAhAQAAImQ1QACIkDFAAIiQWwAAECEBAAAiJAAAQIQEAACIkAAAABESAAAgQsYAASBCOgAAECEBAAAiJAAAQIQEAACIkAAAABH6X3vPtRCv8lFqAAAAAElFTkSuQmCC"
 }
 
+MIME_TYPES = {
+  ".html": "text/html; charset=utf-8",
+  ".css": "text/css; charset=utf-8",
+  ".js": "application/javascript; charset=utf-8",
+  ".json": "application/json",
+  ".webmanifest": "application/manifest+json",
+  ".png": "image/png",
+}
+
+def content_type(path):
+  return MIME_TYPES.get(os.path.splitext(path)[1], "application/octet-stream")
+
+IMMUTABLE = "public, max-age=31536000, immutable"  # for ?v=<content hash> URLs
+REVALIDATE = "no-cache"                             # everything else: always revalidate (cheap 304s)
+
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "application/manifest+json")
+COMPRESS_MIN = 1024  # dynamic (API) responses smaller than this go out uncompressed
+
+def _asset(body, path, mtime):
+  digest = hashlib.sha256(body).hexdigest()[:32]
+  a = {"body": body, "type": content_type(path), "digest": digest, "etag": f'"{digest}"', "version": digest[:12],
+       "mtime": mtime, "modified": formatdate(mtime, usegmt=True), "variants": {}}
+  if a["type"].startswith(COMPRESSIBLE):
+    # Precompressed once at startup; only kept when they actually save bytes
+    variants = {"gzip": gzip.compress(body, 9, mtime=0)}
+    if brotli is not None:
+      variants["br"] = brotli.compress(body, quality=11)
+    a["variants"] = {k: v for k, v in variants.items() if len(v) < len(body)}
+  return a
+
+def pick_encoding(accept, available):
+  # First of `available` (server preference order) that Accept-Encoding allows; None means identity
+  if not accept or not available:
+    return None
+  q = {}
+  for part in accept.split(","):
+    name, _, params = part.strip().partition(";")
+    params = params.strip()
+    try:
+      q[name.strip().lower()] = float(params[2:]) if params.startswith("q=") else 1.0
+    except ValueError:
+      q[name.strip().lower()] = 0.0
+  for enc in available:
+    if q.get(enc, q.get("*", 0)) > 0:
+      return enc
+  return None
+
+def dynamic_encodings():
+  return ("br", "gzip") if brotli is not None else ("gzip",)
+
+def compress_response(resp, headers):
+  # On-the-fly compression for API responses above COMPRESS_MIN
+  status, hdrs, data = resp
+  if len(data) < COMPRESS_MIN:
+    return resp
+  hdrs = dict(hdrs, Vary="Accept-Encoding")
+  enc = pick_encoding(headers.get("Accept-Encoding"), dynamic_encodings())
+  if enc is None:
+    return status, hdrs, data
+  data = brotli.compress(data, quality=4) if enc == "br" else gzip.compress(data, 5, mtime=0)
+  hdrs["Content-Encoding"] = enc
+  return status, hdrs, data
+
+def stream_encoder(headers):
+  # Chunk encoder for streamed responses: gzip with a sync flush per chunk, so every batch is decodable on arrival
+  if pick_encoding(headers.get("Accept-Encoding"), ("gzip",)) is None:
+    return None, lambda data: data or b""
+  z = zlib.compressobj(6, zlib.DEFLATED, 31)
+  def encode(data):
+    if data is None:
+      return z.flush(zlib.Z_FINISH)
+    return z.compress(data) + z.flush(zlib.Z_SYNC_FLUSH)
+  return "gzip", encode
+
+def build_asset_store():
+  # Decode every embedded asset exactly once; requests are then served straight from these bytes
+  try:
+    mtime = int(os.path.getmtime(__file__))
+  except OSError:
+    mtime = int(time.time())
+  store = {}
+  for path, content in ASSETS_TEXT.items():
+    store["/" + path] = _asset(content.encode("utf-8"), path, mtime)
+  for path, b64 in ASSETS_BIN.items():
+    store["/" + path] = _asset(base64.b64decode(b64), path, mtime)
+  # Point index.html at content-hashed URLs so the browser may cache those as immutable
+  # (sw.js keeps its plain URL: the service worker must always be revalidated)
+  def versioned(m):
+    a = store.get("/" + m.group(2))
+    if a is None or m.group(2) == "sw.js":
+      return m.group(0)
+    return f'{m.group(1)}="{m.group(2)}?v={a["version"]}"'
+  html = re.sub(r'(href|src)="([^"?#:]+)"', versioned, ASSETS_TEXT["index.html"])
+  store["/index.html"] = _asset(html.encode("utf-8"), "index.html", mtime)
+  store["/"] = store["/index.html"]
+  return store
+
+def not_modified(asset, headers):
+  # If-None-Match wins over If-Modified-Since (weak comparison is fine for GET/HEAD)
+  inm = headers.get("If-None-Match")
+  if inm is not None:
+    # Any encoding's tag ("<digest>" or "<digest>-gzip"/"-br") validates the same content
+    tags = [t.strip().removeprefix("W/").strip('"').split("-")[0] for t in inm.split(",")]
+    return "*" in tags or asset["digest"] in tags
+  ims = headers.get("If-Modified-Since")
+  if ims:
+    try:
+      return int(parsedate_to_datetime(ims).timestamp()) >= asset["mtime"]
+    except (TypeError, ValueError, IndexError, OverflowError):
+      return False
+  return False
+
 def write_assets(root):
   os.makedirs(os.path.join(root, "assets"), exist_ok=True)
   for path, content in ASSETS_TEXT.items():
@@ -32,21 +155,578 @@ def write_assets(root):
     with open(full, "wb") as f:
       f.write(base64.b64decode(b64))
 
+# --- Batch scoring (the math lives in ptau217_engine; this is the HTTP/NDJSON plumbing) ---
+MAX_BODY = 64 * 1024 * 1024
+STREAM_BATCH = 512      # NDJSON rows scored (and flushed) together on /api/posterior/stream
+MAX_LINE = 1024 * 1024  # longest single NDJSON case line accepted
+BODY_BLOCK = 64 * 1024  # request bodies are read in blocks of at most this, whatever a chunk header claims
+
+def parse_ndjson_line(line_no, line):
+  # One NDJSON upload line -> (case, None) or (None, encoded error row)
+  try:
+    c = json.loads(line)
+    if not isinstance(c, dict):
+      raise ValueError("each line must be a JSON object")
+    return c, None
+  except ValueError as e:
+    return None, (json.dumps({"ok": False, "line": line_no, "error": str(e)}) + "\n").encode("utf-8")
+
+def score_ndjson_batch(batch, timing=None):
+  # [(line_no, case)] -> encoded NDJSON rows for one streamed chunk
+  timing = timing or ServerTiming()
+  try:
+    rows = engine.score_cases([c for _, c in batch])
+  except (ValueError, TypeError):
+    # Locate the offending rows so one bad case doesn't sink its neighbours
+    rows = []
+    for _, c in batch:
+      try:
+        rows.append(engine.score_cases([c])[0])
+      except (ValueError, TypeError) as e:
+        rows.append({"ok": False, "error": str(e)})
+  timing.mark("compute")
+  out = []
+  for (line_no, c), r in zip(batch, rows):
+    r.setdefault("ok", True)
+    r["line"] = line_no
+    if "id" in c:
+      r["id"] = c["id"]
+    out.append(json.dumps(r))
+  data = ("\n".join(out) + "\n").encode("utf-8")
+  timing.mark("serialize")
+  return data
+
+def split_lines(blocks):
+  # Re-split a stream of body blocks into NDJSON lines
+  tail = b""
+  for b in blocks:
+    tail += b
+    *lines, tail = tail.split(b"\n")
+    if len(tail) > MAX_LINE:
+      raise ValueError("NDJSON line too long")
+    yield from lines
+  if tail:
+    yield tail
+
+def chunk(data):
+  return b"%x\r\n%s\r\n" % (len(data), data) if data else b""
+
+def last_chunk(timing):
+  # Terminating chunk; streamed responses carry Server-Timing as a trailer (announced up front)
+  return f"0\r\nServer-Timing: {timing.header()}\r\n\r\n".encode("latin-1")
+
+# --- Metrics: sharded counters on the hot path, summed only when /api/metrics is scraped ---
+API_ROUTES = ("/api/ping", "/api/posterior", "/api/posterior/stream", "/api/metrics", "/api/profile", "/api/ready")
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_SHARDS = 16
+
+def route_label(path):
+  # Bounded label set: every asset is "static", unknown API paths collapse to "/api/other"
+  if path.startswith("/api/"):
+    return path if path in API_ROUTES else "/api/other"
+  return "static"
+
+class _Shard:
+  __slots__ = ("lock", "requests", "inflight", "sent", "buckets", "seconds")
+
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.requests = {}  # (route, method, status) -> count
+    self.inflight = {}  # route -> gauge contribution from this shard
+    self.sent = {}      # route -> response bytes
+    self.buckets = {}   # route -> per-bucket counts (last slot is +Inf)
+    self.seconds = {}   # route -> summed latency
+
+class Metrics:
+  # Each thread is dealt a shard round-robin the first time it records a request (thread idents are
+  # page-aligned, so ident % N would put every thread on shard 0); concurrent threads then rarely
+  # contend for the same lock, and the threaded server's one-thread-per-request churn doesn't grow
+  # the registry.
+  def __init__(self, shards=METRIC_SHARDS):
+    self.shards = [_Shard() for _ in range(shards)]
+    self.started = time.time()
+    self._next = itertools.count()
+    self._local = threading.local()
+
+  def _shard(self):
+    sh = getattr(self._local, "shard", None)
+    if sh is None:
+      sh = self._local.shard = self.shards[next(self._next) % len(self.shards)]
+    return sh
+
+  def begin(self, route):
+    sh = self._shard()
+    with sh.lock:
+      sh.inflight[route] = sh.inflight.get(route, 0) + 1
+    return time.perf_counter()
+
+  def end(self, route, method, status, nbytes, t0):
+    dt = time.perf_counter() - t0
+    i = bisect.bisect_left(LATENCY_BUCKETS, dt)
+    key = (route, method, str(status))
+    sh = self._shard()
+    with sh.lock:
+      sh.inflight[route] = sh.inflight.get(route, 0) - 1
+      sh.requests[key] = sh.requests.get(key, 0) + 1
+      sh.sent[route] = sh.sent.get(route, 0) + nbytes
+      b = sh.buckets.get(route)
+      if b is None:
+        b = sh.buckets[route] = [0] * (len(LATENCY_BUCKETS) + 1)
+      b[i] += 1
+      sh.seconds[route] = sh.seconds.get(route, 0.0) + dt
+
+  def snapshot(self):
+    requests, inflight, sent, buckets, seconds = {}, {}, {}, {}, {}
+    for sh in self.shards:
+      with sh.lock:
+        for src, dst in ((sh.requests, requests), (sh.inflight, inflight), (sh.sent, sent), (sh.seconds, seconds)):
+          for k, v in src.items():
+            dst[k] = dst.get(k, 0) + v
+        for k, v in sh.buckets.items():
+          acc = buckets.setdefault(k, [0] * len(v))
+          for j, n in enumerate(v):
+            acc[j] += n
+    return requests, inflight, sent, buckets, seconds
+
+  def render(self):
+    requests, inflight, sent, buckets, seconds = self.snapshot()
+    out = []
+    def family(name, kind, help_):
+      out.append(f"# HELP {name} {help_}")
+      out.append(f"# TYPE {name} {kind}")
+    family("ptau217_http_requests_total", "counter", "HTTP requests handled.")
+    for (r, m, st), n in sorted(requests.items()):
+      out.append(f'ptau217_http_requests_total{{route="{r}",method="{m}",status="{st}"}} {n}')
+    family("ptau217_http_requests_in_flight", "gauge", "HTTP requests currently being handled.")
+    for r, n in sorted(inflight.items()):
+      out.append(f'ptau217_http_requests_in_flight{{route="{r}"}} {n}')
+    family("ptau217_http_response_bytes_total", "counter", "Response bytes written (headers and body).")
+    for r, n in sorted(sent.items()):
+      out.append(f'ptau217_http_response_bytes_total{{route="{r}"}} {n}')
+    family("ptau217_http_request_duration_seconds", "histogram", "Time from parsed request line to last byte written.")
+    for r, b in sorted(buckets.items()):
+      cum = 0
+      for le, n in zip(LATENCY_BUCKETS + ("+Inf",), b):
+        cum += n
+        out.append(f'ptau217_http_request_duration_seconds_bucket{{route="{r}",le="{le}"}} {cum}')
+      out.append(f'ptau217_http_request_duration_seconds_sum{{route="{r}"}} {seconds[r]:.6f}')
+      out.append(f'ptau217_http_request_duration_seconds_count{{route="{r}"}} {cum}')
+    family("process_resident_memory_bytes", "gauge", "Resident set size.")
+    out.append(f"process_resident_memory_bytes {process_rss()}")
+    family("process_threads", "gauge", "Live Python threads.")
+    out.append(f"process_threads {threading.active_count()}")
+    family("process_cpu_seconds_total", "counter", "User plus system CPU time.")
+    t = os.times()
+    out.append(f"process_cpu_seconds_total {t.user + t.system:.3f}")
+    family("process_start_time_seconds", "gauge", "Start time since the epoch.")
+    out.append(f"process_start_time_seconds {self.started:.3f}")
+    family("ptau217_worker_info", "gauge", "Process answering this scrape (one per --workers process).")
+    out.append(f'ptau217_worker_info{{pid="{os.getpid()}"}} 1')
+    return ("\n".join(out) + "\n").encode("utf-8")
+
+def process_rss():
+  try:
+    with open("/proc/self/statm") as f:
+      return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+  except (OSError, ValueError, AttributeError):
+    pass
+  try:
+    import resource  # no /proc: fall back to the peak RSS (kB on Linux, bytes on macOS)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+  except ImportError:
+    return 0
+
+METRICS = Metrics()
+
+# --- Server-Timing and on-demand profiling ---
+TIMING_PHASES = ("parse", "compute", "serialize")
+PROFILE_MAX_REQUESTS = 10000
+PROFILE_MAX_SECONDS = 3600
+
+class ServerTiming:
+  # Per-request phase clock: mark(phase) charges the time since the previous mark to that phase
+  def __init__(self, t0=None):
+    self.t0 = self.t = t0 if t0 is not None else time.perf_counter()
+    self.dur = dict.fromkeys(TIMING_PHASES, 0.0)
+
+  def mark(self, phase):
+    now = time.perf_counter()
+    self.dur[phase] += now - self.t
+    self.t = now
+
+  def header(self):
+    parts = [f"{p};dur={d * 1000:.3f}" for p, d in self.dur.items()]
+    parts.append(f"total;dur={(time.perf_counter() - self.t0) * 1000:.3f}")
+    return ", ".join(parts)
+
+class Profiler:
+  # Arms cProfile for the next N requests and/or T seconds, writing one .pstats file per request.
+  # Only one request is profiled at a time; requests that overlap a profiled one run unprofiled.
+  def __init__(self, directory=None):
+    self.dir = directory or os.environ.get("PTAU217_PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "ptau217-profiles")
+    self.lock = threading.Lock()
+    self.busy = threading.Lock()
+    self.armed = False
+    self.remaining = None  # requests left (None: no request limit)
+    self.until = None      # time.monotonic() deadline (None: no time limit)
+    self.written = 0
+
+  def arm(self, requests=None, seconds=None):
+    # Neither limit given (or both zero) disarms
+    if (requests is not None and requests < 0) or (seconds is not None and seconds < 0):
+      raise ValueError("profile limits must be non-negative")
+    with self.lock:
+      self.remaining = min(int(requests), PROFILE_MAX_REQUESTS) if requests else None
+      self.until = time.monotonic() + min(float(seconds), PROFILE_MAX_SECONDS) if seconds else None
+      self.armed = self.remaining is not None or self.until is not None
+    return self.status()
+
+  def arm_from_spec(self, spec):
+    # "20" -> next 20 requests, "30s" -> next 30 seconds, "20,30s" -> whichever runs out first
+    requests = seconds = None
+    for tok in (spec or "").replace(" ", "").split(","):
+      if tok.endswith("s"):
+        seconds = float(tok[:-1])
+      elif tok:
+        requests = int(tok)
+    return self.arm(requests, seconds)
+
+  def status(self):
+    with self.lock:
+      left = None if self.until is None else max(0.0, round(self.until - time.monotonic(), 3))
+      return {"ok": True, "armed": self.armed, "requests_left": self.remaining, "seconds_left": left,
+              "dir": self.dir, "written": self.written, "pid": os.getpid()}
+
+  def start(self):
+    # -> enabled cProfile.Profile, or None when disarmed/busy (the disarmed check is lock-free)
+    if not self.armed:
+      return None
+    with self.lock:
+      if self.until is not None and time.monotonic() >= self.until:
+        self.armed = False
+      if not self.armed or not self.busy.acquire(blocking=False):
+        return None
+      if self.remaining is not None:
+        self.remaining -= 1
+        self.armed = self.remaining > 0
+    prof = cProfile.Profile()
+    try:
+      prof.enable()
+    except ValueError:
+      # another profiler/debugger owns the hook
+      self.busy.release()
+      return None
+    return prof
+
+  def finish(self, prof, method, label):
+    prof.disable()
+    self.busy.release()
+    if label is None:
+      return  # connection closed before a request arrived
+    with self.lock:
+      self.written += 1
+      seq = self.written
+    name = "{}-{}-{:05d}-{}-{}.pstats".format(time.strftime("%Y%m%d-%H%M%S"), os.getpid(), seq, method or "-",
+                                              label.strip("/").replace("/", "_") or "root")
+    try:
+      os.makedirs(self.dir, exist_ok=True)
+      prof.dump_stats(os.path.join(self.dir, name))
+    except OSError as e:
+      print(f"profile not written: {e}", file=sys.stderr)
+
+  def call(self, method, label, fn, *args):
+    prof = self.start()
+    if prof is None:
+      return fn(*args)
+    try:
+      return fn(*args)
+    finally:
+      self.finish(prof, method, label)
+
+PROFILER = Profiler()
+
+# --- Routing shared by the threaded and asyncio servers ---
+NO_BODY = (204, 304)
+READY = threading.Event()  # set once the assets are loaded and this process is accepting; cleared on shutdown
+
+def json_response(obj, status=200):
+  return status, {"Content-Type": "application/json"}, json.dumps(obj).encode("utf-8")
+
+def posterior_response(body, timing):
+  if np is None:
+    return json_response({"ok":False,"error":"numpy is required for /api/posterior"}, 503)
+  try:
+    cases = json.loads(body)
+    if not isinstance(cases, list) or not all(isinstance(c, dict) for c in cases):
+      raise ValueError("body must be a JSON array of case objects")
+  except ValueError as e:
+    return json_response({"ok":False,"error":str(e)}, 400)
+  timing.mark("parse")
+  try:
+    results = engine.score_cases(cases) if cases else []
+  except (ValueError, TypeError) as e:
+    # Name the bad cases (index into the array), re-scoring one at a time only on this error path
+    errors = []
+    for i, c in enumerate(cases):
+      try:
+        engine.score_cases([c])
+      except (ValueError, TypeError) as err:
+        errors.append({"case": i, "error": str(err)})
+    error = f"case {errors[0]['case']}: {errors[0]['error']}" if errors else str(e)
+    return json_response({"ok":False,"error":error,"errors":errors}, 400)
+  timing.mark("compute")
+  return json_response({"ok":True,"n":len(results),"results":results})
+
+NO_CORS_ROUTES = ("/api/profile",)  # answered without Access-Control-Allow-Origin: *
+
+def profile_allowed(client, headers):
+  # Arming writes .pstats files, so only a client on this machine may do it, and not a web page from
+  # another origin (browsers send Origin on cross-site POSTs; curl does not)
+  try:
+    addr = ipaddress.ip_address(client or "")
+  except ValueError:
+    return False
+  if not (addr.is_loopback or (addr.version == 6 and addr.ipv4_mapped and addr.ipv4_mapped.is_loopback)):
+    return False
+  origin = headers.get("Origin")
+  return not origin or urlparse(origin).netloc == headers.get("Host")
+
+def profile_response(method, target, headers=None, client=None):
+  # GET: profiler status; POST ?requests=N and/or ?seconds=T: (re-)arm it, no limits disarms
+  if method != "POST":
+    return json_response(PROFILER.status())
+  if not profile_allowed(client, headers or {}):
+    return json_response({"ok":False,"error":"the profiler can only be armed from this machine (not from a web page)"}, 403)
+  query = parse_qs(urlparse(target).query)
+  try:
+    requests = int(query["requests"][0]) if "requests" in query else None
+    seconds = float(query["seconds"][0].rstrip("s")) if "seconds" in query else None
+    return json_response(PROFILER.arm(requests, seconds))
+  except ValueError as e:
+    return json_response({"ok":False,"error":str(e)}, 400)
+
+def route(method, target, headers, body, assets, timing=None, client=None):
+  # Transport-neutral dispatch for every non-streaming route: returns (status, headers, body).
+  # Phases are charged to timing; the transport turns it into the Server-Timing header.
+  # client is the peer's IP address (None if unknown).
+  timing = timing or ServerTiming()
+  path = urlparse(target).path
+  if path == "/api/profile" and method in ("GET", "HEAD", "POST"):
+    return profile_response(method, target, headers, client)
+  if method == "OPTIONS":
+    # CORS preflight for the JSON POST endpoints
+    return 204, {"Access-Control-Allow-Methods": "GET, HEAD, POST, OPTIONS", "Access-Control-Allow-Headers": "Content-Type"}, b""
+  if method in ("GET", "HEAD"):
+    # Minimal backend endpoint
+    if path.startswith("/api/ping"):
+      return json_response({"ok":True,"name":"pTau217App","version":"1.0"})
+    if path == "/api/ready":
+      # Readiness probe for supervisors/load balancers: 503 until serving, and again while shutting down
+      ready = READY.is_set()
+      status, hdrs, data = json_response({"ok":ready,"ready":ready,"pid":os.getpid()}, 200 if ready else 503)
+      hdrs["Cache-Control"] = "no-store"
+      return status, hdrs, data
+    if path == "/api/metrics":
+      text = METRICS.render()
+      timing.mark("compute")
+      resp = compress_response((200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8", "Cache-Control": "no-store"}, text), headers)
+      timing.mark("serialize")
+      return resp
+    asset = assets.get(path) if assets is not None else None
+    if asset is None:
+      return 404, {"Content-Type": "text/plain; charset=utf-8"}, b"File not found"
+    query = parse_qs(urlparse(target).query)
+    cache = IMMUTABLE if query.get("v", [None])[0] == asset["version"] else REVALIDATE
+    enc = pick_encoding(headers.get("Accept-Encoding"), [e for e in ("br", "gzip") if e in asset["variants"]])
+    etag = f'"{asset["digest"]}-{enc}"' if enc else asset["etag"]
+    validators = {"ETag": etag, "Last-Modified": asset["modified"], "Cache-Control": cache}
+    if asset["variants"]:
+      validators["Vary"] = "Accept-Encoding"
+    timing.mark("compute")
+    if not_modified(asset, headers):
+      return 304, validators, b""
+    out = dict(validators, **{"Content-Type": asset["type"]})
+    if enc:
+      out["Content-Encoding"] = enc
+      return 200, out, asset["variants"][enc]
+    return 200, out, asset["body"]
+  if method == "POST" and path == "/api/posterior":
+    resp = compress_response(posterior_response(body, timing), headers)
+    timing.mark("serialize")
+    return resp
+  return json_response({"ok":False,"error":"not found"}, 404)
+
+class _CountingWriter:
+  # Wraps the handler's wfile to count response bytes for the metrics registry
+  def __init__(self, raw):
+    self.raw, self.count = raw, 0
+
+  def write(self, data):
+    self.count += len(data)
+    return self.raw.write(data)
+
+  def flush(self):
+    return self.raw.flush()
+
+  def __getattr__(self, name):
+    return getattr(self.raw, name)
+
 class Handler(SimpleHTTPRequestHandler):
+  # In-memory asset store (path -> {"body","type"}); None means serve extracted files from disk
+  assets = None
+
+  def setup(self):
+    super().setup()
+    self.wfile = _CountingWriter(self.wfile)
+
+  def parse_request(self):
+    self._timing = ServerTiming()
+    ok = super().parse_request()
+    self._timing.mark("parse")
+    if ok:
+      self._metric = route_label(urlparse(self.path).path)
+      self._t0 = METRICS.begin(self._metric)
+      self._sent0 = self.wfile.count
+    return ok
+
+  def send_response(self, code, message=None):
+    self._status = code
+    return super().send_response(code, message)
+
+  def handle_one_request(self):
+    self._metric = None
+    self._status = 0
+    self._timing = None
+    self._trailer = False
+    prof = PROFILER.start()
+    try:
+      super().handle_one_request()
+    finally:
+      if self._metric is not None:
+        METRICS.end(self._metric, self.command, self._status, self.wfile.count - self._sent0, self._t0)
+      if prof is not None:
+        PROFILER.finish(prof, self.command, self._metric)
+
   def end_headers(self):
     # Minimal CORS to allow local fetch if needed
-    self.send_header("Access-Control-Allow-Origin", "*")
+    if urlparse(self.path).path not in NO_CORS_ROUTES:
+      self.send_header("Access-Control-Allow-Origin", "*")
+    if self._timing is not None and not self._trailer:
+      self.send_header("Server-Timing", self._timing.header())
     return super().end_headers()
 
+  def dispatch(self, method, body=b""):
+    self._timing.mark("parse")
+    status, headers, data = route(method, self.path, self.headers, body, self.assets, self._timing, self.client_address[0])
+    self.send_response(status)
+    for k, v in headers.items():
+      self.send_header(k, v)
+    if status not in NO_BODY:
+      self.send_header("Content-Length", str(len(data)))
+    self.end_headers()
+    if method != "HEAD" and data:
+      self.wfile.write(data)
+
+  def from_disk(self):
+    return self.assets is None and not self.path.startswith("/api/")
+
+  def iter_body_lines(self):
+    # Yield request body lines as they arrive (chunked or Content-Length), never buffering the whole body
+    if "chunked" in (self.headers.get("Transfer-Encoding") or "").lower():
+      def blocks():
+        while True:
+          size = int(self.rfile.readline(64).split(b";")[0].strip() or b"0", 16)
+          if size == 0:
+            while self.rfile.readline(1024).strip():
+              pass  # trailers
+            return
+          while size > 0:
+            b = self.rfile.read(min(size, BODY_BLOCK))
+            if not b:
+              return
+            size -= len(b)
+            yield b
+          self.rfile.readline(4)  # CRLF after chunk data
+    else:
+      def blocks():
+        left = int(self.headers.get("Content-Length") or 0)
+        while left > 0:
+          b = self.rfile.read(min(left, BODY_BLOCK))
+          if not b:
+            return
+          left -= len(b)
+          yield b
+    return split_lines(blocks())
+
+  def score_stream(self):
+    # NDJSON in, NDJSON out: rows are scored in STREAM_BATCH groups and flushed as chunks
+    self.protocol_version = "HTTP/1.1"
+    enc, encode = stream_encoder(self.headers)
+    self.send_response(200)
+    self.send_header("Content-Type", "application/x-ndjson")
+    self.send_header("Transfer-Encoding", "chunked")
+    if enc:
+      self.send_header("Content-Encoding", enc)
+    self.send_header("Vary", "Accept-Encoding")
+    self.send_header("Connection", "close")
+    self.send_header("Trailer", "Server-Timing")
+    self._trailer = True
+    self.end_headers()
+    self.close_connection = True
+    timing = self._timing
+    batch = []
+
+    def flush():
+      self.wfile.write(chunk(encode(score_ndjson_batch(batch, timing))))
+      timing.mark("serialize")
+
+    try:
+      for line_no, line in enumerate(self.iter_body_lines(), 1):
+        if not line.strip():
+          continue
+        c, err = parse_ndjson_line(line_no, line)
+        timing.mark("parse")
+        if err:
+          self.wfile.write(chunk(encode(err)))
+          continue
+        batch.append((line_no, c))
+        if len(batch) >= STREAM_BATCH:
+          flush()
+          batch = []
+      if batch:
+        flush()
+    except ValueError as e:
+      # Framing problem in the upload itself: report it and end the stream
+      self.wfile.write(chunk(encode((json.dumps({"ok": False, "error": str(e)}) + "\n").encode("utf-8"))))
+    self.wfile.write(chunk(encode(None)) + last_chunk(timing))
+
+  def do_OPTIONS(self):
+    self.dispatch("OPTIONS")
+
+  def do_POST(self):
+    if urlparse(self.path).path == "/api/posterior/stream":
+      if np is None:
+        self.send_response(503); self.send_header("Content-Length", "0"); self.end_headers()
+        return
+      self.score_stream()
+      return
+    length = int(self.headers.get("Content-Length") or 0)
+    if length > MAX_BODY:
+      self.send_error(413, "Request body too large")
+      return
+    self.dispatch("POST", self.rfile.read(length) if length > 0 else b"")
+
+  def do_HEAD(self):
+    if self.from_disk():
+      return super().do_HEAD()
+    self.dispatch("HEAD")
+
   def do_GET(self):
-    # Minimal backend endpoint
-    if self.path.startswith("/api/ping"):
-      self.send_response(200)
-      self.send_header("Content-Type","application/json")
-      self.end_headers()
-      self.wfile.write(json.dumps({"ok":True,"name":"pTau217App","version":"1.0"}).encode("utf-8"))
+    if not self.from_disk():
+      self.dispatch("GET")
       return
-    # Correct MIME for webmanifest
+    # Extracted-to-disk fallback: correct MIME for webmanifest
     if self.path.endswith(".webmanifest"):
       self.send_response(200)
       try:
@@ -61,49 +741,510 @@ class Handler(SimpleHTTPRequestHandler):
       return
     return super().do_GET()
 
-def find_free_port(start=PORT_START, limit=20):
-  import socket
-  for p in range(start, start+limit):
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-      s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+# --- asyncio server: HTTP/1.1 keep-alive, one coroutine (not one thread) per connection ---
+KEEPALIVE_TIMEOUT = 75  # seconds an idle keep-alive connection is held open
+MAX_HEADER_LINES = 100
+
+def _head(status, headers, length=None, keep_alive=True, cors=True):
+  lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}", "Server: pTau217App", "Date: " + formatdate(usegmt=True)]
+  if cors:
+    lines.append("Access-Control-Allow-Origin: *")
+  lines += [f"{k}: {v}" for k, v in headers.items()]
+  if length is not None:
+    lines.append(f"Content-Length: {length}")
+  lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+  return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+async def _body_blocks(reader, headers):
+  # Async twin of Handler.iter_body_lines' block reader
+  if "chunked" in (headers.get("Transfer-Encoding") or "").lower():
+    while True:
+      size = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+      if size == 0:
+        while (await reader.readline()).strip():
+          pass  # trailers
+        return
+      while size > 0:
+        b = await reader.readexactly(min(size, BODY_BLOCK))
+        size -= len(b)
+        yield b
+      await reader.readline()  # CRLF after chunk data
+  else:
+    left = int(headers.get("Content-Length") or 0)
+    while left > 0:
+      b = await reader.read(min(left, BODY_BLOCK))
+      if not b:
+        return
+      left -= len(b)
+      yield b
+
+async def _stream_async(reader, writer, headers, timing):
+  # Returns the number of bytes written, for the metrics registry
+  loop = asyncio.get_running_loop()
+  enc, encode = stream_encoder(headers)
+  hdrs = {"Content-Type": "application/x-ndjson", "Transfer-Encoding": "chunked", "Vary": "Accept-Encoding",
+          "Trailer": "Server-Timing"}
+  if enc:
+    hdrs["Content-Encoding"] = enc
+  batch, line_no, tail, sent = [], 0, b"", 0
+
+  def emit(data):
+    nonlocal sent
+    sent += len(data)
+    writer.write(data)
+
+  async def flush():
+    emit(chunk(encode(await loop.run_in_executor(None, score_ndjson_batch, batch, timing))))
+    timing.mark("serialize")
+    await writer.drain()
+
+  async def take(line):
+    nonlocal batch, line_no
+    line_no += 1
+    if not line.strip():
+      return
+    c, err = parse_ndjson_line(line_no, line)
+    timing.mark("parse")
+    if err:
+      emit(chunk(encode(err)))
+      return
+    batch.append((line_no, c))
+    if len(batch) >= STREAM_BATCH:
+      await flush()
+      batch = []
+
+  emit(_head(200, hdrs, keep_alive=False))
+  try:
+    async for b in _body_blocks(reader, headers):
+      tail += b
+      *lines, tail = tail.split(b"\n")
+      if len(tail) > MAX_LINE:
+        raise ValueError("NDJSON line too long")
+      for line in lines:
+        await take(line)
+    if tail:
+      await take(tail)
+    if batch:
+      await flush()
+  except ValueError as e:
+    emit(chunk(encode((json.dumps({"ok": False, "error": str(e)}) + "\n").encode("utf-8"))))
+  emit(chunk(encode(None)) + last_chunk(timing))
+  await writer.drain()
+  return sent
+
+async def _handle_connection(reader, writer, assets):
+  loop = asyncio.get_running_loop()
+  peer = writer.get_extra_info("peername")
+  client = peer[0] if isinstance(peer, tuple) else None
+  try:
+    while True:
       try:
-        s.bind(("127.0.0.1", p))
-        return p
-      except OSError:
+        line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+      except asyncio.TimeoutError:
+        break
+      if not line:
+        break
+      if not line.strip():
         continue
+      timing = ServerTiming()
+      raw, complete = [], False
+      while len(raw) < MAX_HEADER_LINES:
+        h = await reader.readline()
+        if h in (b"\r\n", b"\n", b""):
+          complete = True
+          break
+        raw.append(h)
+      if not complete:
+        # The rest of the header block is still unread: answer and drop the connection
+        writer.write(_head(431, {"Server-Timing": timing.header()}, 0, keep_alive=False))
+        break
+      try:
+        method, target, version = line.decode("latin-1").split()
+      except ValueError:
+        writer.write(_head(400, {"Server-Timing": timing.header()}, 0, keep_alive=False))
+        break
+      headers = http.client.parse_headers(io.BytesIO(b"".join(raw) + b"\r\n"))
+      conn = (headers.get("Connection") or "").lower()
+      keep_alive = conn != "close" if version == "HTTP/1.1" else conn == "keep-alive"
+      if (headers.get("Expect") or "").lower() == "100-continue" and version == "HTTP/1.1" \
+          and int(headers.get("Content-Length") or 0) <= MAX_BODY:
+        # curl and others hold the body back (about 1 s) until they see this
+        writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        await writer.drain()
+      label = route_label(urlparse(target).path)
+      t0 = METRICS.begin(label)
+      status, sent = 0, 0
+      try:
+        if method == "POST" and label == "/api/posterior/stream":
+          if np is None:
+            head = _head(503, {"Server-Timing": timing.header()}, 0, keep_alive=False)
+            status, sent = 503, len(head)
+            writer.write(head)
+          else:
+            status = 200
+            sent = await _stream_async(reader, writer, headers, timing)
+          break
+
+        body, too_big = b"", False
+        if "chunked" in (headers.get("Transfer-Encoding") or "").lower():
+          parts, size = [], 0
+          async for b in _body_blocks(reader, headers):
+            size += len(b)
+            if size > MAX_BODY:
+              too_big = True
+              break
+            parts.append(b)
+          body = b"".join(parts)
+        else:
+          size = int(headers.get("Content-Length") or 0)
+          if size > MAX_BODY:
+            too_big = True
+          elif size > 0:
+            body = await reader.readexactly(size)
+        if too_big:
+          status = 413
+          writer.write(_head(413, {"Server-Timing": timing.header()}, 0, keep_alive=False))
+          break
+
+        timing.mark("parse")
+        # Profiling (when armed) covers the synchronous route work, not time spent awaiting the socket
+        args = (method, label, route, method, target, headers, body, assets, timing, client)
+        if method == "POST":
+          status, hdrs, data = await loop.run_in_executor(None, PROFILER.call, *args)
+        else:
+          status, hdrs, data = PROFILER.call(*args)
+        hdrs["Server-Timing"] = timing.header()
+        out = _head(status, hdrs, None if status in NO_BODY else len(data), keep_alive, label not in NO_CORS_ROUTES)
+        if method != "HEAD" and data:
+          out += data  # one write per response: head and body leave in the same segment(s)
+        writer.write(out)
+        sent = len(out)
+        await writer.drain()
+        if not keep_alive:
+          break
+      finally:
+        METRICS.end(label, method, status, sent, t0)
+  except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+    pass
+  finally:
+    writer.close()
+
+async def serve_asyncio(sock, assets, on_ready=None):
+  server = await asyncio.start_server(lambda r, w: _handle_connection(r, w, assets), sock=sock, backlog=1024)
+
+  def stop():
+    READY.clear()
+    server.close()
+
+  try:
+    # SIGTERM stops accepting and lets the loop wind down (supervisor/worker shutdown)
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop)
+  except (NotImplementedError, RuntimeError, AttributeError):
+    pass
+  READY.set()
+  if on_ready:
+    on_ready()
+  async with server:
+    try:
+      await server.serve_forever()
+    except asyncio.CancelledError:
+      pass
+
+def make_threaded_server(sock):
+  # ThreadingHTTPServer on an already-bound, listening socket
+  server = ThreadingHTTPServer(sock.getsockname()[:2], Handler, bind_and_activate=False)
+  server.socket.close()
+  server.socket = sock
+  server.server_address = sock.getsockname()[:2]
+  return server
+
+def listen_socket(host, port, backlog=1024):
+  # Explicit IPPROTO_TCP: asyncio only sets TCP_NODELAY on accepted sockets whose proto says TCP
+  sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+  try:
+    if os.name == "nt":
+      # SO_REUSEADDR on Windows lets a second process bind a port that is already in use
+      sock.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+    else:
+      sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+  except OSError:
+    sock.close()
+    raise
+  return sock
+
+def listen_free_port(host, start=PORT_START, limit=20):
+  # The first port that binds is kept bound and returned as a listening socket
+  # (probing and re-binding later races with anything else starting up)
+  for p in range(start, start+limit):
+    try:
+      return listen_socket(host, p)
+    except OSError:
+      continue
   raise RuntimeError("No free port found")
 
-def main():
-  # Use a persistent dir under user profile so SW scope is stable across runs
-  base = os.path.join(os.path.expanduser("~"), ".pTau217App")
-  os.makedirs(base, exist_ok=True)
-  write_assets(base)
-  os.chdir(base)
+def inherited_socket(fd=None):
+  # A listening socket handed over by the supervisor: --fd N, or systemd socket activation
+  # (LISTEN_PID/LISTEN_FDS; the first passed socket is fd 3). None when there is none.
+  if fd is None:
+    if os.environ.get("LISTEN_PID") != str(os.getpid()) or int(os.environ.get("LISTEN_FDS") or 0) < 1:
+      return None
+    fd = 3
+    for k in ("LISTEN_PID", "LISTEN_FDS", "LISTEN_FDNAMES"):
+      os.environ.pop(k, None)
+  sock = socket.socket(fileno=fd)
+  if sock.type != socket.SOCK_STREAM:
+    raise RuntimeError(f"fd {fd} is not a stream socket")
+  sock.setblocking(True)
+  sock.listen(1024)  # no-op for a socket that is already listening (raises the backlog at most)
+  return sock
 
-  port = find_free_port()
-  server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+def notify_supervisor(state):
+  # systemd Type=notify: "READY=1" / "STOPPING=1" over $NOTIFY_SOCKET; silently a no-op elsewhere
+  addr = os.environ.get("NOTIFY_SOCKET")
+  if not addr or not hasattr(socket, "AF_UNIX"):
+    return
+  if addr.startswith("@"):
+    addr = "\0" + addr[1:]  # abstract namespace
+  try:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as s:
+      s.sendto(state.encode("utf-8"), addr)
+  except OSError:
+    pass
 
-  def serve():
-    print(f"Serving on http://127.0.0.1:{port}  (Ctrl+C to quit)")
+# --- Pre-fork workers: N processes accept() on one inherited listening socket ---
+WORKER_STOP_TIMEOUT = 10  # seconds workers get to finish before SIGKILL
+WORKER_MIN_UPTIME = 1.0   # a worker dying faster than this is restarted with a back-off
+
+def run_worker(sock, mode, on_ready=None):
+  # Child process body: serve on the inherited socket until SIGTERM; on_ready() once accepting
+  signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C is handled by the supervisor
+  if mode == "asyncio":
+    asyncio.run(serve_asyncio(sock, Handler.assets, on_ready))
+    return
+  server = make_threaded_server(sock)
+
+  def stop(*_):
+    READY.clear()
+    threading.Thread(target=server.shutdown, daemon=True).start()
+
+  signal.signal(signal.SIGTERM, stop)
+  READY.set()
+  if on_ready:
+    on_ready()
+  server.serve_forever(poll_interval=0.5)
+
+def supervise(sock, workers, mode, on_ready=None):
+  # Fork `workers` children, restart any that die, and stop them all on SIGINT/SIGTERM. on_ready()
+  # runs once every worker has reported (its pid, over a pipe) that it is accepting connections.
+  children = {}
+  stopping = False
+  ready_r, ready_w = os.pipe()
+  ready_pids, pending = set(), b""
+
+  def spawn():
+    pid = os.fork()
+    if pid == 0:
+      code = 0
+      try:
+        os.close(ready_r)
+        run_worker(sock, mode, lambda: os.write(ready_w, b"%d\n" % os.getpid()))
+      except BaseException:
+        import traceback; traceback.print_exc()
+        code = 1
+      finally:
+        os._exit(code)
+    children[pid] = time.monotonic()
+
+  def stop(*_):
+    nonlocal stopping
+    stopping = True
+
+  signal.signal(signal.SIGTERM, stop)
+  signal.signal(signal.SIGINT, stop)
+  for _ in range(workers):
+    spawn()
+
+  while not stopping:
     try:
-      server.serve_forever(poll_interval=0.5)
-    except KeyboardInterrupt:
+      pid, status = os.waitpid(-1, os.WNOHANG)
+    except ChildProcessError:
+      pid = 0
+    if pid and pid in children:
+      started = children.pop(pid)
+      print(f"worker {pid} exited ({status}); restarting", file=sys.stderr)
+      if time.monotonic() - started < WORKER_MIN_UPTIME:
+        time.sleep(WORKER_MIN_UPTIME)
+      if not stopping:
+        spawn()
+      continue
+    if select.select([ready_r], [], [], 0.2)[0]:
+      *lines, pending = (pending + os.read(ready_r, 4096)).split(b"\n")
+      ready_pids.update(int(l) for l in lines)
+      if on_ready and all(p in ready_pids for p in children):
+        on_ready()
+        on_ready = None
+
+  for pid in children:
+    try:
+      os.kill(pid, signal.SIGTERM)
+    except ProcessLookupError:
       pass
+  deadline = time.monotonic() + WORKER_STOP_TIMEOUT
+  while children and time.monotonic() < deadline:
+    try:
+      pid, _ = os.waitpid(-1, os.WNOHANG)
+    except ChildProcessError:
+      break
+    if pid:
+      children.pop(pid, None)
+    else:
+      time.sleep(0.1)
+  for pid in children:
+    try:
+      os.kill(pid, signal.SIGKILL)
+      os.waitpid(pid, 0)
+    except (ProcessLookupError, ChildProcessError):
+      pass
+  os.close(ready_r)
+  os.close(ready_w)
+  sock.close()
 
-  t = threading.Thread(target=serve, daemon=True)
-  t.start()
+def parse_args(argv=None):
+  import argparse
+  ap = argparse.ArgumentParser(description="Serve the pTau217 PWA locally.",
+                               epilog="run_ptau217_app.py score COHORT [-o OUT] ... scores a cohort file instead (see score --help)")
+  ap.add_argument("--extract", nargs="?", const=os.path.join(os.path.expanduser("~"), ".pTau217App"), default=None, metavar="DIR",
+                  help="write the embedded assets to DIR (default ~/.pTau217App) and serve them from disk instead of memory")
+  ap.add_argument("--server", choices=("threaded", "asyncio"), default="threaded",
+                  help="threaded: one thread per HTTP/1.0 request (default); asyncio: single event loop with HTTP/1.1 keep-alive")
+  ap.add_argument("--workers", type=int, default=1, metavar="N",
+                  help="pre-fork N worker processes sharing the listening socket (POSIX only; default 1 = no fork)")
+  ap.add_argument("--host", default="127.0.0.1",
+                  help="address to bind (default 127.0.0.1; 0.0.0.0 or :: exposes the server to the network)")
+  ap.add_argument("--port", type=int, default=None,
+                  help=f"port to bind; fails if it is taken (default: first free port from {PORT_START}; 0 = any free port)")
+  ap.add_argument("--fd", type=int, default=None, metavar="N",
+                  help="serve on an already-bound listening socket inherited as file descriptor N "
+                       "(systemd LISTEN_FDS sockets are picked up automatically)")
+  ap.add_argument("--headless", action="store_true",
+                  help="service mode: do not open a browser")
+  ap.add_argument("--lr-curves", default=None, metavar="FILE",
+                  help="JSON LR curves ({modality: {values, lr}}, or ptau217_calibrate params) so batch cases can "
+                       "give raw assay values (valueA / valueB / tests[].value) instead of categories")
+  return ap.parse_args(argv)
 
-  url = f"http://127.0.0.1:{port}/"
+def open_browser(url):
   try:
     webbrowser.open(url)
   except Exception:
     pass
 
+def server_socket(args):
+  # Inherited socket > explicit --port > first free port from PORT_START
+  sock = inherited_socket(args.fd)
+  if sock is not None:
+    return sock
+  if args.port is not None:
+    try:
+      return listen_socket(args.host, args.port)
+    except OSError as e:
+      sys.exit(f"cannot bind {args.host}:{args.port}: {e.strerror or e}")
+  return listen_free_port(args.host)
+
+def main(argv=None):
+  argv = sys.argv[1:] if argv is None else argv
+  if argv[:1] == ["score"]:
+    # run_ptau217_app.py score cohort.csv -o out.csv: the batch scorer in ptau217_score.py, no server
+    if engine is None:
+      sys.exit("score needs numpy")
+    import ptau217_score
+    return ptau217_score.main(argv[1:])
+  args = parse_args(argv)
+  if os.environ.get("PTAU217_PROFILE"):
+    try:
+      PROFILER.arm_from_spec(os.environ["PTAU217_PROFILE"])
+    except ValueError:
+      sys.exit("PTAU217_PROFILE must look like 20 (requests), 30s (seconds) or 20,30s")
+  if args.workers < 1:
+    sys.exit("--workers must be at least 1")
+  if args.workers > 1 and not hasattr(os, "fork"):
+    sys.exit("--workers needs os.fork (not available on this platform)")
+  if args.extract and args.server == "asyncio":
+    sys.exit("--extract is only supported with --server threaded")
+  if args.lr_curves:
+    if engine is None:
+      sys.exit("--lr-curves needs numpy")
+    try:
+      engine.load_lr_curves(args.lr_curves)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+      sys.exit(f"cannot load LR curves from {args.lr_curves}: {e}")
+
+  # Bind (or adopt) the socket first: from here on connections queue in the backlog instead of
+  # being refused, and /api/ready answers 200 as soon as the assets below are loaded
+  sock = server_socket(args)
+  host, port = sock.getsockname()[:2]
+  if host in ("0.0.0.0", "::"):
+    host = "127.0.0.1"
+  url = f"http://[{host}]:{port}/" if ":" in host else f"http://{host}:{port}/"
+
+  if args.extract:
+    # Opt-in legacy mode: persistent dir under user profile, files served from disk
+    os.makedirs(args.extract, exist_ok=True)
+    write_assets(args.extract)
+    os.chdir(args.extract)
+  else:
+    Handler.assets = build_asset_store()
+
+  def ready():
+    notify_supervisor("READY=1")
+    if not args.headless:
+      open_browser(url)
+
+  if args.workers > 1:
+    print(f"Serving on {url}  ({args.workers} {args.server} workers; Ctrl+C to quit)", flush=True)
+    supervise(sock, args.workers, args.server, on_ready=ready)
+    notify_supervisor("STOPPING=1")
+    return
+
+  if args.server == "asyncio":
+    print(f"Serving on {url}  (asyncio, keep-alive; Ctrl+C to quit)", flush=True)
+    try:
+      asyncio.run(serve_asyncio(sock, Handler.assets, on_ready=ready))
+    except KeyboardInterrupt:
+      pass
+    notify_supervisor("STOPPING=1")
+    return
+
+  server = make_threaded_server(sock)
+
+  def serve():
+    print(f"Serving on {url}  (Ctrl+C to quit)", flush=True)
+    try:
+      server.serve_forever(poll_interval=0.5)
+    except KeyboardInterrupt:
+      pass
+
+  def stop(*_):
+    READY.clear()
+    threading.Thread(target=server.shutdown, daemon=True).start()
+
+  signal.signal(signal.SIGTERM, stop)
+  t = threading.Thread(target=serve, daemon=True)
+  READY.set()
+  t.start()
+  ready()
+
   # Keep main thread alive
   try:
     while t.is_alive():
       time.sleep(0.5)
+  except KeyboardInterrupt:
+    pass
   finally:
+    READY.clear()
+    notify_supervisor("STOPPING=1")
     server.shutdown()
 
 if __name__ == "__main__":
@@ -0,0 +1,4 @@
+# The pack's modules are plain scripts next to each other (no package); make them importable here
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,59 @@
+import csv, json, math
+import numpy as np
+import pytest
+import ptau217_calibrate as calibrate
+import ptau217_engine as engine
+
+MOD = "plasma_ptau217_generic"
+MU, SD = (0.5, -0.3), 0.4  # log-normal raw values for PET+ / PET-
+
+def cohort(path, n=4000, seed=23):
+  rng = np.random.default_rng(seed)
+  pet = rng.random(n) < 0.4
+  value = np.exp(np.where(pet, MU[0], MU[1]) + SD * rng.standard_normal(n))
+  with open(path, "w", newline="") as f:
+    w = csv.writer(f)
+    w.writerow(["age", "stage", "apoe", "pet", MOD + "_value"])
+    for i in range(n):
+      w.writerow([int(rng.integers(55, 90)), "MCI", "unknown", "pos" if pet[i] else "neg", f"{value[i]:.5g}"])
+
+@pytest.fixture
+def curves(monkeypatch):
+  monkeypatch.setattr(engine, "LR_CURVES", {})
+
+def test_calibrate_output_loads_as_lr_curves(tmp_path, curves):
+  cohort(tmp_path / "cohort.csv")
+  params = calibrate.calibrate([str(tmp_path / "cohort.csv")])
+  out = tmp_path / "params.json"
+  out.write_text(json.dumps(params, indent=1))
+  loaded = engine.load_lr_curves(str(out))
+  assert list(loaded) == [MOD]
+  table = params["params"]["LR_CURVES"][MOD]
+  assert np.allclose(loaded[MOD].to_dict()["values"], table["values"])
+  assert np.allclose(loaded[MOD].to_dict()["lr"], table["lr"])
+  # monotone and close to the true density ratio in the bulk of the data
+  assert np.all(np.diff(loaded[MOD].log_lr) >= 0)
+  x = np.exp(np.linspace(-0.3, 0.5, 5))
+  true = np.exp(((np.log(x) - MU[1]) ** 2 - (np.log(x) - MU[0]) ** 2) / (2 * SD ** 2))
+  t = engine.value_test(MOD, x)
+  assert np.all(t.cat == engine.POS) and np.allclose(np.log(t.lr_pos), np.log(true), atol=0.5)
+  # the curves block alone and the params block load the same way
+  for tables in (params["params"], params["params"]["LR_CURVES"]):
+    assert math.isclose(engine.load_lr_curves(tables)[MOD](1.0), loaded[MOD](1.0))
+
+def test_bad_table_leaves_curves_unchanged(curves):
+  engine.load_lr_curves({MOD: {"values": [0.5, 2.0], "lr": [0.2, 5.0]}})
+  before = engine.LR_CURVES[MOD]
+  for bad in ({"plasma_abeta42_40_generic": {"values": [1, 2], "lr": [1, 2]}, MOD: {"values": [2, 1], "lr": [1, 2]}},
+              {"plasma_abeta42_40_generic": {"values": [1, 2], "lr": [1, 2]}, "amyloid_pet": {"values": [1, 2], "lr": [1, 2]}},
+              {MOD: [1, 2]}):
+    with pytest.raises(ValueError):
+      engine.load_lr_curves(bad)
+    assert list(engine.LR_CURVES) == [MOD] and engine.LR_CURVES[MOD] is before
+
+def test_malformed_ndjson_lines_are_bad_rows(tmp_path):
+  good = {"age": 70, "stage": "MCI", "apoe": "e3e3", "pet": "pos", "plasma_ptau217_generic": "pos"}
+  path = tmp_path / "cohort.ndjson"
+  path.write_text("\n".join([json.dumps(good), '{"age": 71, "stage"', "[1, 2]", json.dumps(dict(good, pet="neg"))]) + "\n")
+  res = calibrate.calibrate([str(path)], chunk=2)
+  assert res["rows"] == 4 and res["bad_rows"] == 2 and res["prior_cases"] == 2
@@ -0,0 +1,18 @@
+import numpy as np
+import ptau217_decision as decision
+
+def test_net_benefit_matches_a_direct_count():
+  rng = np.random.default_rng(21)
+  # rounded posteriors so many patients sit exactly on a cutoff (p >= c counts them as eligible)
+  p = np.round(rng.uniform(0, 1, 3000), 2)
+  y = rng.random(3000) < p
+  for outcome in (y, None):
+    d = decision.decision_curves(p, outcome)
+    truth = p if outcome is None else y.astype(float)
+    for k, c in enumerate(d["cutoff"]):
+      flag = p >= c
+      tp, fp = truth[flag].sum(), flag.sum() - truth[flag].sum()
+      assert d["eligible"][k] == flag.sum()
+      assert np.isclose(d["net_benefit"][k], (tp - fp * c / (1 - c)) / len(p), rtol=1e-12, atol=1e-12)
+      assert np.isclose(d["scans_avoided"][k], 1 - flag.mean()) and np.isclose(d["sensitivity"][k], tp / truth.sum())
+    assert np.isclose(d["net_benefit_all"][0], (truth.sum() - (len(p) - truth.sum()) * 0.01 / 0.99) / len(p))
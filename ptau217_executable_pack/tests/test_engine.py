@@ -0,0 +1,130 @@
+import math, os, random
+import numpy as np
+import pytest
+import ptau217_engine as engine
+
+def reference_case(c):
+  # One case through app.js's scalar math (updateAutoPrior -> computeDiagnostic -> computeAutopsyPosteriors),
+  # step by step in plain floats: the batch engine must agree with it
+  age = float(c.get("age", 70))
+  y0, y1 = engine.PRIOR_ANCHORS[c.get("stage", "MCI")]
+  p = y0 if age <= 50 else y1 if age >= 90 else y0 + (age - 50) / 40 * (y1 - y0)
+  p = min(max(min(max(p, 0.01), 0.99), 1e-6), 1 - 1e-6)
+  o = p / (1 - p) * engine.APOE_OR[c.get("apoe", "unknown")]
+  prior = min(max(o / (1 + o), 1e-6), 1 - 1e-6)
+  if c.get("prior_override") is not None:
+    prior = min(max(float(c["prior_override"]), 1e-6), 1 - 1e-6)
+  se, sp = c.get("pet_se", engine.PET_SE), c.get("pet_sp", engine.PET_SP)
+  q = se * prior + (1 - sp) * (1 - prior)
+  ppv, lo = se * prior / q, (1 - se) * prior / (1 - q)
+  mix = lambda q: max(lo, min(ppv, q * ppv + (1 - q) * lo))
+  fixed, pet, aut = None, [], []
+  for mod, cat, _, _, _ in engine.case_steps(c):
+    if mod == engine.PET_MOD:
+      if fixed is None:
+        fixed = ppv if cat == "pos" else lo if cat == "neg" else mix(q)
+      q = 1.0 if cat == "pos" else 0.0 if cat == "neg" else q
+    elif 0 < q < 1 and cat != "indet":
+      lr = engine.TEST_LR[mod][0 if cat == "pos" else 1]
+      q = q / (1 - q) * lr / (1 + q / (1 - q) * lr)
+    pet.append(q)
+    aut.append(mix(q) if fixed is None else fixed)
+  return prior, pet, aut
+
+def random_cases(n, seed=217):
+  rnd = random.Random(seed)
+  mods = list(engine.TEST_LR)
+  cases = []
+  for i in range(n):
+    c = {"age": rnd.choice([rnd.randint(40, 100), round(rnd.uniform(45, 95), 2)]),
+         "stage": rnd.choice(engine.STAGES), "apoe": rnd.choice(engine.GENOTYPES),
+         "pet_se": rnd.choice([engine.PET_SE, 0.85]), "pet_sp": rnd.choice([engine.PET_SP, 0.95])}
+    if i % 7 == 0:
+      c["prior_override"] = rnd.uniform(0.02, 0.98)
+    c["tests"] = [{"mod": rnd.choice(mods), "cat": rnd.choice(engine.CATEGORIES)} for _ in range(rnd.randint(1, 4))]
+    cases.append(c)
+  return cases
+
+def test_score_cases_matches_scalar_reference():
+  cases = random_cases(400)
+  for c, r in zip(cases, engine.score_cases(cases)):
+    prior, pet, aut = reference_case(c)
+    assert math.isclose(r["prior"], prior, rel_tol=1e-12, abs_tol=1e-15)
+    for got, want in zip(r["pet_steps"] + r["autopsy_steps"], pet + aut):
+      assert math.isclose(got, want, rel_tol=1e-9, abs_tol=1e-12)
+
+def test_score_cases_test_a_b_form():
+  c = {"age": 74, "stage": "MCI", "apoe": "e3e4", "modA": "plasma_ptau217_generic", "catA": "pos",
+       "modB": "csf_abeta42_40_lumipulse", "catB": "neg"}
+  both, a_only = engine.score_cases([c, dict(c, useB="no")])
+  _, pet, aut = reference_case(c)
+  assert math.isclose(both["pet_A"], pet[0], rel_tol=1e-12) and math.isclose(both["autopsy_AB"], aut[1], rel_tol=1e-12)
+  assert a_only["pet_AB"] is None and a_only["autopsy_A"] == both["autopsy_A"]
+
+def test_case_columns_defaults():
+  age, stage, apoe, tests, override, pet_se, pet_sp = engine.case_columns(
+    [{"catA": "pos"}, {"age": "", "prior_override": "", "stage": "CN", "apoe": "e4e4", "pet_se": 0.8, "catA": "neg"},
+     {"prior_override": 0.4, "catA": "indet"}])
+  assert age.tolist() == [engine.DEFAULT_AGE] * 3
+  assert [engine.STAGES[s] for s in stage] == [engine.DEFAULT_STAGE, "CN", engine.DEFAULT_STAGE]
+  assert [engine.GENOTYPES[g] for g in apoe] == [engine.DEFAULT_APOE, "e4e4", engine.DEFAULT_APOE]
+  assert override[2] == 0.4 and all(v != v for v in override[:2])
+  assert pet_se.tolist() == [engine.PET_SE, 0.8, engine.PET_SE] and pet_sp.tolist() == [engine.PET_SP] * 3
+  assert len(tests) == 2 and not tests[1].used.any()
+
+def test_param_set_follows_the_module_constants(monkeypatch):
+  # Editing TEST_LR or PET Se/Sp rebuilds the compiled tables: scores track the constants
+  before = engine.param_set()
+  cases = random_cases(60, seed=3)
+  monkeypatch.setitem(engine.TEST_LR, "plasma_ptau217_generic", (20.0, 0.05))
+  monkeypatch.setattr(engine, "PET_SE", 0.85)
+  monkeypatch.setattr(engine, "PET_SP", 0.95)
+  ps = engine.param_set()
+  assert ps is not before and ps.test_lr["plasma_ptau217_generic"] == (20.0, 0.05)
+  assert (ps.pet_se, ps.pet_sp) == (0.85, 0.95) and ps.envelope(0.3) == engine._envelope(0.3, 0.85, 0.95)
+  assert ps.log_lr_matrix[ps.mods["plasma_ptau217_generic"]].tolist() == [math.log(0.05), 0.0, math.log(20.0)]
+  for c in cases:
+    c.pop("pet_se"), c.pop("pet_sp")
+  for c, r in zip(cases, engine.score_cases(cases)):
+    _, pet, aut = reference_case(c)
+    for got, want in zip(r["pet_steps"] + r["autopsy_steps"], pet + aut):
+      assert math.isclose(got, want, rel_tol=1e-9, abs_tol=1e-12)
+  monkeypatch.undo()
+  assert engine.param_set().test_lr == before.test_lr and engine.param_set().pet_se == before.pet_se
+
+def test_a_step_without_a_result_is_an_error():
+  for c in ({}, {"modA": "plasma_ptau217_generic"}, {"catA": ""}, {"catA": "pos", "modB": "amyloid_pet"},
+            {"tests": [{"mod": "amyloid_pet", "cat": "neg"}, {"mod": "plasma_ptau217_generic"}]}):
+    with pytest.raises(ValueError, match="is required"):
+      engine.score_cases([c])
+  # useB "no" drops step B, so it needs no result
+  assert engine.score_cases([{"catA": "pos", "modB": "amyloid_pet", "useB": "no"}])[0]["pet_AB"] is None
+
+def test_shipped_prior_table_is_current():
+  # The PWA's prior_table.json must be exactly what the engine builds from today's constants
+  # (regenerate with: python ptau217_engine.py ../prior_table.json)
+  path = os.path.join(os.path.dirname(__file__), "..", "..", "prior_table.json")
+  with open(path, encoding="utf-8") as f:
+    text = f.read()
+  shipped, built = engine.PriorTable.from_json(text), engine.PriorTable.build()
+  assert shipped.is_current() and shipped.version == built.version
+  assert np.array_equal(shipped.values, built.values) and text == built.to_json() + "\n"
+  # lookups on the grid reproduce the formula
+  age = np.arange(18, 101)[:, None]
+  assert np.array_equal(shipped.lookup(age, 2, 5), engine.prior_formula(age, 2, 5))
+
+def test_risk_curves_match_risk_at():
+  rng = np.random.default_rng(19)
+  pa = rng.uniform(0, 1, 50)
+  stage = engine.prognosis_stage(rng.choice(engine.STAGES, 50))
+  hazards = {"CN": (0.05, 0.02), "MCI": (0.3, 0.1)}
+  for hz in (None, hazards):
+    times, curves = engine.risk_curves(pa, stage, horizon=5, steps_per_year=4, hazards=hz)
+    assert np.allclose(curves, engine.risk_at(pa[:, None], stage[:, None], times[None, :], hz), rtol=1e-12, atol=0)
+    _, every = engine.risk_curves(pa, None, horizon=5, steps_per_year=4, hazards=hz)
+    for s in range(len(engine.PROG_STAGES)):
+      assert np.allclose(every[s], engine.risk_at(pa[:, None], s, times, hz), rtol=1e-12, atol=0)
+  # app.js computePrognostic at t = 3 years, MCI: plain powers of (1 - h)
+  h_pos, h_neg = engine.PROG_HAZARDS["MCI"]
+  want = 0.7 * (1 - (1 - h_pos) ** 3) + 0.3 * (1 - (1 - h_neg) ** 3)
+  assert math.isclose(engine.risk_at(0.7, engine.PROG_STAGES.index("MCI"), 3), want, rel_tol=1e-12)
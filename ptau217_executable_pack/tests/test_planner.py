@@ -0,0 +1,43 @@
+import math
+import ptau217_engine as engine
+import ptau217_planner as planner
+
+LIBRARY = [
+  planner.LibraryTest("plasma_ptau217_generic", 0.92, 0.94, 15.33, 0.085, 1.0, False),
+  planner.LibraryTest("plasma_abeta42_40_generic", 0.85, 0.85, 5.67, 0.176, 1.0, False),
+  planner.LibraryTest("csf_abeta42_40_lumipulse", 0.92, 0.93, 13.14, 0.086, 6.0, False),
+  planner.LibraryTest("amyloid_pet", 0.92, 0.90, 9.20, 0.089, 20.0, True),
+]
+
+def brute_force(prior, depth, layer="autopsy"):
+  # Expected final entropy of the best adaptive plan, by enumerating every test sequence and outcome
+  q0, _, ppv, npv = (float(v) for v in engine.envelope(prior))
+  lo = 1 - npv
+  post = lambda q: q if layer == "pet" else max(lo, min(ppv, q * ppv + (1 - q) * lo))
+  def best(q, left, used):
+    h = planner.binary_entropy(post(q))
+    for i, t in enumerate(LIBRARY):
+      if i in used or not left:
+        continue
+      if t.pet:
+        e = q * planner.binary_entropy(1.0 if layer == "pet" else ppv) + \
+            (1 - q) * planner.binary_entropy(0.0 if layer == "pet" else lo)
+      else:
+        p_pos = t.se * q + (1 - t.sp) * (1 - q)
+        odds = q / (1 - q)
+        e = p_pos * best(odds * t.lr_pos / (1 + odds * t.lr_pos), left - 1, used | {i}) + \
+            (1 - p_pos) * best(odds * t.lr_neg / (1 + odds * t.lr_neg), left - 1, used | {i})
+      h = min(h, e)
+    return h
+  return planner.binary_entropy(post(q0)) - best(q0, depth, frozenset())
+
+def test_plan_matches_brute_force():
+  for prior in (0.08, 0.3, 0.55, 0.9):
+    for depth in (1, 2, 3):
+      for layer in ("pet", "autopsy"):
+        res = planner.plan(prior, LIBRARY, depth=depth, layer=layer)
+        gain = brute_force(prior, depth, layer)
+        best = max(res["options"], key=lambda o: o["utility"])
+        # the memo buckets log-odds at LOGIT_STEP, so gains agree to within the bucketing error
+        assert math.isclose(best["info_gain"], gain, abs_tol=1e-3), (prior, depth, layer)
+        assert res["best"] == best["test"]
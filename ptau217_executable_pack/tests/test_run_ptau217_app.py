@@ -0,0 +1,78 @@
+import asyncio, gzip, json, threading
+import run_ptau217_app as app
+
+def test_metrics_spread_threads_over_shards():
+  metrics = app.Metrics(shards=4)
+  barrier = threading.Barrier(8)
+  def request():
+    barrier.wait()  # all threads alive at once, as under concurrent requests
+    metrics.end("/api/posterior", "POST", 200, 10, metrics.begin("/api/posterior"))
+  threads = [threading.Thread(target=request) for _ in range(8)]
+  for t in threads:
+    t.start()
+  for t in threads:
+    t.join()
+  used = [sh for sh in metrics.shards if sh.requests]
+  assert len(used) > 1
+  requests, inflight, _, _, _ = metrics.snapshot()
+  assert requests[("/api/posterior", "POST", "200")] == 8
+  assert inflight["/api/posterior"] == 0
+
+def test_profile_arming_needs_loopback_and_same_origin():
+  assert app.profile_allowed("127.0.0.1", {})
+  assert app.profile_allowed("::1", {"Host": "127.0.0.1:5173", "Origin": "http://127.0.0.1:5173"})
+  assert app.profile_allowed("::ffff:127.0.0.1", {})
+  assert not app.profile_allowed("192.168.1.20", {})
+  assert not app.profile_allowed(None, {})
+  assert not app.profile_allowed("127.0.0.1", {"Host": "127.0.0.1:5173", "Origin": "https://example.org"})
+  status, headers, _ = app.route("POST", "/api/profile?requests=5", {}, b"", {}, client="10.0.0.7")
+  assert status == 403 and not app.PROFILER.status().get("armed")
+
+def test_posterior_error_names_the_bad_case():
+  good = {"age": 70, "modA": "plasma_ptau217_generic", "catA": "pos"}
+  body = json.dumps([good, dict(good, age="x"), good, dict(good, catA="maybe")]).encode()
+  status, _, data = app.route("POST", "/api/posterior", {}, body, {})
+  res = json.loads(data)
+  assert status == 400 and not res["ok"]
+  assert res["error"].startswith("case 1: ") and [e["case"] for e in res["errors"]] == [1, 3]
+
+def test_chunked_body_is_read_in_bounded_blocks():
+  # a client-declared chunk size is never read (or buffered) in one piece
+  async def first_blocks():
+    reader = asyncio.StreamReader()
+    reader.feed_data(b"7fffffff\r\n" + b"a" * (3 * app.BODY_BLOCK))
+    blocks = app._body_blocks(reader, {"Transfer-Encoding": "chunked"})
+    return [len(await blocks.__anext__()) for _ in range(3)]
+  assert asyncio.run(first_blocks()) == [app.BODY_BLOCK] * 3
+
+def test_etag_and_conditional_get():
+  assets = app.build_asset_store()
+  status, hdrs, body = app.route("GET", "/app.js", {}, b"", assets)
+  asset = assets["/app.js"]
+  assert status == 200 and body == asset["body"] and hdrs["ETag"] == asset["etag"] and hdrs["Cache-Control"] == app.REVALIDATE
+  for validator in ({"If-None-Match": hdrs["ETag"]}, {"If-None-Match": f'W/"{asset["digest"]}-gzip", "other"'},
+                    {"If-Modified-Since": hdrs["Last-Modified"]}):
+    status, h304, body = app.route("GET", "/app.js", validator, b"", assets)
+    assert status == 304 and body == b"" and h304["ETag"] == hdrs["ETag"]
+  assert app.route("GET", "/app.js", {"If-None-Match": '"stale"'}, b"", assets)[0] == 200
+  # content-hashed URLs (as index.html links them) are immutable; a stale hash is not
+  assert f'app.js?v={asset["version"]}' in assets["/index.html"]["body"].decode()
+  assert app.route("GET", f'/app.js?v={asset["version"]}', {}, b"", assets)[1]["Cache-Control"] == app.IMMUTABLE
+  assert app.route("GET", "/app.js?v=0", {}, b"", assets)[1]["Cache-Control"] == app.REVALIDATE
+
+def test_encoding_negotiation_and_vary():
+  assets = app.build_asset_store()
+  asset = assets["/app.js"]
+  for accept, enc in (("gzip, deflate", "gzip"), ("br;q=0, gzip", "gzip"), ("identity", None), ("gzip;q=0", None),
+                      ("br, gzip", "br" if app.brotli is not None else "gzip")):
+    status, hdrs, body = app.route("GET", "/app.js", {"Accept-Encoding": accept}, b"", assets)
+    assert status == 200 and hdrs["Vary"] == "Accept-Encoding" and hdrs.get("Content-Encoding") == enc, accept
+    decode = {"gzip": gzip.decompress, "br": getattr(app.brotli, "decompress", None), None: bytes}[enc]
+    assert decode(body) == asset["body"] and (enc is None or hdrs["ETag"] == f'"{asset["digest"]}-{enc}"')
+  # API responses: compressed above COMPRESS_MIN only, and always marked Vary
+  big = json.dumps([{"age": 70, "modA": "plasma_ptau217_generic", "catA": "pos"}] * 50).encode()
+  status, hdrs, body = app.route("POST", "/api/posterior", {"Accept-Encoding": "gzip"}, big, assets)
+  assert hdrs["Content-Encoding"] == "gzip" and hdrs["Vary"] == "Accept-Encoding"
+  assert json.loads(gzip.decompress(body))["n"] == 50
+  status, hdrs, body = app.route("POST", "/api/posterior", {"Accept-Encoding": "gzip"}, b"[]", assets)
+  assert "Content-Encoding" not in hdrs and json.loads(body)["n"] == 0
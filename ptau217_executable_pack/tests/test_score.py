@@ -0,0 +1,31 @@
+import io, json, math
+import ptau217_engine as engine
+import ptau217_score as score
+
+def scored(tmp_path, text):
+  path = tmp_path / "cohort.csv"
+  path.write_text(text)
+  out = io.StringIO()
+  score.score_file(str(path), out, "ndjson")
+  return [json.loads(line) for line in out.getvalue().splitlines()]
+
+def test_blank_results_are_not_read_as_positive(tmp_path):
+  rows = scored(tmp_path, "age,stage,apoe,modA,catA,modB,catB\n"
+                          "74,MCI,e3e4,plasma_ptau217_generic,pos,,\n"
+                          "74,MCI,e3e4,plasma_ptau217_generic,,,\n"
+                          "74,MCI,e3e4,,,,\n"
+                          "74,MCI,e3e4,,,amyloid_pet,\n"
+                          "74,MCI,e3e4,,neg,amyloid_pet,pos\n")
+  done, blank_cat, not_done, blank_b, default_mod = rows
+  case = {"age": 74, "stage": "MCI", "apoe": "e3e4"}
+  assert done["ok"] and math.isclose(done["autopsy"], engine.score_cases([dict(case, catA="pos")])[0]["autopsy_A"], rel_tol=1e-12)
+  # a step given without its result fails its row
+  assert not blank_cat["ok"] and blank_cat["error"] == "catA (or valueA) is required"
+  assert not blank_b["ok"] and blank_b["error"] == "catB (or valueB) is required"
+  # modA, catA and valueA all blank: no step A, the posterior is the prior's
+  none = engine.score_cases([dict(case, tests=[])])[0]
+  assert not_done["ok"] and not_done["error"] is None
+  assert math.isclose(not_done["pet"], none["pet_prior"], rel_tol=1e-12)
+  # a blank modA with a result is the default modality
+  want = engine.score_cases([dict(case, catA="neg", modB="amyloid_pet", catB="pos")])[0]
+  assert default_mod["ok"] and math.isclose(default_mod["autopsy"], want["autopsy_AB"], rel_tol=1e-12)
@@ -0,0 +1,41 @@
+import numpy as np
+import ptau217_engine as engine
+import ptau217_sensitivity as sensitivity
+from test_engine import random_cases
+
+H = 1e-6
+
+def test_gradients_match_central_differences():
+  cases = [c for c in random_cases(200, seed=11) if "prior_override" not in c]
+  tests = engine.case_tests(cases)
+  age = np.array([float(c["age"]) for c in cases])
+  stage = engine.codes([c["stage"] for c in cases], engine.STAGES)
+  apoe = engine.codes([c["apoe"] for c in cases], engine.GENOTYPES)
+  se, sp = np.array([c["pet_se"] for c in cases]), np.array([c["pet_sp"] for c in cases])
+  out = sensitivity.score_gradients(age, stage, apoe, tests, None, se, sp)
+  prior = out["inputs"]["prior"]
+
+  def final(prior=prior, se=se, sp=sp, tests=tests):
+    r = engine.posterior(prior, tests, se, sp, steps=False)
+    return {"pet": r["pet"][0], "autopsy": r["autopsy"][0]}
+
+  def moved(name, h):
+    if name == "prior":
+      return final(prior=prior + h)
+    if name == "pet_se":
+      return final(se=se + h)
+    if name == "pet_sp":
+      return final(sp=sp + h)
+    if name == "apoe_or":
+      # the clinical prior's odds scale with the odds ratio
+      o = prior / (1 - prior) * (1 + h / out["inputs"]["apoe_or"])
+      return final(prior=o / (1 + o))
+    k = int(name[2:]) - 1
+    t = tests[k]
+    lr = engine.lr_for_category(t.cat, t.lr_pos, t.lr_neg) + h
+    return final(tests=tests[:k] + [t._replace(lr_pos=lr, lr_neg=lr, log_lr=None)] + tests[k + 1:])
+
+  for layer in ("pet", "autopsy"):
+    for name, grad in out["d_" + layer].items():
+      numeric = (moved(name, H)[layer] - moved(name, -H)[layer]) / (2 * H)
+      assert np.allclose(grad, numeric, rtol=1e-4, atol=1e-6), (layer, name)
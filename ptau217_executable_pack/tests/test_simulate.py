@@ -0,0 +1,11 @@
+import json
+import numpy as np
+import ptau217_simulate as simulate
+
+def test_seed_gives_the_same_report_for_any_worker_count():
+  kw = dict(seed=7, chunk=3000, workup=("plasma_ptau217_generic", "csf_abeta42_40_lumipulse"))
+  one, arrays = simulate.simulate(20000, workers=1, keep=True, **kw)
+  many, arrays_many = simulate.simulate(20000, workers=3, keep=True, **kw)
+  assert json.dumps(one, sort_keys=True) == json.dumps(many, sort_keys=True)
+  assert arrays.keys() == arrays_many.keys() and all(np.array_equal(arrays[k], arrays_many[k]) for k in arrays)
+  assert one["n"] == 20000 and simulate.simulate(20000, workers=1, **dict(kw, seed=8)) != one
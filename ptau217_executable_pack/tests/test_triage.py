@@ -0,0 +1,43 @@
+import numpy as np
+import ptau217_engine as engine
+import ptau217_triage as triage
+from test_engine import random_cases
+
+EPS = 1e-6
+C = engine.TRIAGE_CUTOFF
+
+def final(prior, tests, se, sp):
+  r = engine.posterior(prior, tests, se, sp, steps=False)
+  return {"pet": r["pet"][0], "autopsy": r["autopsy"][0]}
+
+def workups(n=300, seed=5):
+  cases = random_cases(n, seed)
+  tests = engine.case_tests(cases)
+  se, sp = np.array([c["pet_se"] for c in cases]), np.array([c["pet_sp"] for c in cases])
+  return tests, se, sp
+
+def test_min_prior_brackets_the_cutoff():
+  tests, se, sp = workups()
+  need = triage.min_prior(tests, se, sp, C)
+  for layer, p in need.items():
+    inner = np.isfinite(p) & (p > 1e-4) & (p < 1 - 1e-4)
+    assert inner.any()
+    above = final(np.where(inner, p * (1 + EPS), 0.5), tests, se, sp)[layer]
+    below = final(np.where(inner, p * (1 - EPS), 0.5), tests, se, sp)[layer]
+    assert np.all(above[inner] >= C) and np.all(below[inner] < C), layer
+    # 0 = met whatever the prior, inf = never
+    anywhere = final(np.full(p.shape, 1e-4), tests, se, sp)[layer]
+    nowhere = final(np.full(p.shape, 1 - 1e-4), tests, se, sp)[layer]
+    assert np.all(anywhere[p == 0] >= C) and np.all(nowhere[np.isinf(p)] < C), layer
+
+def test_min_next_lr_brackets_the_cutoff():
+  tests, se, sp = workups(seed=6)
+  prior = np.random.default_rng(6).uniform(0.05, 0.95, len(se))
+  need = triage.min_next_lr(prior, tests, se, sp, C)
+  for layer, lr in need.items():
+    inner = np.isfinite(lr) & (lr > 0)
+    assert inner.any()
+    def with_next(scale):
+      extra = engine.Test(np.full(lr.shape, engine.POS), np.where(inner, lr * scale, 1.0), 1.0)
+      return final(prior, tests + [extra], se, sp)[layer]
+    assert np.all(with_next(1 + EPS)[inner] >= C) and np.all(with_next(1 - EPS)[inner] < C), layer
@@ -1,6 +1,6 @@
 
-const CACHE='amyloid-helper-v215';
-const ASSETS=['./','./index.html','./styles.css','./app.js','./manifest.webmanifest'];
+const CACHE='amyloid-helper-v219';
+const ASSETS=['./','./index.html','./styles.css','./app.js','./manifest.webmanifest','./prior_table.json','./sweep.js'];
 self.addEventListener('install',e=>{e.waitUntil(caches.open(CACHE).then(c=>c.addAll(ASSETS)));self.skipWaiting();});
 self.addEventListener('activate',e=>{e.waitUntil(caches.keys().then(keys=>Promise.all(keys.map(k=>k!==CACHE?caches.delete(k):null))));self.clients.claim();});
 // ===== BEGIN: Safe fetch handler (injected) =====
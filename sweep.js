@@ -0,0 +1,81 @@
+// What-if sensitivity sweep: the full diagnostic pipeline (age prior → PET layer → autopsy layer,
+// as in priorFromAgeStage / applyAPOEonOdds / sequentialPosterior in app.js) over a dense grid of
+// ages × LR multipliers, on flat Float64Arrays. Runs as a Web Worker (new Worker("sweep.js")) and
+// is also loaded as a plain script, so app.js can call sensitivitySweep() directly without one.
+//
+// params: { age, ageSpan, lrPct, nAge, nLR, a50, a90, or, prior (override or null), seP, spP,
+//           tests:[{cat, LRpos, LRneg, pet}] }
+// Each non-PET step's LR (pos or neg) is multiplied by m ∈ [1−lrPct%, 1+lrPct%]; indeterminate stays 1.
+// Returns { ages, mults, pet, autopsy (row-major nAge×nLR grids), petMin/petMax, autMin/autMax,
+//           autMinByAge/autMaxByAge (envelope over the LR axis), min/max ({value, age, mult}), ms }.
+function sensitivitySweep(P){
+  const t0 = (typeof performance !== "undefined" ? performance : Date).now();
+  const nA = Math.max(1, P.nAge|0), nL = Math.max(1, P.nLR|0);
+  const aLo = Math.max(18, P.age - P.ageSpan), aHi = Math.min(100, P.age + P.ageSpan);
+  const ages = new Float64Array(nA), mults = new Float64Array(nL), logm = new Float64Array(nL);
+  for (let i = 0; i < nA; i++) ages[i] = nA > 1 ? aLo + (aHi - aLo) * i / (nA - 1) : P.age;
+  for (let j = 0; j < nL; j++) {
+    mults[j] = nL > 1 ? 1 + (P.lrPct / 100) * (2 * j / (nL - 1) - 1) : 1;
+    logm[j] = Math.log(mults[j]);
+  }
+  // Per step: PET flag, category (+1 / −1 / 0 = indeterminate) and log(LR) at m = 1
+  const K = P.tests.length, isPet = new Uint8Array(K), cat = new Int8Array(K), logLR = new Float64Array(K);
+  P.tests.forEach((t, k) => {
+    isPet[k] = t.pet ? 1 : 0;
+    cat[k] = t.cat === "pos" ? 1 : (t.cat === "neg" ? -1 : 0);
+    logLR[k] = cat[k] === 1 ? Math.log(t.LRpos) : (cat[k] === -1 ? Math.log(t.LRneg) : 0);
+  });
+  const pet = new Float64Array(nA * nL), autopsy = new Float64Array(nA * nL);
+  const autMinByAge = new Float64Array(nA), autMaxByAge = new Float64Array(nA);
+  const expit = L => L >= 0 ? 1 / (1 + Math.exp(-L)) : Math.exp(L) / (1 + Math.exp(L));
+  const clamp = (x, lo, hi) => Math.max(lo, Math.min(hi, x));
+  const seP = P.seP, spP = P.spP;
+  let petMin = Infinity, petMax = -Infinity, cMin = 0, cMax = 0;
+  for (let i = 0; i < nA; i++) {
+    // Age row: prior, PPV/NPV envelope and PET-layer prior log-odds are shared by every multiplier
+    let prior = P.prior;
+    if (prior == null) {
+      const a = ages[i], p0 = clamp(a <= 50 ? P.a50 : (a >= 90 ? P.a90 : P.a50 + (a - 50) / 40 * (P.a90 - P.a50)), 0.01, 0.99);
+      const o = p0 / (1 - p0) * P.or;
+      prior = clamp(o / (1 + o), 1e-6, 1 - 1e-6);
+    }
+    const hi = seP * prior / (seP * prior + (1 - spP) * (1 - prior));
+    const lo = 1 - spP * (1 - prior) / ((1 - seP) * prior + spP * (1 - prior));
+    const q0 = seP * prior + (1 - spP) * (1 - prior), L0 = Math.log(q0) - Math.log1p(-q0);
+    let rowMin = Infinity, rowMax = -Infinity;
+    for (let j = 0; j < nL; j++) {
+      let L = L0, fixed = NaN;
+      for (let k = 0; k < K; k++) {
+        if (isPet[k]) {
+          const q = expit(L);
+          if (fixed !== fixed) fixed = cat[k] === 1 ? hi : (cat[k] === -1 ? lo : Math.max(lo, Math.min(hi, q * hi + (1 - q) * lo)));
+          if (cat[k] !== 0) L = cat[k] * Infinity;
+        } else if (cat[k] !== 0 && isFinite(L)) {
+          L += logLR[k] + logm[j];
+        }
+      }
+      const q = expit(L), p = fixed === fixed ? fixed : Math.max(lo, Math.min(hi, q * hi + (1 - q) * lo));
+      const c = i * nL + j;
+      pet[c] = q; autopsy[c] = p;
+      if (q < petMin) petMin = q;
+      if (q > petMax) petMax = q;
+      if (p < rowMin) rowMin = p;
+      if (p > rowMax) rowMax = p;
+      if (p < autopsy[cMin]) cMin = c;
+      if (p > autopsy[cMax]) cMax = c;
+    }
+    autMinByAge[i] = rowMin; autMaxByAge[i] = rowMax;
+  }
+  const at = c => ({ value: autopsy[c], age: ages[Math.floor(c / nL)], mult: mults[c % nL] });
+  return { ages, mults, nAge: nA, nLR: nL, pet, autopsy, petMin, petMax, autMin: autopsy[cMin], autMax: autopsy[cMax],
+           autMinByAge, autMaxByAge, min: at(cMin), max: at(cMax),
+           ms: (typeof performance !== "undefined" ? performance : Date).now() - t0 };
+}
+
+if (typeof document === "undefined" && typeof self !== "undefined" && typeof importScripts === "function") {
+  // Worker side: one sweep per message, grids transferred back without copying
+  self.onmessage = e => {
+    const r = sensitivitySweep(e.data.params);
+    self.postMessage(r, [r.ages.buffer, r.mults.buffer, r.pet.buffer, r.autopsy.buffer, r.autMinByAge.buffer, r.autMaxByAge.buffer]);
+  };
+}